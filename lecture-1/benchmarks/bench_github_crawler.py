@@ -0,0 +1,115 @@
+"""GitHub クローラー (github_crawler) のベンチマーク: 1ページずつ vs 並行 + ETag
+
+ダミーの GitHub API (応答に --latency 秒の遅延) に対して
+1. scraping.ipynb と同じ1ページずつの取得 (time.sleep(1) は除く) と、GitHubCrawler の初回の取得
+2. 2回目 (変更なし): すべてのページが 304 になり、レート制限の残り回数が減らないこと
+3. 1件だけ変更: そのページだけが 200 になること
+4. リポジトリの削除でページ数が減った場合に、消えたページの保存を消すこと
+5. 残り回数の少ないAPI (--limit 回 / 2秒): 403 を受けずにリセットを待って取得し終えること
+を確認する。取得したリポジトリが API の一覧と一致することもその都度確かめる。
+
+実行方法 (lecture-1 ディレクトリから):
+    python benchmarks/bench_github_crawler.py [--latency 0.1] [--limit 10]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from fake_github import FakeGitHub, generate_repos, touch
+from github_crawler import GitHubCrawler
+
+ORGS = {"google": 2700, "microsoft": 800, "facebook": 1200}
+
+
+def expected(api, org):
+    """API の既定の並び (作成日時の新しい順) のリポジトリ名"""
+    return [repo["name"] for repo in sorted(api.orgs[org], key=lambda r: (r["created_at"], r["id"]), reverse=True)]
+
+
+def check(api, results):
+    for org, result in results.items():
+        assert [repo["name"] for repo in result.repos] == expected(api, org), org
+
+
+def sequential(base_url, org):
+    """scraping.ipynb と同じ流れ (空のページが返るまで1ページずつ)"""
+    repos, page = [], 1
+    while True:
+        resp = requests.get(f"{base_url}/orgs/{org}/repos?per_page=100&page={page}", timeout=40)
+        resp.raise_for_status()
+        data = resp.json()
+        if not data:
+            break
+        repos.extend(data)
+        page += 1
+    return repos
+
+
+def crawl(crawler, api, label):
+    before_requests, before_304, before_remaining = api.requests, api.not_modified, api.remaining
+    start = time.perf_counter()
+    results = crawler.crawl(list(ORGS))
+    elapsed = time.perf_counter() - start
+    check(api, results)
+    pages = sum(result.pages for result in results.values())
+    print(f"  {label:26}: {elapsed:6.2f} s  {pages} ページ, リクエスト {api.requests - before_requests}, "
+          f"304 {api.not_modified - before_304}, 残り回数の消費 {before_remaining - api.remaining}")
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.1, help="API の応答の遅延 (秒)")
+    parser.add_argument("--limit", type=int, default=10, help="5. のAPIのレート制限 (回 / 2秒)")
+    args = parser.parse_args()
+    repos = {org: generate_repos(org, count) for org, count in ORGS.items()}
+    print(f"{len(ORGS)} Organization ({sum(ORGS.values())} リポジトリ), 遅延 {args.latency}s")
+
+    with tempfile.TemporaryDirectory() as tmp, FakeGitHub(repos, delay=args.latency) as api:
+        start = time.perf_counter()
+        for org in ORGS:
+            assert [repo["name"] for repo in sequential(api.base_url, org)] == expected(api, org)
+        baseline = time.perf_counter() - start
+        pages = sum((count + 99) // 100 + 1 for count in ORGS.values())
+        print(f"  {'1ページずつ (sleep なし)':26}: {baseline:6.2f} s  (元のノートブックはさらに sleep(1) × {pages} 回)")
+
+        conn = sqlite3.connect(os.path.join(tmp, "repos.db"))
+        crawler = GitHubCrawler(conn, base_url=api.base_url)
+        _, elapsed = crawl(crawler, api, "GitHubCrawler 初回")
+        print(f"    (同時リクエスト数 最大 {api.max_in_flight}, 1ページずつの {baseline / elapsed:.1f} 倍)")
+
+        remaining = api.remaining
+        results, _ = crawl(crawler, api, "2回目 (変更なし)")
+        assert all(result.not_modified == result.pages for result in results.values())
+        assert api.remaining == remaining
+
+        touch(api.orgs["microsoft"][100], stars=12345)
+        results, _ = crawl(crawler, api, "1件だけ変更")
+        assert results["microsoft"].pages - results["microsoft"].not_modified == 1
+        assert sum(result.pages - result.not_modified for result in results.values()) == 1
+
+        del api.orgs["facebook"][:500]
+        results, _ = crawl(crawler, api, "facebook の 500 件を削除")
+        saved = conn.execute("SELECT max(page) FROM github_pages WHERE listing LIKE '%/orgs/facebook/%'").fetchone()[0]
+        assert saved == results["facebook"].pages == 7
+        conn.close()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeGitHub(repos, delay=args.latency, rate_limit=args.limit,
+                                                          reset_after=2) as api:
+        conn = sqlite3.connect(os.path.join(tmp, "repos.db"))
+        crawl(GitHubCrawler(conn, base_url=api.base_url), api, f"レート制限 {args.limit}回/2秒")
+        assert api.rate_limited == 0
+        print(f"    403 (制限超過) {api.rate_limited} 回")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
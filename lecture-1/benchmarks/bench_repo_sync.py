@@ -0,0 +1,185 @@
+"""repos テーブルの同期 (repo_sync) のベンチマーク: 1件ずつ INSERT OR REPLACE vs まとめて upsert + 差分の取得
+
+ダミーの GitHub API に対して
+1. scraping.ipynb と同じ書き込み (1件ずつ INSERT OR REPLACE・ページごとにコミット) を2回: 時間と id の入れ替わり
+2. sync_org の初回 (全件) と2回目: 2回目は書き換える行が 0 で id が変わらないこと
+3. 5件に push・2件を追加・1件の名前を変更: 差分の取得 (sort=pushed) が1ページで済み、件数が一致すること
+4. 3件を削除して全件の同期: 3件に deleted_at が記録され、1件を戻すと復活すること
+5. 削除済みのリポジトリの名前への変更と、2件の名前の入れ替え: 一意制約で止まらず、id が変わらないこと
+6. 既存の (id, name, language, stars) だけの repos テーブルから: 既存の id をそのまま使い、一覧に無い行
+   (どの Organization のものか分からない行) はそのまま残ること
+を確認する。
+
+実行方法 (lecture-1 ディレクトリから):
+    python benchmarks/bench_repo_sync.py [--repos 2700]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from fake_github import FakeGitHub, generate_repos, make_repo, touch
+from github_crawler import GitHubCrawler
+from repo_sync import FULL, INCREMENTAL, sync_org
+
+ORG = "google"
+LEGACY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos(
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    name     TEXT UNIQUE,
+    language TEXT,
+    stars    INTEGER
+)"""
+
+
+def insert_or_replace(conn, base_url):
+    """scraping.ipynb (変更前) と同じ書き込み"""
+    cur = conn.cursor()
+    page = 1
+    while True:
+        data = requests.get(f"{base_url}/orgs/{ORG}/repos?per_page=100&page={page}", timeout=40).json()
+        if not data:
+            break
+        for repo in data:
+            cur.execute("INSERT OR REPLACE INTO repos(name, language, stars) VALUES (?,?,?)",
+                        (repo["name"], repo["language"], repo["stargazers_count"]))
+        conn.commit()
+        page += 1
+
+
+def ids(conn):
+    return dict(conn.execute("SELECT name, id FROM repos"))
+
+
+def live(conn):
+    return {name: (language, stars) for name, language, stars in
+            conn.execute("SELECT name, language, stars FROM repos WHERE deleted_at IS NULL")}
+
+
+def upstream(api):
+    return {repo["name"]: (repo["language"], repo["stargazers_count"]) for repo in api.orgs[ORG]}
+
+
+def show(label, stats, elapsed=None):
+    elapsed = stats.seconds if elapsed is None else elapsed
+    print(f"  {label:30}: {elapsed * 1000:8.1f} ms  {stats.mode:11} {stats.pages:2} ページ {stats.fetched:5} 件取得  "
+          f"追加 {stats.inserted} / 更新 {stats.updated} / 改名 {stats.renamed} / 削除 {stats.tombstoned}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=2700, help="リポジトリ数")
+    args = parser.parse_args()
+    repos = generate_repos(ORG, args.repos)
+    print(f"{ORG}: {args.repos} リポジトリ")
+
+    with tempfile.TemporaryDirectory() as tmp, FakeGitHub({ORG: repos}) as api:
+        old = sqlite3.connect(os.path.join(tmp, "old.db"))
+        old.execute(LEGACY_SCHEMA)
+        timings = []
+        start = time.perf_counter()
+        insert_or_replace(old, api.base_url)
+        timings.append(time.perf_counter() - start)
+        before = ids(old)
+        start = time.perf_counter()
+        insert_or_replace(old, api.base_url)
+        timings.append(time.perf_counter() - start)
+        after = ids(old)
+        churned = sum(1 for name in after if after[name] != before[name])
+        seq = old.execute("SELECT seq FROM sqlite_sequence WHERE name = 'repos'").fetchone()[0]
+        print(f"  {'1件ずつ INSERT OR REPLACE':30}: 初回 {timings[0] * 1000:8.1f} ms / 2回目 {timings[1] * 1000:8.1f} ms  "
+              f"2回目で id が変わった行 {churned}, AUTOINCREMENT {seq}")
+        old.close()
+
+        conn = sqlite3.connect(os.path.join(tmp, "sync.db"))
+        crawler = GitHubCrawler(conn, base_url=api.base_url)
+        stats = sync_org(conn, crawler, ORG)
+        show("sync_org 初回", stats)
+        assert stats.mode == FULL and stats.inserted == args.repos
+        assert live(conn) == upstream(api)
+        before = ids(conn)
+
+        stats = sync_org(conn, crawler, ORG, full=True)
+        show("2回目 (全件・変更なし)", stats)
+        assert stats.inserted == stats.updated == stats.tombstoned == 0
+        assert ids(conn) == before
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'repos'").fetchone()[0]
+        print(f"    id の変化なし (AUTOINCREMENT の番号 {seq} は ON CONFLICT でも進むが、既存の行の id は変わらない)")
+
+        now = datetime.now(timezone.utc)
+        for i, repo in enumerate(api.orgs[ORG][:5]):
+            touch(repo, stars=repo["stargazers_count"] + 10, at=now + timedelta(minutes=i))
+        rng = random.Random(1)
+        for i in range(2):
+            new = make_repo(ORG, 900_000_000 + i, now, rng)
+            api.orgs[ORG].append(touch(new, at=now + timedelta(minutes=10 + i)))
+        renamed = api.orgs[ORG][10]
+        renamed["name"] = renamed["full_name"] = "renamed-repo"
+        touch(renamed, at=now + timedelta(minutes=20))
+        requests_before = api.requests
+        stats = sync_org(conn, crawler, ORG)
+        show("差分 (push 5・追加 2・改名 1)", stats)
+        assert stats.mode == INCREMENTAL and stats.pages == 1 and api.requests - requests_before == 1
+        assert (stats.inserted, stats.updated, stats.renamed) == (2, 6, 1)
+        assert live(conn) == upstream(api)
+        assert all(ids(conn)[name] == before[name] for name in before if name in upstream(api))
+
+        stats = sync_org(conn, crawler, ORG)
+        show("差分 (変更なし)", stats)
+        # 前回の最新の pushed_at ちょうどのリポジトリは取得し直すが、書き換えはしない
+        assert stats.pages == 1 and stats.inserted == stats.updated == stats.renamed == 0
+
+        removed = api.orgs[ORG][20:23]
+        del api.orgs[ORG][20:23]
+        stats = sync_org(conn, crawler, ORG, full=True)
+        show("全件 (3件削除)", stats)
+        assert stats.tombstoned == 3 and live(conn) == upstream(api)
+        api.orgs[ORG].append(removed[0])
+        stats = sync_org(conn, crawler, ORG, full=True)
+        show("全件 (1件復活)", stats)
+        assert stats.updated == 1 and stats.tombstoned == 0 and live(conn) == upstream(api)
+
+        # 削除済み (deleted_at のある行) のリポジトリの名前を別のリポジトリが使う・2件が名前を入れ替える
+        github_ids = dict(conn.execute("SELECT github_id, id FROM repos"))
+        later = now + timedelta(minutes=30)
+        reused, first, second = api.orgs[ORG][0], api.orgs[ORG][1], api.orgs[ORG][2]
+        reused["name"] = reused["full_name"] = removed[1]["name"]
+        first["name"], second["name"] = second["name"], first["name"]
+        for i, repo in enumerate((reused, first, second)):
+            touch(repo, at=later + timedelta(minutes=i))
+        stats = sync_org(conn, crawler, ORG)
+        show("差分 (削除済みの名前へ改名・入れ替え)", stats)
+        assert stats.renamed == 3 and live(conn) == upstream(api)
+        assert all(dict(conn.execute("SELECT github_id, id FROM repos"))[repo["id"]] == github_ids[repo["id"]]
+                   for repo in (reused, first, second))
+        conn.close()
+
+        legacy = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+        legacy.execute(LEGACY_SCHEMA)
+        legacy.executemany("INSERT INTO repos(name, language, stars) VALUES (?,?,?)",
+                           [(repo["name"], None, 0) for repo in api.orgs[ORG][:100]] + [("gone-upstream", "Go", 3)])
+        legacy.commit()
+        old_ids = ids(legacy)
+        stats = sync_org(legacy, GitHubCrawler(legacy, base_url=api.base_url), ORG)
+        show("既存の repos テーブルから", stats)
+        assert all(ids(legacy)[name] == old_ids[name] for name in old_ids)
+        # 一覧に無い以前の crawl の行 (org が NULL) は、他の Organization のものかもしれないので残す
+        assert stats.tombstoned == 0
+        assert legacy.execute("SELECT org, deleted_at FROM repos WHERE name = 'gone-upstream'").fetchone() == (None, None)
+        synced = {name: value for name, value in live(legacy).items() if name != "gone-upstream"}
+        assert synced == upstream(api)
+        legacy.close()
+    print("すべての同期が API の一覧と一致しました")
+
+
+if __name__ == "__main__":
+    main()
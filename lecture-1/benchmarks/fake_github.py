@@ -0,0 +1,197 @@
+"""ベンチマーク用のダミー GitHub API (GET /orgs/{org}/repos) のローカルHTTPサーバー
+
+実際の API と同じく
+- per_page / page によるページ分割と Link ヘッダー (rel="next" / "last" / "first" / "prev")
+- sort=created|updated|pushed|full_name と direction=asc|desc による並び順
+- ETag による条件付きGET (304 は残りのリクエスト数を減らさない)
+- X-RateLimit-Limit / Remaining / Reset / Used ヘッダーと、使い切った時の 403
+に対応する。orgs[org] のリポジトリのリストを書き換えると、以降の応答に反映される。
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+LANGUAGES = ["Python", "Go", "Java", "C++", "JavaScript", "TypeScript", "Rust", "Kotlin", "Dart", None]
+BASE_TIME = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+
+def _iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_repo(org, repo_id, created, rng):
+    """GitHub API のリポジトリと同じ形の dict (主なキーだけ)"""
+    pushed = created + timedelta(days=rng.randint(0, 3000))
+    name = f"{org}-repo-{repo_id}"
+    return {
+        "id": repo_id,
+        "name": name,
+        "full_name": f"{org}/{name}",
+        "private": False,
+        "html_url": f"https://github.com/{org}/{name}",
+        "description": f"Repository {repo_id} of {org}",
+        "fork": rng.random() < 0.1,
+        "language": rng.choice(LANGUAGES),
+        "stargazers_count": int(rng.paretovariate(1.2)) - 1,
+        "watchers_count": 0,
+        "forks_count": rng.randint(0, 500),
+        "created_at": _iso(created),
+        "updated_at": _iso(pushed),
+        "pushed_at": _iso(pushed),
+        "archived": False,
+    }
+
+
+def generate_repos(org, count, seed=0, first_id=None):
+    """count 件のリポジトリ (id は作成順) を作る"""
+    rng = random.Random(f"{org}-{seed}")
+    start = first_id if first_id is not None else (zlib.crc32(org.encode()) % 1000) * 1_000_000
+    return [make_repo(org, start + i, BASE_TIME + timedelta(hours=i * 3), rng) for i in range(count)]
+
+
+def touch(repo, stars=None, at=None):
+    """リポジトリにpushされたことにする (pushed_at / updated_at を進め、スター数を変える)"""
+    moment = at or datetime.now(timezone.utc)
+    repo["pushed_at"] = repo["updated_at"] = _iso(moment)
+    if stars is not None:
+        repo["stargazers_count"] = stars
+    return repo
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+class FakeGitHub:
+    """with FakeGitHub({"google": repos}) as api: api.base_url を API_URL の代わりに使う"""
+
+    def __init__(self, orgs, delay=0.0, rate_limit=5000, reset_after=3600):
+        self.orgs = {org: list(repos) for org, repos in orgs.items()}
+        self.delay = delay
+        self.limit = rate_limit
+        self.remaining = rate_limit
+        self.reset_after = reset_after
+        self.reset_at = int(time.time()) + reset_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.rate_limited = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._httpd = None
+
+    def _page(self, org, query):
+        repos = self.orgs[org]
+        sort = query.get("sort", ["created"])[0]
+        direction = query.get("direction", ["asc" if sort == "full_name" else "desc"])[0]
+        key = {"created": "created_at", "updated": "updated_at", "pushed": "pushed_at",
+               "full_name": "full_name"}.get(sort, "created_at")
+        # 実際の API の既定は sort=created, direction=desc (新しい順)。同じ時刻は id で並びを安定させる
+        repos = sorted(repos, key=lambda r: (r[key], r["id"]), reverse=direction == "desc")
+        per_page = min(int(query.get("per_page", ["30"])[0]), 100)
+        page = max(int(query.get("page", ["1"])[0]), 1)
+        last = max((len(repos) + per_page - 1) // per_page, 1)
+        return repos[(page - 1) * per_page:page * per_page], page, last
+
+    def _link(self, path, query, page, last):
+        def url(n):
+            params = {k: v[0] for k, v in query.items()}
+            params["page"] = n
+            return f"{self.base_url}{path}?{urlencode(params)}"
+        links = []
+        if page < last:
+            links += [f'<{url(page + 1)}>; rel="next"', f'<{url(last)}>; rel="last"']
+        if page > 1:
+            links += [f'<{url(1)}>; rel="first"', f'<{url(page - 1)}>; rel="prev"']
+        return ", ".join(links)
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    self._handle()
+                finally:
+                    with server.lock:
+                        server._in_flight -= 1
+
+            def _handle(self):
+                if server.delay:
+                    time.sleep(server.delay)
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                query = parse_qs(url.query)
+                with server.lock:
+                    if time.time() >= server.reset_at:
+                        server.remaining = server.limit
+                        server.reset_at = int(time.time()) + server.reset_after
+                    org = parts[1] if len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repos" else None
+                    if org not in server.orgs:
+                        self._send(404, b'{"message": "Not Found"}')
+                        return
+                    repos, page, last = server._page(org, query)
+                    body = json.dumps(repos).encode()
+                    etag = 'W/"' + hashlib.sha1(body).hexdigest() + '"'
+                    not_modified = self.headers.get("If-None-Match") == etag
+                    if not not_modified:
+                        if server.remaining <= 0:
+                            server.rate_limited += 1
+                            self._send(403, b'{"message": "API rate limit exceeded"}', server._rate_headers())
+                            return
+                        server.remaining -= 1
+                    else:
+                        server.not_modified += 1
+                    headers = server._rate_headers() + [("ETag", etag)]
+                link = server._link(url.path, query, page, last)
+                if link:
+                    headers.append(("Link", link))
+                if not_modified:
+                    self._send(304, headers=headers)
+                else:
+                    self._send(200, body, headers + [("Content-Type", "application/json; charset=utf-8")])
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = _Server(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def _rate_headers(self):
+        return [
+            ("X-RateLimit-Limit", str(self.limit)),
+            ("X-RateLimit-Remaining", str(max(self.remaining, 0))),
+            ("X-RateLimit-Reset", str(self.reset_at)),
+            ("X-RateLimit-Used", str(self.limit - max(self.remaining, 0))),
+        ]
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
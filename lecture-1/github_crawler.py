@@ -0,0 +1,272 @@
+"""GitHub の Organization のリポジトリ一覧 (GET /orgs/{org}/repos) を並行して取得するクローラー
+
+scraping.ipynb は page=1, 2, ... を1ページずつ time.sleep(1) を挟んで取得し、実行のたびに全ページを取り直していた。
+ここでは
+1. 1ページ目の Link ヘッダー (rel="last") で最終ページを知り、残りのページをスレッドで並行して取得する
+2. 応答の X-RateLimit-Remaining / Reset を見て、残りのリクエスト数を超えないように送る数を抑える
+   (使い切ったらリセットの時刻まで待つ。待ち時間が長すぎれば RateLimitExceeded)
+3. ページごとの ETag と内容を SQLite (github_pages) に保存し、2回目以降は If-None-Match を付けて送る。
+   変わっていないページは 304 になり、GitHub のレート制限の回数にも数えられない
+を行う。複数の Organization をまとめて渡すと、同じスレッドプールとレート制限の枠で並行して取得する。
+DBへの書き込みは呼び出し元のスレッドだけが行う (Organization ごとに1回コミット)。
+
+使用例:
+    conn = sqlite3.connect("google_repos.db")
+    results = GitHubCrawler(conn, token=os.getenv("GH_TOKEN")).crawl(["google"])
+    results["google"].repos  # ページ順のリポジトリ (dict) のリスト
+"""
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+
+API_URL = "https://api.github.com"
+PER_PAGE = 100         # 1ページの件数 (API の上限)
+MAX_WORKERS = 8        # 同時に送るリクエストの上限
+MAX_WAIT = 60.0        # レート制限のリセットを待つ最大の秒数
+MAX_ATTEMPTS = 3       # レート制限で断られた時に送り直す回数
+
+
+class RateLimitExceeded(Exception):
+    """レート制限を使い切り、リセットまで MAX_WAIT より長く待つ必要がある"""
+
+    def __init__(self, reset):
+        super().__init__(f"GitHub API のレート制限を使い切りました (リセット: {datetime.fromtimestamp(reset):%H:%M:%S})")
+        self.reset = reset
+
+
+class RateBudget:
+    """X-RateLimit-Remaining / Reset から、あと何件リクエストを送ってよいかを管理する (スレッドセーフ)
+
+    送信中のリクエストも残り回数から差し引くので、並行して送っても残り回数を超えない。
+    304 は回数に数えられないが、送る前には分からないので1回分として予約する。
+    """
+
+    def __init__(self, reserve=0, max_wait=MAX_WAIT):
+        self.reserve = reserve      # 使わずに残しておく回数 (他のツール用)
+        self.max_wait = max_wait
+        self.remaining = None       # 最初の応答を受けるまでは分からない
+        self.reset = 0.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.remaining is None and self.in_flight or (
+                    self.remaining is not None and self.remaining - self.in_flight <= self.reserve):
+                if self.in_flight:
+                    # 送信中の応答で残り回数が分かるのを待つ (分からない間は1件ずつ送る)
+                    self._cond.wait()
+                    continue
+                delay = self.reset - time.time()
+                if delay <= 0:
+                    self.remaining = None
+                    break
+                if delay > self.max_wait:
+                    raise RateLimitExceeded(self.reset)
+                self._cond.wait(delay)
+            self.in_flight += 1
+
+    def release(self, headers=None):
+        with self._cond:
+            self.in_flight -= 1
+            if headers is not None:
+                self.update(headers)
+            self._cond.notify_all()
+
+    def update(self, headers):
+        remaining, reset = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        remaining, reset = int(remaining), float(reset)
+        if reset > self.reset or self.remaining is None:
+            self.remaining, self.reset = remaining, reset
+        elif reset == self.reset:
+            # 応答は順不同で届くので、同じ期間の値は小さい方を信じる
+            self.remaining = min(self.remaining, remaining)
+
+
+class PageCache:
+    """ページごとの ETag と内容 (JSON) を SQLite に保存する"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS github_pages(
+                listing    TEXT,       -- page 以外のパラメータを含むURL
+                page       INTEGER,
+                etag       TEXT,
+                last_page  INTEGER,    -- Link ヘッダーの rel="last" (1ページ目だけ)
+                body       TEXT,
+                fetched_at TEXT,
+                PRIMARY KEY (listing, page)
+            )""")
+
+    def get(self, listing, page):
+        """(ETag, 内容, 最終ページ)。保存されていなければ (None, None, None)"""
+        row = self.conn.execute("SELECT etag, body, last_page FROM github_pages WHERE listing = ? AND page = ?",
+                                (listing, page)).fetchone()
+        if row is None:
+            return None, None, None
+        return row[0], json.loads(row[1]), row[2]
+
+    def put(self, listing, page, etag, body, last_page):
+        self.conn.execute("""
+            INSERT INTO github_pages(listing, page, etag, last_page, body, fetched_at) VALUES (?,?,?,?,?,?)
+            ON CONFLICT(listing, page) DO UPDATE SET
+                etag = excluded.etag, last_page = excluded.last_page, body = excluded.body, fetched_at = excluded.fetched_at
+        """, (listing, page, etag, last_page, json.dumps(body), datetime.now().isoformat(timespec="seconds")))
+
+    def drop_after(self, listing, page):
+        """page より後ろのページを消す (リポジトリが減ってページ数が減った場合)"""
+        self.conn.execute("DELETE FROM github_pages WHERE listing = ? AND page > ?", (listing, page))
+
+
+class Page(NamedTuple):
+    number: int
+    status: int          # 200 または 304
+    etag: str
+    repos: list
+    last_page: int       # Link ヘッダーの rel="last" (無ければ None)
+
+
+class OrgCrawl(NamedTuple):
+    """1つの Organization の取得結果"""
+    org: str
+    repos: list          # ページ順のリポジトリ (同じ id は最初の1件だけ)
+    pages: int
+    not_modified: int    # 304 だったページ数
+    seconds: float
+
+
+def _page_of(url):
+    return int(parse_qs(urlparse(url).query).get("page", ["1"])[0])
+
+
+class GitHubCrawler:
+    def __init__(self, conn, token=None, base_url=API_URL, per_page=PER_PAGE, max_workers=MAX_WORKERS,
+                 budget=None, session=None, timeout=40):
+        self.cache = PageCache(conn)
+        self.conn = conn
+        self.base_url = base_url.rstrip("/")
+        self.per_page = per_page
+        self.max_workers = max_workers
+        self.budget = budget or RateBudget()
+        self.session = session or requests.Session()
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+        self.timeout = timeout
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def listing(self, org, **params):
+        """page を除いた一覧のURL (ページの保存のキーにもなる)"""
+        query = {"per_page": self.per_page, **params}
+        return f"{self.base_url}/orgs/{org}/repos?{urlencode(query)}"
+
+    def fetch_page(self, listing, number, etag=None, cached=None):
+        """1ページを取得する (cached は保存してある内容。304 ならそれを返す)。Page を返す"""
+        headers = {"If-None-Match": etag} if etag else {}
+        for attempt in range(MAX_ATTEMPTS):
+            self.budget.acquire()
+            response = None
+            try:
+                response = self.session.get(f"{listing}&page={number}", headers=headers, timeout=self.timeout)
+            finally:
+                self.budget.release(response.headers if response is not None else None)
+            with self._lock:
+                self.requests += 1
+            if response.status_code in (403, 429) and attempt + 1 < MAX_ATTEMPTS and (
+                    response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers):
+                # 使い切った: 次の acquire がリセットまで待つ (Retry-After があればその秒数だけ待つ)
+                retry_after = float(response.headers.get("Retry-After", 0))
+                if retry_after > MAX_WAIT:
+                    raise RateLimitExceeded(time.time() + retry_after)
+                time.sleep(retry_after)
+                continue
+            break
+        last = response.links.get("last", {}).get("url")
+        last_page = _page_of(last) if last else None
+        if response.status_code == 304:
+            return Page(number, 304, etag, cached, last_page)
+        response.raise_for_status()
+        return Page(number, 200, response.headers.get("ETag"), response.json(), last_page)
+
+    def crawl(self, orgs, on_page=None, **params):
+        """orgs の各 Organization の全ページを取得し、{org: OrgCrawl} を返す
+
+        params は一覧のパラメータ (sort, direction, type など)。on_page(org, Page) はページを受け取るたびに呼ばれる。
+        """
+        orgs = list(dict.fromkeys(orgs))
+        state = {org: {"listing": self.listing(org, **params), "pages": {}, "last": None, "known": False,
+                       "start": time.perf_counter()} for org in orgs}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+
+            def submit(org, number):
+                listing = state[org]["listing"]
+                etag, cached, _ = self.cache.get(listing, number)
+                future = pool.submit(self.fetch_page, listing, number, etag, cached)
+                pending[future] = org
+
+            for org in orgs:
+                submit(org, 1)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    org = pending.pop(future)
+                    page = future.result()
+                    org_state = state[org]
+                    org_state["pages"][page.number] = page
+                    if on_page is not None:
+                        on_page(org, page)
+                    if page.number == 1:
+                        # 最終ページ: 200 なら Link ヘッダー、304 で Link が無ければ前回の記録
+                        last = page.last_page
+                        if last is None and page.status == 304:
+                            last = self.cache.get(org_state["listing"], 1)[2]
+                        org_state["last"] = last or 1
+                        # 応答の Link ヘッダーで分かった最終ページは確か (前回の記録は古いかもしれない)
+                        org_state["known"] = page.last_page is not None or page.status == 200
+                        for number in range(2, org_state["last"] + 1):
+                            submit(org, number)
+                    elif page.number > org_state["last"] and page.repos:
+                        # 前回より増えたページ
+                        org_state["last"] = page.number
+                    if org in pending.values():
+                        continue
+                    last = org_state["last"]
+                    if (not org_state["known"] and len(org_state["pages"][last].repos) == self.per_page
+                            and last + 1 not in org_state["pages"]):
+                        # 前回の記録の最終ページが満杯なら、次のページがあるか確かめる
+                        submit(org, last + 1)
+                    else:
+                        results[org] = self._finish(org, org_state)
+        return results
+
+    def _finish(self, org, org_state):
+        listing, last, pages = org_state["listing"], org_state["last"], org_state["pages"]
+        with self.conn:
+            for number in range(1, last + 1):
+                page = pages[number]
+                if page.status == 200:
+                    self.cache.put(listing, number, page.etag, page.repos,
+                                   page.last_page if number == 1 else None)
+            self.cache.drop_after(listing, last)
+        repos, seen = [], set()
+        for number in range(1, last + 1):
+            for repo in pages[number].repos:
+                # 取得中にリポジトリが増えると、ページの境目の1件が2つのページに出ることがある
+                if repo["id"] not in seen:
+                    seen.add(repo["id"])
+                    repos.append(repo)
+        return OrgCrawl(org, repos, last, sum(1 for n in range(1, last + 1) if pages[n].status == 304),
+                        time.perf_counter() - org_state["start"])
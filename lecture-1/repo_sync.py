@@ -0,0 +1,203 @@
+"""repos テーブルを GitHub の一覧と同期する (まとめて upsert・削除の記録・差分だけの取得)
+
+scraping.ipynb は1件ずつ INSERT OR REPLACE していたため、再取得のたびに行が削除・再挿入されて
+AUTOINCREMENT の id が変わり、GitHub で削除されたリポジトリもいつまでも残っていた。ここでは
+1. ページごとの行をまとめて、1回の executemany で INSERT ... ON CONFLICT(name) DO UPDATE する。
+   値が変わった行だけを更新するので、変わっていない行は書き込まれず、id も変わらない
+2. 全件を取得した時 (full) に一覧に無かったリポジトリは、行を消さずに deleted_at を記録する (tombstone)。
+   再び一覧に現れたら deleted_at を消す
+3. GitHub の id と pushed_at を保存し、2回目以降は sort=pushed (新しい順) で前回より後に push された
+   リポジトリのページだけを取得する (incremental)。スター数の変化と削除は full の時に反映される
+を行う。既存の repos テーブル (id, name, language, stars) には足りない列を追加するだけで、既存の id はそのまま使う。
+既存の行は一覧にあれば同期で org と github_id が入る。一覧に無かった既存の行はどの Organization のものか
+分からないので、deleted_at を記録せずにそのまま残す (削除の記録は org が分かっている行だけ)。
+"""
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+FULL = "full"
+INCREMENTAL = "incremental"
+
+# 既存の repos テーブルに追加する列
+EXTRA_COLUMNS = {
+    "github_id": "INTEGER",
+    "org": "TEXT",
+    "pushed_at": "TEXT",
+    "deleted_at": "TEXT",
+}
+
+
+class SyncStats(NamedTuple):
+    """1つの Organization の同期の結果"""
+    org: str
+    mode: str            # FULL または INCREMENTAL
+    fetched: int         # 取得したリポジトリ数
+    inserted: int
+    updated: int         # 値が変わって書き換えた行 (tombstone からの復活を含む)
+    renamed: int         # GitHub で名前が変わった行
+    tombstoned: int      # 一覧から消えたので deleted_at を記録した行
+    pages: int
+    seconds: float
+
+
+def init_schema(conn):
+    """repos テーブル (無ければ作る) に同期用の列・索引と、同期の記録のテーブルを用意する"""
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS repos(
+            id       INTEGER PRIMARY KEY AUTOINCREMENT,
+            name     TEXT UNIQUE,
+            language TEXT,
+            stars    INTEGER
+        )""")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(repos)")}
+        for name, kind in EXTRA_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE repos ADD COLUMN {name} {kind}")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS repos_github_id ON repos(github_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS repos_org_pushed ON repos(org, pushed_at)")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS repo_sync(
+            org            TEXT PRIMARY KEY,
+            last_pushed_at TEXT,     -- 同期済みのリポジトリの最も新しい pushed_at
+            last_full_at   TEXT,
+            last_sync_at   TEXT
+        )""")
+
+
+# 値が変わった行 (または tombstone から復活した行) だけを更新する
+UPSERT = """
+INSERT INTO repos(name, language, stars, github_id, org, pushed_at, deleted_at)
+VALUES (?, ?, ?, ?, ?, ?, NULL)
+ON CONFLICT(name) DO UPDATE SET
+    language   = excluded.language,
+    stars      = excluded.stars,
+    github_id  = excluded.github_id,
+    org        = excluded.org,
+    pushed_at  = excluded.pushed_at,
+    deleted_at = NULL
+WHERE repos.language  IS NOT excluded.language
+   OR repos.stars     IS NOT excluded.stars
+   OR repos.github_id IS NOT excluded.github_id
+   OR repos.org       IS NOT excluded.org
+   OR repos.pushed_at IS NOT excluded.pushed_at
+   OR repos.deleted_at IS NOT NULL
+"""
+
+
+def _row(org, repo):
+    return (repo["name"], repo.get("language"), repo.get("stargazers_count"), repo["id"], org, repo.get("pushed_at"))
+
+
+def upsert_page(conn, org, repos):
+    """1ページ分のリポジトリをまとめて書き込み、(追加, 書き換え, 名前の変更) の行数を返す (呼び出し側のトランザクションの中で使う)"""
+    if not repos:
+        return 0, 0, 0
+    rows = [_row(org, repo) for repo in repos]
+    renamed = _rename(conn, rows)
+    names = [row[0] for row in rows]
+    existing = conn.execute(f"SELECT count(*) FROM repos WHERE name IN ({', '.join('?' * len(names))})",
+                            names).fetchone()[0]
+    before = conn.total_changes
+    conn.executemany(UPSERT, rows)
+    inserted = len(rows) - existing
+    return inserted, conn.total_changes - before - inserted, renamed
+
+
+def _rename(conn, rows):
+    """GitHub で名前が変わったリポジトリの行 (同じ github_id で名前が違う行) の名前を変え、その行数を返す
+
+    upsert の前に呼ぶ (name の一意制約で別の行として追加されないように)。名前を入れ替えたリポジトリがあっても
+    一意制約に反しないよう、一度仮の名前 (GitHub の名前に使えない空白で始まる) にしてから新しい名前にする。
+    新しい名前を持っている別の行 (削除済みのリポジトリや、github_id の無い以前の crawl の行) は古い行なので削除する。
+    """
+    before = conn.total_changes
+    conn.executemany("UPDATE repos SET name = ' renaming ' || github_id WHERE github_id = ? AND name != ?",
+                     [(row[3], row[0]) for row in rows])
+    renamed = conn.total_changes - before
+    if renamed:
+        moved = {github_id for github_id, in conn.execute("SELECT github_id FROM repos WHERE name GLOB ' renaming *'")}
+        targets = [(row[0], row[3]) for row in rows if row[3] in moved]
+        conn.executemany("DELETE FROM repos WHERE name = ? AND github_id IS NOT ?", targets)
+        conn.executemany("UPDATE repos SET name = ? WHERE github_id = ?", targets)
+    return renamed
+
+
+def _tombstone(conn, org, seen_ids, now):
+    """org のリポジトリのうち seen_ids に無いものに deleted_at を記録し、その行数を返す (upsert の後に呼ぶ)
+
+    org が NULL のまま残っている以前の crawl の行は、どの Organization のものか分からないので対象にしない。
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_repos(github_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM seen_repos")
+    conn.executemany("INSERT OR IGNORE INTO seen_repos VALUES (?)", [(i,) for i in seen_ids])
+    cur = conn.execute("""
+        UPDATE repos SET deleted_at = ?
+        WHERE deleted_at IS NULL AND org = ? AND github_id NOT IN (SELECT github_id FROM seen_repos)
+    """, (now, org))
+    return cur.rowcount
+
+
+def _watermark(conn, org):
+    row = conn.execute("SELECT last_pushed_at FROM repo_sync WHERE org = ?", (org,)).fetchone()
+    return row[0] if row else None
+
+
+def _record(conn, org, mode, pushed_at, now):
+    conn.execute("""
+        INSERT INTO repo_sync(org, last_pushed_at, last_full_at, last_sync_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(org) DO UPDATE SET
+            last_pushed_at = nullif(max(coalesce(repo_sync.last_pushed_at, ''), coalesce(excluded.last_pushed_at, '')), ''),
+            last_full_at   = coalesce(excluded.last_full_at, repo_sync.last_full_at),
+            last_sync_at   = excluded.last_sync_at
+    """, (org, pushed_at, now if mode == FULL else None, now))
+
+
+def fetch_pushed_since(crawler, org, since):
+    """sort=pushed (新しい順) で、pushed_at が since 以降のリポジトリを含むページだけを順に取得する。(リポジトリ, ページ数) を返す"""
+    listing = crawler.listing(org, sort="pushed", direction="desc")
+    repos, number = [], 1
+    with crawler.conn:
+        while True:
+            etag, cached, _ = crawler.cache.get(listing, number)
+            page = crawler.fetch_page(listing, number, etag, cached)
+            if page.status == 200:
+                crawler.cache.put(listing, number, page.etag, page.repos, page.last_page if number == 1 else None)
+            # 前回と同じ秒に push されたリポジトリを取りこぼさないよう、since ちょうどのものも含める
+            repos.extend(repo for repo in page.repos if (repo.get("pushed_at") or "") >= since)
+            # ページの最後が since より前なら、それより後ろのページは全て古い
+            if len(page.repos) < crawler.per_page or (page.repos[-1].get("pushed_at") or "") < since:
+                return repos, number
+            number += 1
+
+
+def sync_org(conn, crawler, org, full=None):
+    """org のリポジトリを repos テーブルに同期し、SyncStats を返す
+
+    full=None なら、初回 (同期の記録が無い) は全件、2回目以降は前回より後に push されたものだけを取得する。
+    full=True で全件を取得し、一覧から消えたリポジトリに deleted_at を記録する。
+    """
+    start = time.perf_counter()
+    init_schema(conn)
+    since = _watermark(conn, org)
+    mode = FULL if full or (full is None and since is None) else INCREMENTAL
+    if mode == FULL:
+        result = crawler.crawl([org])[org]
+        repos, pages = result.repos, result.pages
+    else:
+        repos, pages = fetch_pushed_since(crawler, org, since or "")
+
+    now = datetime.now().isoformat(timespec="seconds")
+    inserted = updated = renamed = tombstoned = 0
+    with conn:
+        for i in range(0, len(repos), crawler.per_page):
+            counts = upsert_page(conn, org, repos[i:i + crawler.per_page])
+            inserted += counts[0]
+            updated += counts[1]
+            renamed += counts[2]
+        if mode == FULL:
+            tombstoned = _tombstone(conn, org, [repo["id"] for repo in repos], now)
+        newest = max((repo.get("pushed_at") or "" for repo in repos), default=None)
+        _record(conn, org, mode, newest, now)
+    return SyncStats(org, mode, len(repos), inserted, updated, renamed, tombstoned, pages, time.perf_counter() - start)
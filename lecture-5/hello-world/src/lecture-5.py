@@ -1,156 +1,168 @@
+import os
+import sys
+
 import flet as ft
 import requests
-import datetime
 import json
 
+# 地域リスト・予報カード・通信などの部品は lecture-6 と共通なので、lecture-6/hello-world/src のモジュールを使う
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "lecture-6", "hello-world", "src"))
+
+from area_index import EMPTY_INDEX, AreaIndex
+from area_search import AreaSearchIndex, Debouncer
+from area_snapshot import load_snapshot, save_snapshot
+from forecast_cards import CardPool
+from forecast_cache import ForecastCache
+from forecast_parser import parse_forecast, report_age
+from forecast_worker import ForecastWorker
+from http_client import get_client
+from region_sidebar import RegionSidebar
+
 # --- 気象庁 API エンドポイント ---
-AREA_API_URL = "http://www.jma.go.jp/bosai/common/const/area.json" # 地域リスト取得用API
+AREA_API_URL = "https://www.jma.go.jp/bosai/common/const/area.json" # 地域リスト取得用API
 FORECAST_API_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/" # 天気予報取得用API
+SNAPSHOT_FILE = "area_snapshot.pickle" # 地域データのローカルスナップショット (起動直後の表示用)
+CARD_STYLE = {"height": 180, "elevation": 2, "bold_temps": True, "hide_missing_temps": True} # 予報カードの見た目
+SEARCH_DEBOUNCE = 0.15 # 地域検索: 入力が止まってから検索するまでの秒数
 
 # --- ヘルパー関数 ---
 
-def get_weather_icon(weather_str):
-    """天気文字列に基づいて適切なFletアイコンと色を返す関数"""
-    if "晴" in weather_str and "曇" not in weather_str and "雨" not in weather_str:
-        return ft.Icons.WB_SUNNY, "orange"
-    elif "雪" in weather_str:
-        return ft.Icons.AC_UNIT, "lightBlue"
-    elif "雨" in weather_str:
-        return ft.Icons.UMBRELLA, "blue"
-    elif "曇" in weather_str:
-        return ft.Icons.CLOUD, "grey"
-    else:
-        return ft.Icons.QUESTION_MARK, "black"
-
-def create_forecast_card(date_str, weather_str, temp_min_str=None, temp_max_str=None):
-    """天気予報の日ごとのカードを作成する関数"""
-    icon, icon_color = get_weather_icon(weather_str)
+class ForecastPanel:
+    """予報表示部分 (見出し・ロード中/エラー表示・カードの列)
+
+    コントロールは一度だけ作り、地域を切り替えた時は文字や表示/非表示だけを書き換える。
+    """
+
+    def __init__(self):
+        self.title = ft.Text(size=24, weight=ft.FontWeight.BOLD)
+        self.status_ring = ft.ProgressRing(visible=False)
+        self.status_text = ft.Text(size=16)
+        self.detail_text = ft.Text(size=12, color="grey", visible=False)
+        # 手元の予報を表示している間の目印 (発表からの経過時間・オフライン表示)
+        self.badge_text = ft.Text(size=12)
+        self.badge = ft.Container(self.badge_text, padding=ft.padding.symmetric(4, 10), border_radius=12, visible=False)
+        self.status = ft.Row([self.status_ring, self.status_text], visible=False)
+        self.cards_row = ft.Row(
+            wrap=True,
+            spacing=15,
+            alignment=ft.MainAxisAlignment.START,
+            scroll=ft.ScrollMode.ADAPTIVE
+        )
+        self.cards = CardPool(self.cards_row, **CARD_STYLE)
+        self.control = ft.Column(
+            [self.title, ft.Divider(), self.status, self.detail_text, self.badge, self.cards_row],
+            expand=True
+        )
+
+    def show_loading(self, region_name):
+        self.title.value = f"⚡️ {region_name}の天気予報"
+        self.status_ring.visible = True
+        self.status_text.value = f"『{region_name}』の天気予報を取得中..."
+        self.status_text.color = None
+        self.status.visible = True
+        self.detail_text.visible = False
+        self.badge.visible = False
+        self.cards_row.visible = False
+
+    def show_days(self, days):
+        """予報を表示する。書き換えたカードの枚数を返す (手元の予報と同じなら0)"""
+        changed = self.cards.show(days)
+        self.status.visible = False
+        self.detail_text.visible = False
+        self.badge.visible = False
+        self.cards_row.visible = True
+        return changed
+
+    def show_saved(self, region_name, days, reported):
+        """手元に残っている予報をすぐに表示し、最新の予報を確認中であることを示す"""
+        self.title.value = f"⚡️ {region_name}の天気予報"
+        self.show_days(days)
+        self.show_badge(f"💾 {report_age(reported)}の発表 ・ 最新の予報を確認中...", "blueGrey")
+
+    def show_badge(self, message, color):
+        self.badge_text.value = message
+        self.badge_text.color = color
+        self.badge.bgcolor = f"{color}50"
+        self.badge.visible = True
+
+    def show_error(self, message, detail=None):
+        self.status_ring.visible = False
+        self.status_text.value = message
+        self.status_text.color = "red"
+        self.status.visible = True
+        self.detail_text.value = detail
+        self.detail_text.visible = detail is not None
+
+def load_forecast_days(region_code, parent_office):
+    """予報JSONを取得し、日ごとの予報 (DailyForecast) のリストを返す関数 (バックグラウンドで実行)"""
+    # 同じ府県予報区のJSONはキャッシュから返す (期限切れ時は条件付きGETで再検証)
+    data = forecast_cache.get(parent_office)
     
-    temp_text_ui = ft.Text("")
-    if temp_min_str is not None and temp_max_str is not None:
-        temp_max_ui = ft.Text(f"{temp_max_str}℃", size=14, weight=ft.FontWeight.BOLD, color="red")
-        temp_min_ui = ft.Text(f"{temp_min_str}℃", size=14, weight=ft.FontWeight.BOLD, color="blue")
-        temp_text_ui = ft.Row([temp_min_ui, ft.Text("/", size=14), temp_max_ui], spacing=5)
-
-    return ft.Card(
-        content=ft.Container(
-            content=ft.Column(
-                [
-                    ft.Text(date_str, size=14, weight=ft.FontWeight.BOLD),
-                    ft.Text(weather_str.split("　")[0], size=12),
-                    ft.Icon(icon, size=36, color=icon_color),
-                    temp_text_ui,
-                ],
-                alignment=ft.MainAxisAlignment.CENTER,
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                spacing=5
-            ),
-            padding=10,
-            width=130,
-            height=180,
-            alignment=ft.alignment.center,
-        ),
-        elevation=2
-    )
+    # 該当エリアが無い場合は主要都市の天気・気温を使う (forecast_parser 側で処理)
+    return parse_forecast(data).daily(region_code)
 
-def fetch_weather_forecast(region_code, region_name, forecast_view, page):
-    """選択された地域の天気予報を取得・表示する関数"""
+def fetch_weather_forecast(region_code, region_name, forecast_view, forecast_panel, page):
+    """選択された地域の天気予報を取得・表示する関数
+
+    手元に同じ府県の予報があれば先にそれを表示し (無ければロード中表示)、通信はバックグラウンドで行ってすぐに戻る。
+    取得中に別の地域が選ばれた場合、古い地域の結果は描画されない。最初の表示も ForecastWorker の描画の順番で
+    行うので、前に選んだ地域の描画が後から上書きすることもない。
+    """
     
-    # 親のofficeコードを見つける
-    parent_office = region_code
-    for office_code, office_info in all_areas["offices"].items():
-        if region_code in office_info.get("children", []):
-            parent_office = office_code
-            break
+    # 親のofficeコードを見つける (地域データ読み込み時に作った逆引きインデックスを使う)
+    parent_office = area_index.office_for(region_code) or region_code
     
-    forecast_url = f"{FORECAST_API_BASE_URL}{parent_office}.json"
+    forecast_url = forecast_cache.url_for(parent_office)
     
-    # ロード中表示
-    forecast_view.content = ft.Row(
-        [ft.ProgressRing(), ft.Text(f"『{region_name}』の天気予報を取得中...", size=16)],
-        alignment=ft.MainAxisAlignment.CENTER,
-    )
-    page.update()
+    # 同じ府県のJSONが手元にあれば (期限切れでも) 通信を待たずに表示し、なければロード中表示
+    # (初回だけ予報表示部分を画面に追加し、以降は中身だけを書き換える)
+    saved = forecast_cache.peek(parent_office)
+    forecast = parse_forecast(saved) if saved is not None else None
+
+    def show_pending():
+        if forecast is not None:
+            forecast_panel.show_saved(region_name, forecast.daily(region_code), forecast.report_datetime)
+        else:
+            forecast_panel.show_loading(region_name)
+        forecast_view.content = forecast_panel.control
+        page.update()
     
-    try:
-        response = requests.get(forecast_url)
-        response.raise_for_status()
-        data = response.json()
-        
-        time_defines = data[0]['timeSeries'][0]['timeDefines']
-        
-        # 該当エリアのデータを取得
-        weather_data = None
-        for area in data[0]['timeSeries'][0]['areas']:
-            if area['area']['code'] == region_code:
-                weather_data = area
-                break
-        
-        if not weather_data:
-            # 主要都市のデータを使用
-            weather_data = data[0]['timeSeries'][0]['areas'][0]
-        
-        # 気温データの取得
-        temp_data = None
-        if len(data) > 1 and len(data[1]['timeSeries']) > 1:
-            for area in data[1]['timeSeries'][1]['areas']:
-                if area['area']['code'] == region_code:
-                    temp_data = area
-                    break
-            
-            if not temp_data:
-                # 該当エリアがない場合は主要都市のデータを使用
-                temp_data = data[1]['timeSeries'][1]['areas'][0]
-
-        forecast_cards = []
-        
-        for i in range(len(time_defines)):
-            date_obj = datetime.datetime.fromisoformat(time_defines[i])
-            date_str = date_obj.strftime("%Y-%m-%d")
-            
-            weather_str = weather_data['weathers'][i] if i < len(weather_data['weathers']) else "情報なし"
-            
-            temp_min_str = None
-            temp_max_str = None
-            if temp_data and 'tempsMin' in temp_data and i < len(temp_data['tempsMin']):
-                temp_min_str = temp_data['tempsMin'][i]
-            if temp_data and 'tempsMax' in temp_data and i < len(temp_data['tempsMax']):
-                temp_max_str = temp_data['tempsMax'][i]
-            
-            forecast_cards.append(create_forecast_card(date_str, weather_str, temp_min_str, temp_max_str))
-
-        forecast_view.content = ft.Column(
-            [
-                ft.Text(f"⚡️ {region_name}の天気予報", size=24, weight=ft.FontWeight.BOLD),
-                ft.Divider(),
-                ft.Row(
-                    forecast_cards,
-                    wrap=True,
-                    spacing=15,
-                    alignment=ft.MainAxisAlignment.START,
-                    scroll=ft.ScrollMode.ADAPTIVE
-                )
-            ],
-            expand=True
-        )
+    def show_forecast(days):
+        # 手元の予報と同じならカードは書き換えず、目印だけを消す
+        forecast_panel.show_days(days)
         page.update()
 
-    except requests.exceptions.RequestException as e:
-        forecast_view.content = ft.Text(f"天気予報の取得に失敗しました (API通信エラー): {e}", color="red")
-        page.update()
-    except Exception as e:
-        forecast_view.content = ft.Column([
-            ft.Text(f"予報データの解析中にエラーが発生しました: {type(e).__name__}: {e}", color="red"),
-            ft.Text(f"詳細: {forecast_url}", size=12, color="grey")
-        ])
+    def show_error(e):
+        if saved is not None:
+            # 通信できなくても、手元の予報を表示したままにする
+            forecast_panel.show_badge(
+                f"⚠ オフライン: {report_age(forecast.report_datetime)}の発表を表示しています ({type(e).__name__})",
+                "orange")
+        elif isinstance(e, requests.exceptions.RequestException):
+            forecast_panel.show_error(f"天気予報の取得に失敗しました (API通信エラー): {e}")
+        else:
+            forecast_panel.show_error(f"予報データの解析中にエラーが発生しました: {type(e).__name__}: {e}",
+                                      f"詳細: {forecast_url}")
         page.update()
 
+    forecast_worker.submit(lambda: load_forecast_days(region_code, parent_office), show_forecast, show_error,
+                           preview=show_pending)
+
 # --- メイン関数 ---
 all_areas = {}  # グローバル変数として定義
+area_index = EMPTY_INDEX  # 地域コード → officeコードの逆引き (all_areas と一緒に更新する)
+area_search = AreaSearchIndex({})  # 地域名・よみがなの検索インデックス (all_areas と一緒に更新する)
+forecast_cache = ForecastCache(FORECAST_API_BASE_URL)  # officeコードごとの予報JSONキャッシュ
+forecast_worker = ForecastWorker()  # 予報取得をUIスレッドから切り離す (連続クリック時は最後の地域だけを描画)
+
+def set_area_data(areas):
+    """地域データを差し替え、逆引きインデックスと検索インデックスを作り直す関数"""
+    global all_areas, area_index, area_search
+    all_areas = areas
+    area_index = AreaIndex(areas)
+    area_search = AreaSearchIndex(areas)
 
 def main(page: ft.Page):
-    global all_areas
-    
     # 初期設定
     page.title = "天気予報アプリ"
     page.vertical_alignment = ft.MainAxisAlignment.START
@@ -161,19 +173,14 @@ def main(page: ft.Page):
     page.spacing = 0
     
     # --- イベントハンドラ ---
-    def handle_region_click(e):
+    def handle_region_select(region_code, region_name):
         """地域がクリックされたときの処理"""
-        selected_region_code = e.control.data 
-        if isinstance(e.control.title, ft.Text):
-            region_name = e.control.title.value
-        else:
-            region_name = "選択地域"
-        
-        fetch_weather_forecast(selected_region_code, region_name, forecast_view, page)
+        fetch_weather_forecast(region_code, region_name, forecast_view, forecast_panel, page)
 
     # --- UI要素の定義 ---
 
-    # 天気予報を表示するコンテナ
+    # 天気予報を表示するコンテナ (最初の地域が選ばれたら forecast_panel に切り替える)
+    forecast_panel = ForecastPanel()
     forecast_view = ft.Container(
         content=ft.Text("左側の地域リストから、予報を見たい地域を選択してください。", size=16, color="grey"),
         expand=True,
@@ -215,96 +222,99 @@ def main(page: ft.Page):
     
     
     # --- 地域リストの生成ロジック ---
-    def create_region_list(centers, offices, class10s):
-        """地域APIデータから階層的なリストビューを生成する"""
-        
-        region_controls = [
+    # 府県予報区・class10地域のタイルは、親のタイルが開かれた時に初めて作る
+    region_sidebar = RegionSidebar(handle_region_select, decorated=True)
+    region_tree = []  # 検索していない時に表示する地方のタイル
+
+    def region_controls():
+        """検索欄が空なら地域リストを、入力があれば検索結果を並べる"""
+        header = [
             ft.Text("地域を選択", size=18, weight=ft.FontWeight.BOLD),
+            search_field,
             ft.Divider(height=10)
         ]
+        query = search_field.value or ""
+        if not query.strip():
+            return header + region_tree
+        matches = area_search.search(query)
+        if not matches:
+            return header + [ft.Text("該当する地域がありません", color="grey")]
+        return header + region_sidebar.build_results(matches)
 
-        # 地方のExpansionTileを作成
-        for center_code, center_info in centers.items():
-            child_tiles = []
-            
-            # 各地方に含まれる予報区を追加
-            for child_code in center_info.get("children", []):
-                if child_code in offices:
-                    office_name = offices[child_code]["name"]
-                    
-                    # 府県予報区を都道府県ごとに分類
-                    pref_tiles = []
-                    for class10_code in offices[child_code].get("children", []):
-                        if class10_code in class10s:
-                            class10_name = class10s[class10_code]["name"]
-                            
-                            tile = ft.ListTile(
-                                title=ft.Text(class10_name),
-                                leading=ft.Icon(ft.Icons.LOCATION_ON),
-                                on_click=handle_region_click,
-                                data=class10_code
-                            )
-                            pref_tiles.append(tile)
-                    
-                    # 府県予報区をExpansionTileとして追加
-                    if pref_tiles:
-                        child_tiles.append(
-                            ft.ExpansionTile(
-                                title=ft.Text(office_name),
-                                leading=ft.Icon(ft.Icons.MAP),
-                                controls=pref_tiles
-                            )
-                        )
-            
-            # 地方のExpansionTileを追加 (expanded引数を削除)
-            if child_tiles:
-                expansion_tile = ft.ExpansionTile(
-                    title=ft.Text(center_info["name"], weight=ft.FontWeight.BOLD),
-                    leading=ft.Icon(ft.Icons.TERRAIN),
-                    controls=child_tiles
-                )
-                region_controls.append(expansion_tile)
-        
-        return ft.Column(
-            region_controls,
-            scroll=ft.ScrollMode.ADAPTIVE,
-            spacing=0,
-            expand=True
-        )
+    def handle_search():
+        """検索欄の入力に合わせて地域リストを差し替える"""
+        region_list_view.controls = region_controls()
+        page.update()
+
+    # キー入力のたびではなく、入力が止まってから一度だけ検索・描画する
+    search_debouncer = Debouncer(SEARCH_DEBOUNCE, handle_search)
+    search_field = ft.TextField(
+        hint_text="地域名・よみがなで検索",
+        prefix_icon=ft.Icons.SEARCH,
+        dense=True,
+        on_change=lambda e: search_debouncer(),
+        on_submit=lambda e: handle_search(),
+    )
+
+    # ListView は画面に見えている部分だけを描画する
+    region_list_view = ft.ListView(spacing=0, expand=True)
+
+    def create_region_list(all_areas):
+        """地域APIデータから階層的なリストビューを生成する"""
+        region_tree[:] = region_sidebar.build(all_areas)
+        region_list_view.controls = region_controls()
+        return region_list_view
 
 
     # --- データロード関数 ---
-    def load_area_data():
-        """気象庁APIから地域データを取得し、UIを構築する関数"""
-        global all_areas
+    def show_region_list():
+        """all_areas から地域リストのUIを生成して画面を更新する"""
+        new_region_list = create_region_list(all_areas)
+
+        # 既存のプレースホルダーを新しい地域リストで置き換えて画面を更新
+        region_list_column_container.content = new_region_list
+        page.update()
+
+    def refresh_area_data():
+        """気象庁APIから最新の地域データを取得し、スナップショットを更新する関数 (バックグラウンドで実行)"""
+        first_load = not all_areas
         
         try:
             # APIから地域リストを取得
-            response = requests.get(AREA_API_URL)
+            response = get_client().get(AREA_API_URL) # 共有の接続プールを使う (タイムアウト・再試行付き)
             response.raise_for_status()
-            all_areas = response.json()
-            
-            # 地域リストのUIを生成
-            centers = all_areas.get("centers", {})
-            offices = all_areas.get("offices", {})
-            class10s = all_areas.get("class10s", {})
-            
-            new_region_list = create_region_list(centers, offices, class10s)
-
-            # 既存のプレースホルダーを新しい地域リストで置き換えて画面を更新
-            region_list_column_container.content = new_region_list
-            
-            # デフォルト地域として東京を表示
-            fetch_weather_forecast("130000", "東京", forecast_view, page)
-            
-            page.update()
-
+            fresh_areas = save_snapshot(response.json(), SNAPSHOT_FILE)
         except requests.exceptions.RequestException as e:
-            region_list_column_container.content = ft.Text(f"地域データの取得に失敗しました (API通信エラー): {e}", color="red")
-            page.update()
+            # スナップショットで表示できていれば、そのまま使い続ける
+            if first_load:
+                region_list_column_container.content = ft.Text(f"地域データの取得に失敗しました (API通信エラー): {e}", color="red")
+                page.update()
+            return
         except Exception as e:
-            region_list_column_container.content = ft.Text(f"予期せぬエラーが発生しました: {type(e).__name__}: {e}", color="red")
-            page.update()
+            if first_load:
+                region_list_column_container.content = ft.Text(f"予期せぬエラーが発生しました: {type(e).__name__}: {e}", color="red")
+                page.update()
+            return
+
+        # 内容が変わった時だけ地域リストを作り直す
+        if fresh_areas != all_areas:
+            set_area_data(fresh_areas)
+            show_region_list()
+        
+        if first_load:
+            # デフォルト地域として東京を表示
+            fetch_weather_forecast("130000", "東京", forecast_view, forecast_panel, page)
+
+    def load_area_data():
+        """地域データを読み込み、UIを構築する関数 (前回のスナップショットがあれば通信を待たずに表示する)"""
+        snapshot = load_snapshot(SNAPSHOT_FILE)
+        if snapshot:
+            set_area_data(snapshot)
+            show_region_list()
+            # デフォルト地域として東京を表示
+            fetch_weather_forecast("130000", "東京", forecast_view, forecast_panel, page)
+        
+        page.run_thread(refresh_area_data)
 
     # アプリ起動時に地域データをロード
     load_area_data()
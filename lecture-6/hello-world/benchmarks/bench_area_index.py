@@ -0,0 +1,58 @@
+"""親office検索のマイクロベンチマーク: offices の線形走査 vs AreaIndex
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_area_index.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from area_index import AreaIndex
+from fake_jma import generate_area_data
+
+REPEAT = 20
+
+
+def linear_scan(all_areas, region_code):
+    """変更前の fetch_weather と同じ探し方"""
+    parent_office = region_code
+    for office_code, office_info in all_areas.get("offices", {}).items():
+        if region_code in office_info.get("children", []):
+            parent_office = office_code
+            break
+    return parent_office
+
+
+def bench(label, func, codes):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for code in codes:
+            func(code)
+    elapsed = time.perf_counter() - start
+    n = REPEAT * len(codes)
+    print(f"  {label:24}: {elapsed / n * 1e9:9.1f} ns/lookup")
+
+
+def main():
+    all_areas = generate_area_data()
+
+    start = time.perf_counter()
+    index = AreaIndex(all_areas)
+    print(f"インデックス構築: {(time.perf_counter() - start) * 1000:.2f} ms ({len(index)} コード)")
+
+    class10s = list(all_areas["class10s"])
+    all_codes = class10s + list(all_areas["class15s"]) + list(all_areas["class20s"])
+    assert all(index.office_for(c) == linear_scan(all_areas, c) for c in class10s)
+
+    print(f"class10 全 {len(class10s)} コード:")
+    bench("線形走査 (旧)", lambda c: linear_scan(all_areas, c), class10s)
+    bench("AreaIndex.office_for", index.office_for, class10s)
+    print(f"class10/15/20 全 {len(all_codes)} コード:")
+    bench("AreaIndex.office_for", index.office_for, all_codes)
+    bench("AreaIndex.codes_for_name", index.codes_for_name, [index.name_of[c] for c in all_codes])
+
+
+if __name__ == "__main__":
+    main()
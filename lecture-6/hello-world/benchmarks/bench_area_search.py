@@ -0,0 +1,54 @@
+"""地域検索のマイクロベンチマーク: all_areas の全件走査 vs AreaSearchIndex
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_area_search.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from area_search import SEARCH_LEVELS, AreaSearchIndex, normalize
+from fake_jma import generate_area_data
+
+REPEAT = 200
+# 1文字・前方一致・部分一致・よみがな・該当なし
+QUERIES = ["県", "県1", "県12北", "北部", "地方3", "しちょう", "シチョウソン", "市町村01", "存在しない地域"]
+
+
+def full_scan(all_areas, query):
+    """インデックスを使わず、キー入力のたびに全地域の名前と読みを調べる"""
+    query = normalize(query.strip())
+    hits = []
+    for level in SEARCH_LEVELS:
+        for code, info in all_areas.get(level, {}).items():
+            if query in normalize(info["name"]) or query in normalize(info.get("kana", "")):
+                hits.append(code)
+    return hits
+
+
+def bench(func, query):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(query)
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+def main():
+    all_areas = generate_area_data()
+
+    start = time.perf_counter()
+    index = AreaSearchIndex(all_areas)
+    print(f"インデックス構築: {(time.perf_counter() - start) * 1000:.2f} ms ({len(index.entries)} 地域)")
+
+    print(f"{'クエリ':14} {'件数':>6} {'全件走査':>12} {'インデックス':>12}")
+    for query in QUERIES:
+        hits = full_scan(all_areas, query)
+        scan_us = bench(lambda q: full_scan(all_areas, q), query)
+        index_us = bench(index.search, query)
+        print(f"{query:14} {len(hits):6d} {scan_us:9.1f} µs {index_us:9.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
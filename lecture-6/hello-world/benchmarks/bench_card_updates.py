@@ -0,0 +1,83 @@
+"""予報カードの更新コストのベンチマーク: 地域ごとにカードを作り直す vs CardPool で使い回す
+
+地域を次々に切り替えたとき、1回の page.update() で送るコマンドのバイト数と、
+カードの書き換え + コマンド生成 + シリアライズにかかる時間を比べる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_card_updates.py
+"""
+import os
+import statistics
+import sys
+import time
+
+import flet as ft
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import generate_area_data, generate_forecast
+from flet_payload import UpdateRecorder
+from forecast_cards import CardPool, ForecastCard
+from forecast_parser import parse_forecast
+
+SWITCHES = 200
+REPORT_DATETIME = "2025-01-01T11:00:00+09:00"
+
+
+def region_days(all_areas, count):
+    """地域を切り替えた時に表示する日ごとの予報のリスト"""
+    forecasts = {}
+    result = []
+    class10s = list(all_areas["class10s"])
+    for i in range(count):
+        code = class10s[(i * 7) % len(class10s)]
+        office = all_areas["class10s"][code]["parent"]
+        if office not in forecasts:
+            forecasts[office] = parse_forecast(generate_forecast(office, all_areas, REPORT_DATETIME))
+        result.append(forecasts[office].daily(code))
+    return result
+
+
+def rebuild(row, days):
+    """変更前: 新しいカードを作って row.controls を丸ごと置き換える"""
+    cards = []
+    for day in days:
+        card = ForecastCard()
+        card.set(day.date, day.weather, day.temp_min, day.temp_max, day.weather_code)
+        cards.append(card.control)
+    row.controls = cards
+
+
+def measure(label, sequence, render):
+    row = ft.Row(wrap=True, spacing=15)
+    recorder = UpdateRecorder(ft.Column([row]))
+    render(row, sequence[0])
+    recorder.update()
+
+    sizes, times = [], []
+    for days in sequence[1:]:
+        start = time.perf_counter()
+        render(row, days)
+        sizes.append(recorder.update())
+        times.append(time.perf_counter() - start)
+    print(f"  {label:16}: 平均 {statistics.mean(sizes) / 1024:6.2f} KiB/回  "
+          f"中央値 {statistics.median(times) * 1e6:8.1f} µs/回  (最大 {max(sizes) / 1024:.2f} KiB)")
+
+
+def main():
+    all_areas = generate_area_data()
+    sequence = region_days(all_areas, SWITCHES)
+    print(f"{SWITCHES} 回の地域切り替え ({len(sequence[0])} 日分のカード):")
+    measure("作り直し (旧)", sequence, rebuild)
+    pool = {}
+
+    def reuse(row, days):
+        if row not in pool:
+            pool[row] = CardPool(row)
+        pool[row].show(days)
+
+    measure("CardPool", sequence, reuse)
+
+
+if __name__ == "__main__":
+    main()
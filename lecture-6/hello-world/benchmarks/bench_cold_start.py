@@ -0,0 +1,53 @@
+"""起動時の地域データ準備時間のベンチマーク: area.json の取得 vs ローカルスナップショット
+
+サイドバーを描画できるようになるまで (= 最初の描画に必要なデータが揃うまで) の時間を測る。
+気象庁APIの代わりに応答遅延つきのローカルサーバーを使う。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_cold_start.py
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from area_snapshot import load_snapshot, save_snapshot
+from fake_jma import FakeJMAServer
+
+REPEAT = 20
+LATENCIES = (0.0, 0.2, 1.0)  # 模擬するネットワーク遅延 (秒)
+
+
+def time_network(url):
+    start = time.perf_counter()
+    res = requests.get(url)
+    res.raise_for_status()
+    res.json()
+    return time.perf_counter() - start
+
+
+def time_snapshot(path):
+    start = time.perf_counter()
+    assert load_snapshot(path)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "area_snapshot.pickle")
+        for latency in LATENCIES:
+            with FakeJMAServer(delay=latency) as server:
+                save_snapshot(requests.get(server.area_url).json(), path)
+                network = statistics.median(time_network(server.area_url) for _ in range(REPEAT))
+            snapshot = statistics.median(time_snapshot(path) for _ in range(REPEAT))
+            print(f"遅延 {latency:4.1f}s: area.json取得 {network * 1000:8.2f} ms / スナップショット {snapshot * 1000:6.2f} ms")
+        print(f"スナップショットのサイズ: {os.path.getsize(path) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
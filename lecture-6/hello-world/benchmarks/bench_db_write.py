@@ -0,0 +1,74 @@
+"""予報保存のベンチマーク: 旧来の1行ごとの接続・コミット vs WeatherStoreの一括書き込み
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_db_write.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from weather_store import WeatherStore
+
+N_FETCHES = 200   # 地域クリック回数に相当
+DAYS = 7          # 1回の予報に含まれる日数
+
+
+def make_rows(fetch_no):
+    code = f"{130000 + fetch_no:06d}"
+    return [(code, "東京都", f"2025-01-{d + 1:02d}", "晴れ", "12", "3") for d in range(DAYS)]
+
+
+def legacy_save(db_name, area_code, area_name, date_str, weather, t_max, t_min):
+    """変更前の save_forecast_to_db と同じ処理 (1行ごとに接続・コミット)"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT OR REPLACE INTO weather_forecasts (area_code, area_name, date, weather, temp_max, temp_min)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (area_code, area_name, date_str, weather, t_max, t_min))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bench_legacy(db_name):
+    WeatherStore(db_name).close()  # テーブル作成のみ
+    # 旧来のDBはデフォルトのrollback journalなので、それに合わせる
+    with sqlite3.connect(db_name) as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+    start = time.perf_counter()
+    for n in range(N_FETCHES):
+        for row in make_rows(n):
+            legacy_save(db_name, *row)
+    return time.perf_counter() - start
+
+
+def bench_store(db_name):
+    store = WeatherStore(db_name)
+    start = time.perf_counter()
+    for n in range(N_FETCHES):
+        store.save_forecasts(make_rows(n), "2025-01-01T11:00:00+09:00")
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed
+
+
+def main():
+    total_rows = N_FETCHES * DAYS
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = bench_legacy(os.path.join(tmp, "legacy.db"))
+        batched = bench_store(os.path.join(tmp, "store.db"))
+
+    print(f"{total_rows} 行 ({N_FETCHES} 回 x {DAYS} 日)")
+    print(f"  1行ごと (旧)        : {legacy:8.3f} s  {total_rows / legacy:10.0f} rows/s")
+    print(f"  一括 (WeatherStore): {batched:8.3f} s  {total_rows / batched:10.0f} rows/s")
+    print(f"  高速化: {legacy / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
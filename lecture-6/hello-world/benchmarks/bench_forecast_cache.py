@@ -0,0 +1,107 @@
+"""予報JSONのキャッシュ (ForecastCache) の動作の確認と計測
+
+偽の気象庁サーバーに対して、時計を差し替えた ForecastCache で
+- TTL内の再取得はメモリから返し、サーバーに問い合わせないこと (hit)
+- TTLを過ぎたら条件付きGETで再検証し、発表が同じなら 304 で本文を受け取らないこと (revalidation)
+- 発表が変わっていれば新しいJSONに置き換え、古い発表が返ってきた時は手元の新しい予報を使い続けること (refresh)
+- max_entries を超えたら最も長く使われていないofficeから追い出すこと (LRU)
+を確認し、miss / hit / 304 の所要時間を比べる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_forecast_cache.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import FakeJMAServer
+from forecast_cache import ForecastCache, get_report_datetime
+from http_client import HttpClient, create_session
+
+DELAY = 0.05  # サーバーの応答遅延 (秒)
+TTL = 600
+
+
+class FakeClock:
+    """ForecastCache の clock に渡す、手で進める時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return value, time.perf_counter() - start
+
+
+def main():
+    with FakeJMAServer(delay=DELAY) as server:
+        offices = list(server.area_data["offices"])[:4]
+        clock = FakeClock()
+        cache = ForecastCache(server.forecast_base_url, ttl=TTL, max_entries=3,
+                              session=HttpClient(create_session(retries=0)), clock=clock)
+        office = offices[0]
+
+        # miss → TTL内の hit (サーバーへの問い合わせなし)
+        first, miss_time = timed(cache.get, office)
+        requests = server.requests
+        again, hit_time = timed(cache.get, office)
+        assert again is first and server.requests == requests
+        assert cache.get_stats()["misses"] == 1 and cache.get_stats()["hits"] == 1
+
+        # TTL切れ・発表が同じ → 304 で再検証し、本文は受け取らない
+        clock.advance(TTL + 1)
+        received = cache.get_stats()["bytes"]
+        revalidated, revalidate_time = timed(cache.get, office)
+        stats = cache.get_stats()
+        assert revalidated is first and server.not_modified == 1
+        assert stats["revalidations"] == 1 and stats["bytes"] == received
+        # 再検証した時刻から TTL が数え直される
+        clock.advance(TTL - 1)
+        assert cache.get(office) is first and cache.get_stats()["revalidations"] == 1
+
+        # TTL切れ・発表が変わった → 新しいJSONに置き換える
+        server.set_report_datetime("2025-01-01T17:00:00+09:00", offices=[office])
+        clock.advance(TTL + 1)
+        refreshed = cache.get(office)
+        assert get_report_datetime(refreshed) == "2025-01-01T17:00:00+09:00"
+        assert cache.get_stats()["refreshes"] == 1
+
+        # 配信側の反映遅れで古い発表が返ってきた → 手元の新しい予報を使い続ける
+        server.set_report_datetime("2025-01-01T11:00:00+09:00", offices=[office])
+        clock.advance(TTL + 1)
+        assert cache.get(office) is refreshed and cache.get_stats()["refreshes"] == 2
+
+        # LRU: 3件まで。office を使い直してから4件目を入れると、最も古い offices[1] が追い出される
+        cache.get(offices[1])
+        cache.get(offices[2])
+        cache.get(office)
+        cache.get(offices[3])
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1 and stats["size"] == 3
+        assert list(cache.entries) == [offices[2], office, offices[3]]
+        assert cache.peek(offices[1]) is None and cache.peek(office) is refreshed
+        requests = server.requests
+        cache.get(offices[1])  # 追い出されたので取得し直す (miss)
+        assert server.requests == requests + 1 and cache.get_stats()["misses"] == stats["misses"] + 1
+
+    print(f"応答遅延 {DELAY}s のサーバーに対する ForecastCache.get")
+    print(f"  miss (取得)         : {miss_time * 1000:8.2f} ms")
+    print(f"  hit (TTL内)         : {hit_time * 1000:8.3f} ms")
+    print(f"  304 (TTL切れ・同じ発表): {revalidate_time * 1000:8.2f} ms (本文 0 bytes)")
+    print(f"  統計: {cache.get_stats()}")
+    assert hit_time < DELAY / 10, "hit でサーバーを待っている"
+    print("hit・304 の再検証・発表の更新・LRU の追い出しがすべて期待どおりでした")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""予報の履歴の書き出し (.npy + メモリマップ) と、SQLiteから読む場合のベンチマーク
+
+数年分 × 全class10地域の合成DBで、
+- 全件の書き出し・新しい発表だけの追記の所要時間 (行/秒)
+- 1年分の「天気カテゴリごとの平均最高気温」(地域・日付ごとの最新版): SQLiteから1行ずつ読む / メモリマップ
+- 全行の走査 (最高気温の平均): SQL の AVG(CAST ...) / NumPy
+を比べ、追記した結果が全件の書き出し直しと一致することを確認する。
+書き出しの後に、書き出し済みと同じ発表時刻・より古い発表時刻の別の地域が保存された場合に、その行が追記されること、
+--full が出力先のほかのファイルを消さないことも確かめる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_history_export.py
+"""
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import WEATHERS, generate_area_data
+from history_export import COLUMNS, HistoryArchive, export_history
+from weather_classifier import CATEGORY_NAMES, category_of
+from weather_store import WeatherStore
+
+YEARS = 2
+APPEND_DAYS = 30
+START = datetime.date(2023, 1, 1)
+
+
+def fill(store, areas, first_day, days, rng):
+    """毎日2回の発表 (05時・17時) で、その日から3日分の予報を書き込む"""
+    for d in range(days):
+        day = first_day + datetime.timedelta(days=d)
+        for hour in (5, 17):
+            rows = [(code, name, (day + datetime.timedelta(days=k)).isoformat(), rng.choice(WEATHERS),
+                     str(rng.randint(0, 35)) if k else "", str(rng.randint(-10, 25)))
+                    for code, name in areas for k in range(3)]
+            store.save_reports([(f"{day.isoformat()}T{hour:02d}:00:00+09:00", rows)])
+
+
+def check_late_reports(tmp):
+    """東京 (17時の発表) を書き出した後に、同じ発表時刻の大阪・より古い11時の発表の福岡を保存して書き出し直す"""
+    db = os.path.join(tmp, "late_report.db")
+    out = os.path.join(tmp, "late_report_npy")
+    store = WeatherStore(db)
+    report = "2024-06-01T17:00:00+09:00"
+    store.save_reports([(report, [("130010", "東京地方", "2024-06-02", "晴れ", "28", "20")])])
+    assert export_history(db, out) == 1
+    store.save_reports([(report, [("270000", "大阪府", "2024-06-02", "くもり", "27", "21")])])
+    same = export_history(db, out)
+    store.save_reports([("2024-06-01T11:00:00+09:00", [("400010", "福岡地方", "2024-06-02", "雨", "25", "22")])])
+    older = export_history(db, out)
+    again = export_history(db, out)
+    archive = HistoryArchive(out)
+    stored = store.conn.execute("SELECT COUNT(*) FROM forecast_history").fetchone()[0]
+    store.close()
+    print(f"書き出しの後に保存: 同じ発表時刻 追記 {same} 行, 古い発表時刻 追記 {older} 行, 再実行 {again} 行 "
+          f"(書き出し {archive.rows} 行 / DB {stored} 行)")
+    assert same == 1 and older == 1 and again == 0 and archive.rows == stored == 3
+    assert set(archive.area_codes(archive.columns["area"])) == {"130010", "270000", "400010"}
+
+    # --full は列の .npy と meta.json だけを書き直し、出力先のほかのファイルは残す
+    note = os.path.join(out, "README.txt")
+    with open(note, "w", encoding="utf-8") as f:
+        f.write("keep\n")
+    assert export_history(db, out, full=True) == 3 and os.path.exists(note)
+
+
+def check_legacy_db(tmp):
+    """seq 列の無い forecast_history (以前のDB) からでも書き出せる (保存時刻の順に番号が振られる)"""
+    db = os.path.join(tmp, "legacy.db")
+    store = WeatherStore(db)
+    store.save_reports([("2024-06-01T05:00:00+09:00", [("130010", "東京地方", "2024-06-01", "晴れ", "28", "20")])])
+    store.close()
+    conn = sqlite3.connect(db)
+    conn.executescript("DROP TABLE history_seq; DROP INDEX idx_history_seq; ALTER TABLE forecast_history DROP COLUMN seq;")
+    conn.close()
+    assert export_history(db, os.path.join(tmp, "legacy_npy")) == 1
+    store = WeatherStore(db)
+    store.save_reports([("2024-06-01T17:00:00+09:00", [("130010", "東京地方", "2024-06-02", "雨", "24", "19")])])
+    seqs = [row[0] for row in store.conn.execute("SELECT seq FROM forecast_history ORDER BY report_datetime")]
+    store.close()
+    assert seqs == [1, 2], seqs
+    assert export_history(db, os.path.join(tmp, "legacy_npy")) == 1
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    all_areas = generate_area_data()
+    areas = [(code, info["name"]) for code, info in all_areas["class10s"].items()]
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "weather.db")
+        store = WeatherStore(db)
+        fill(store, areas, START, 365 * YEARS, rng)
+        n_rows = store.conn.execute("SELECT COUNT(*) FROM forecast_history").fetchone()[0]
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"{YEARS} 年 × {len(areas)} 地域, forecast_history {n_rows} 行 (DB {os.path.getsize(db) / 2**20:.1f} MiB)")
+
+        out = os.path.join(tmp, "history_npy")
+        start = time.perf_counter()
+        written = export_history(db, out)
+        elapsed = time.perf_counter() - start
+        print(f"全件の書き出し : {written} 行 {elapsed:.2f} s ({written / elapsed:,.0f} 行/s, "
+              f"{dir_size(out) / 2**20:.1f} MiB)")
+
+        fill(store, areas, START + datetime.timedelta(days=365 * YEARS), APPEND_DAYS, rng)
+        start = time.perf_counter()
+        appended = export_history(db, out)
+        elapsed = time.perf_counter() - start
+        print(f"追記 ({APPEND_DAYS} 日分): {appended} 行 {elapsed:.2f} s ({appended / elapsed:,.0f} 行/s)")
+
+        # 追記した結果 = 全件を書き出し直した結果
+        rebuilt = os.path.join(tmp, "history_full")
+        export_history(db, rebuilt, full=True)
+        archive, full = HistoryArchive(out), HistoryArchive(rebuilt)
+        assert archive.rows == full.rows == n_rows + appended
+        assert archive.areas == full.areas and archive.weathers == full.weathers
+        for name in COLUMNS:
+            np.testing.assert_array_equal(archive.columns[name], full.columns[name])
+        print("追記した結果と全件の書き出し直しが一致")
+
+        year_start, year_end = "2024-01-01", "2025-01-01"
+
+        def from_sqlite():
+            # 分析側のこれまでのやり方: 1行ずつ読み、文字列の気温と天気を毎回変換する
+            conn = sqlite3.connect(db)
+            sums, counts = {}, {}
+            for weather, t_max in conn.execute('''
+                SELECT weather, temp_max FROM forecast_latest
+                WHERE target_date >= ? AND target_date < ?
+            ''', (year_start, year_end)):
+                if t_max:
+                    category = category_of(weather)
+                    sums[category] = sums.get(category, 0.0) + float(t_max)
+                    counts[category] = counts.get(category, 0) + 1
+            conn.close()
+            return {CATEGORY_NAMES[c]: sums[c] / counts[c] for c in counts}
+
+        def from_archive():
+            year = HistoryArchive(out).select(year_start, year_end, latest=True)
+            t_max, category = year["temp_max"], year["category"]
+            valid = ~np.isnan(t_max)
+            sums = np.bincount(category[valid], weights=t_max[valid], minlength=len(CATEGORY_NAMES))
+            counts = np.bincount(category[valid], minlength=len(CATEGORY_NAMES))
+            return {CATEGORY_NAMES[c]: sums[c] / counts[c] for c in range(len(counts)) if counts[c]}
+
+        def scan_sqlite():
+            conn = sqlite3.connect(db)
+            value = conn.execute("SELECT AVG(CAST(temp_max AS REAL)) FROM forecast_history WHERE temp_max != ''").fetchone()[0]
+            conn.close()
+            return value
+
+        def scan_archive():
+            return float(np.nanmean(HistoryArchive(out).columns["temp_max"], dtype=np.float64))
+
+        print("1年分の天気カテゴリごとの平均最高気温 (最新版):")
+        results = {}
+        for label, func in (("SQLiteから1行ずつ", from_sqlite), ("メモリマップ (.npy)", from_archive)):
+            start = time.perf_counter()
+            results[label] = func()
+            print(f"  {label:20}: {(time.perf_counter() - start) * 1000:8.1f} ms")
+        sqlite_result, archive_result = results.values()
+        assert sqlite_result.keys() == archive_result.keys()
+        assert all(abs(sqlite_result[k] - archive_result[k]) < 1e-6 for k in sqlite_result), results
+
+        total = archive.rows
+        print(f"全 {total} 行の走査 (最高気温の平均):")
+        values = []
+        for label, func in (("SQL の AVG(CAST ...)", scan_sqlite), ("NumPy (メモリマップ)", scan_archive)):
+            start = time.perf_counter()
+            values.append(func())
+            elapsed = time.perf_counter() - start
+            print(f"  {label:20}: {elapsed * 1000:8.1f} ms ({total / elapsed / 1e6:6.1f} M行/s)")
+        assert abs(values[0] - values[1]) < 1e-6, values
+        store.close()
+        check_late_reports(tmp)
+        check_legacy_db(tmp)
+
+
+if __name__ == "__main__":
+    main()
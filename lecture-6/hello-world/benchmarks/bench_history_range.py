@@ -0,0 +1,133 @@
+"""過去予報の期間検索のベンチマーク: 1日ずつの get_forecast vs 列指向の範囲API + 集計テーブル
+
+数年分 × 全class10地域の合成DBで、
+- 「地域Xの月Y」「日付Dの全地域」を1行ずつ取る場合と1クエリで取る場合
+- 月・日ごとの内訳を forecast_latest からその場で集計する場合と、集計テーブルを読む場合
+- 集計テーブルのトリガーによる書き込み時間の増加
+- 履歴画面の月表示 (カード / ヒートマップ) の送信サイズ
+を比べる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_history_range.py
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import WEATHERS, generate_area_data
+from flet_payload import add_payload_bytes
+from history_view import month_cards, month_heatmap, next_month
+from weather_store import AGGREGATE_COLUMNS, WeatherStore, _aggregate_terms
+
+YEARS = 3
+START = datetime.date(2022, 1, 1)
+REPEAT = 20
+
+
+def fill(store, all_areas):
+    """YEARS 年分、毎日1回の発表で全class10地域の予報を書き込む"""
+    rng = random.Random(0)
+    areas = [(code, info["name"]) for code, info in all_areas["class10s"].items()]
+    for d in range(365 * YEARS):
+        day = START + datetime.timedelta(days=d)
+        rows = [(code, name, day.isoformat(), rng.choice(WEATHERS), str(rng.randint(0, 35)), str(rng.randint(-10, 25)))
+                for code, name in areas]
+        store.save_reports([(f"{day.isoformat()}T05:00:00+09:00", rows)])
+    return len(areas)
+
+
+def timed(func):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func()
+    return (time.perf_counter() - start) / REPEAT * 1000, result
+
+
+def main():
+    all_areas = generate_area_data()
+    with tempfile.TemporaryDirectory() as tmp:
+        # 集計トリガー無しで書き込んだ場合との比較
+        plain = WeatherStore(os.path.join(tmp, "plain.db"))
+        plain.conn.execute("DROP TRIGGER trg_forecast_latest_aggregate_insert")
+        plain.conn.execute("DROP TRIGGER trg_forecast_latest_aggregate_update")
+        start = time.perf_counter()
+        fill(plain, all_areas)
+        plain_write = time.perf_counter() - start
+        plain.close()
+
+        store = WeatherStore(os.path.join(tmp, "weather.db"))
+        start = time.perf_counter()
+        n_areas = fill(store, all_areas)
+        write = time.perf_counter() - start
+        n_rows = store.conn.execute("SELECT COUNT(*) FROM forecast_latest").fetchone()[0]
+        print(f"{YEARS} 年 × {n_areas} 地域 = {n_rows} 行")
+        print(f"  書き込み: 集計なし {plain_write:.2f} s / 集計トリガーあり {write:.2f} s")
+
+        area = next(iter(all_areas["class10s"]))
+        month = "2023-07"
+        dates = [f"{month}-{d:02d}" for d in range(1, 32)]
+        date = "2023-07-15"
+        codes = list(all_areas["class10s"])
+        terms = ", ".join(f"SUM({t})" for t in _aggregate_terms("forecast_latest"))
+
+        def on_the_fly_month():
+            with store.lock:
+                return store.conn.execute(f"""
+                    SELECT {terms} FROM forecast_latest
+                    WHERE area_code = ? AND target_date >= ? AND target_date < ?
+                """, (area, f"{month}-01", f"{month}-32")).fetchone()
+
+        def on_the_fly_year():
+            with store.lock:
+                return store.conn.execute(f"""
+                    SELECT target_date, {terms} FROM forecast_latest
+                    WHERE target_date >= '2023-01-01' AND target_date < '2024-01-01'
+                    GROUP BY target_date
+                """).fetchall()
+
+        cases = [
+            ("地域Xの月Y (31日)", [
+                ("get_forecast × 31 (旧)", lambda: [store.get_forecast(area, d) for d in dates]),
+                ("month_for_area", lambda: store.month_for_area(area, month)),
+            ]),
+            (f"日付Dの全地域 ({len(codes)})", [
+                (f"get_forecast × {len(codes)} (旧)", lambda: [store.get_forecast(c, date) for c in codes]),
+                ("areas_on_date", lambda: store.areas_on_date(date)),
+            ]),
+            ("地域Xの月Yの内訳", [
+                ("その場で集計", on_the_fly_month),
+                ("monthly_summary", lambda: store.monthly_summary(area, month, next_month(month))),
+            ]),
+            ("1年分の日別の全地域の内訳", [
+                ("その場で集計", on_the_fly_year),
+                ("daily_summary", lambda: store.daily_summary("2023-01-01", "2024-01-01")),
+            ]),
+        ]
+        for title, variants in cases:
+            print(f"{title}:")
+            for label, func in variants:
+                elapsed, _ = timed(func)
+                print(f"  {label:26}: {elapsed:8.3f} ms")
+
+        # トリガーで保った集計と、全件から作り直した集計が一致すること
+        kept = store.conn.execute("SELECT * FROM forecast_monthly ORDER BY area_code, month").fetchall()
+        store.conn.execute("DELETE FROM forecast_daily")
+        store.conn.execute("DELETE FROM forecast_monthly")
+        store._backfill_aggregates()
+        assert kept == store.conn.execute("SELECT * FROM forecast_monthly ORDER BY area_code, month").fetchall()
+        print(f"集計テーブル: {len(AGGREGATE_COLUMNS)} 列 × {len(kept)} 行 (作り直した結果と一致)")
+
+        columns = store.month_for_area(area, month)
+        print("履歴画面の月表示 (最初の描画で送るサイズ):")
+        print(f"  カード一覧   : {add_payload_bytes(month_cards(columns)) / 1024:6.1f} KiB")
+        print(f"  ヒートマップ : {add_payload_bytes([month_heatmap(columns, month)]) / 1024:6.1f} KiB")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""HTTPクライアントのベンチマーク: 呼ぶたびに requests.get vs 共有 Session (HttpClient)
+
+ローカルの HTTPS サーバーから全officeの予報JSONを順番に取得し、1件あたりのレイテンシを比べる。
+requests.get は毎回 TCP + TLS のハンドシェイクからやり直すが、Session は keep-alive の接続を使い回す。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_http_client.py
+"""
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import FakeJMAServer
+from http_client import HttpClient, create_session
+from prefetch import percentile
+
+ROUNDS = 3
+
+
+def run(label, fetch, urls):
+    latencies = []
+    for _ in range(ROUNDS):
+        for url in urls:
+            start = time.perf_counter()
+            fetch(url).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"  {label:24}: p50 {percentile(latencies, 50) * 1000:6.2f} ms  p90 {percentile(latencies, 90) * 1000:6.2f} ms"
+          f"  合計 {sum(latencies) / ROUNDS * 1000:7.1f} ms/周")
+    return statistics.median(latencies)
+
+
+def main():
+    with FakeJMAServer(tls=True) as server:
+        urls = [f"{server.forecast_base_url}{code}.json" for code in server.area_data["offices"]]
+        print(f"HTTPS で {len(urls)} 件を順番に取得 x {ROUNDS} 周:")
+
+        per_call = run("requests.get (毎回接続)", lambda url: requests.get(url, timeout=10, verify=server.cafile), urls)
+
+        # verify は毎回渡す (環境変数 REQUESTS_CA_BUNDLE があると session.verify より優先されるため)
+        client = HttpClient(create_session())
+        timings = []
+        client.add_hook(timings.append)
+        pooled = run("HttpClient (接続を再利用)", lambda url: client.get(url, verify=server.cafile), urls)
+        client.close()
+
+        print(f"  中央値で {per_call / pooled:.1f} 倍速い")
+        gzip_bytes = sum(t.bytes for t in timings) / ROUNDS
+        print(f"  フックで記録: {len(timings)} リクエスト, 平均 {statistics.mean(t.elapsed for t in timings) * 1000:.2f} ms, "
+              f"受信 {gzip_bytes / 1024:.1f} KiB/周 (gzip)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""保存済みの予報を先に表示する (stale-while-revalidate) 動作の確認と計測
+
+応答の遅い偽の気象庁サーバーに対して、
+- クリックから最初の描画までの時間: 通信を待つ (旧) / DBの保存済みの予報を読む
+- 最新の予報が保存済みと同じ時は天気コード (DBに無い) を加える書き換えだけで、再表示では書き換えないこと、
+  発表が変わった時は変わったカードだけを書き換えること
+- サーバーが止まっても保存済みの予報を表示できること
+を確認する。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_offline_first.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import flet as ft
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import FakeJMAServer
+from flet_payload import UpdateRecorder
+from forecast_cache import ForecastCache
+from forecast_cards import CardPool
+from forecast_parser import DailyForecast, forecast_rows, parse_forecast, report_age, same_days
+from http_client import HttpClient, create_session
+from weather_store import WeatherStore
+
+DELAY = 0.3  # サーバーの応答遅延 (秒)
+REPEAT = 200
+
+
+def main():
+    with FakeJMAServer(delay=DELAY) as server, tempfile.TemporaryDirectory() as tmp:
+        office = next(iter(server.area_data["offices"]))
+        region_code = server.area_data["offices"][office]["children"][0]
+        region_name = server.area_data["class10s"][region_code]["name"]
+        # 停止したサーバーへの再試行で待たないよう、再試行なしのクライアントを使う
+        client = HttpClient(create_session(retries=0), timeout=(1, 5))
+        cache = ForecastCache(server.forecast_base_url, ttl=0, session=client)
+        store = WeatherStore(os.path.join(tmp, "weather.db"))
+
+        def load():
+            """main.py の load_forecast と同じ: 取得してDBに保存し、日ごとの予報を返す"""
+            forecast = parse_forecast(cache.get(office))
+            store.save_forecasts(forecast_rows(forecast, region_code, region_name), forecast.report_datetime)
+            return forecast.daily(region_code)
+
+        def load_saved():
+            since = server.report_datetime[:10]
+            rows = store.saved_forecast(region_code, since)
+            return [DailyForecast(d, w, None, t_min, t_max) for d, w, t_max, t_min, _ in rows], rows[0][4]
+
+        # 旧: クリックのたびに通信を待ってから描画する
+        start = time.perf_counter()
+        live = load()
+        network = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            saved, reported = load_saved()
+        local = (time.perf_counter() - start) / REPEAT
+        print(f"応答遅延 {DELAY}s のサーバーに対する、クリックから最初の描画まで")
+        print(f"  通信を待つ (旧)      : {network * 1000:8.2f} ms")
+        print(f"  保存済みの予報を読む : {local * 1000:8.3f} ms ({report_age(reported)}の発表)")
+
+        row = ft.Row()
+        pool = CardPool(row)
+        recorder = UpdateRecorder(ft.Column([row]))
+        pool.show(saved)
+        recorder.update()
+
+        # 最新の予報が保存済みと同じ → main.py はそのまま show する。天気コードを加えるだけで、もう一度 show しても書き換えない
+        live = load()
+        assert same_days(live, saved)
+        changed = pool.show(live)
+        sent = recorder.update()
+        assert pool.show(live) == 0
+        print(f"発表が同じ時  : カードの書き換え {changed} 枚 (天気コードの追加) / 送信 {sent} bytes, 再表示 0 枚")
+
+        # 発表が変わった → 変わったカードだけを書き換える
+        server.set_report_datetime("2025-01-01T17:00:00+09:00")
+        live = load()
+        assert not same_days(live, saved)
+        changed = pool.show(live)
+        print(f"発表が変わった時: カードの書き換え {changed} 枚 / 送信 {recorder.update()} bytes")
+        assert changed > 0
+
+    # サーバー停止後: 取得は失敗するが、保存済みの予報は読める
+    # (keep-alive の接続が残っていると停止前のスレッドが応答してしまうので、接続プールを空にしておく)
+    client.session.close()
+    try:
+        load()
+    except Exception as e:
+        error = type(e).__name__
+    else:
+        raise AssertionError("停止したサーバーから取得できてしまった")
+    saved, reported = load_saved()
+    assert same_days(saved, live)
+    print(f"サーバー停止後: 取得は {error}、保存済みの予報 {len(saved)} 日分を表示 ({reported} の発表)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
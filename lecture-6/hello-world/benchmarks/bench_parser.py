@@ -0,0 +1,77 @@
+"""予報JSON解析のベンチマーク: 変更前のUI内の解析 vs forecast_parser
+
+全府県予報区のダミー予報JSON (fake_jma で生成) に対して、全class10地域の日別予報を取り出す時間を測る。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_parser.py
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import generate_area_data, generate_forecast
+from forecast_parser import parse_forecast
+
+REPEAT = 20
+
+
+def legacy_parse(data, region_code):
+    """変更前の fetch_weather (lecture-6) と同じ解析"""
+    time_defines = data[0]['timeSeries'][0]['timeDefines']
+    weather_data = next((a for a in data[0]['timeSeries'][0]['areas'] if a['area']['code'] == region_code), data[0]['timeSeries'][0]['areas'][0])
+    temp_data = None
+    if len(data) > 1:
+        for ts in data[1]['timeSeries']:
+            for area in ts['areas']:
+                if area['area']['code'] == region_code:
+                    temp_data = area
+                    break
+    days = []
+    for i in range(len(time_defines)):
+        d_str = datetime.datetime.fromisoformat(time_defines[i]).strftime("%Y-%m-%d")
+        w_str = weather_data['weathers'][i] if i < len(weather_data['weathers']) else "情報なし"
+        t_min = temp_data['tempsMin'][i] if temp_data and 'tempsMin' in temp_data and i < len(temp_data['tempsMin']) else None
+        t_max = temp_data['tempsMax'][i] if temp_data and 'tempsMax' in temp_data and i < len(temp_data['tempsMax']) else None
+        days.append((d_str, w_str, t_min, t_max))
+    return days
+
+
+def main():
+    areas = generate_area_data()
+    fixtures = [
+        (generate_forecast(code, areas, "2025-01-01T11:00:00+09:00"), office["children"])
+        for code, office in areas["offices"].items()
+    ]
+    n_regions = sum(len(children) for _, children in fixtures)
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for data, children in fixtures:
+            for code in children:
+                legacy_parse(data, code)
+    legacy = (time.perf_counter() - start) / REPEAT
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for data, children in fixtures:
+            forecast = parse_forecast(data)
+            for code in children:
+                forecast.daily(code)
+    parsed = (time.perf_counter() - start) / REPEAT
+
+    # 解析結果の天気・日付が変更前と一致することを確認
+    for data, children in fixtures:
+        forecast = parse_forecast(data)
+        for code in children:
+            assert [d[:2] for d in legacy_parse(data, code)] == [(d.date, d.weather) for d in forecast.daily(code)]
+
+    print(f"{len(fixtures)} office / {n_regions} class10 地域の日別予報を取り出す時間")
+    print(f"  変更前 (地域ごとに走査) : {legacy * 1000:8.2f} ms  ({legacy / n_regions * 1e6:6.1f} us/地域)")
+    print(f"  forecast_parser          : {parsed * 1000:8.2f} ms  ({parsed / n_regions * 1e6:6.1f} us/地域)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""全府県予報区の先読み (prefetch_all) の動作の確認と計測
+
+応答の遅い偽の気象庁サーバーに対して、
+- 全office (と、サーバーに無い1件) を取得し、成功・失敗・保存した行数が期待どおりであること
+- リクエストごとの所要時間 (latencies) が取得だけの時間で、DBへの保存に時間がかかっても増えないこと
+- TTL内の2回目はキャッシュから返り、新しい行を保存しないこと
+- 同時接続数に応じて全体の所要時間が短くなること
+を確認する。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_prefetch.py
+"""
+import copy
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import FakeJMAServer, generate_forecast
+from forecast_cache import ForecastCache
+from forecast_parser import forecast_rows, parse_forecast
+from http_client import HttpClient, create_session
+from prefetch import prefetch_all
+from weather_store import WeatherStore
+
+DELAY = 0.05        # サーバーの応答遅延 (秒)
+SAVE_DELAY = 0.2    # 遅いディスクを模した、保存1回あたりの追加の待ち (秒)
+CONCURRENCY = 4
+MISSING = "999999"  # サーバーに無いoffice (404)
+
+
+class SlowStore(WeatherStore):
+    """保存のたびに SAVE_DELAY 秒待つ WeatherStore"""
+
+    def save_forecasts(self, rows, report_datetime):
+        time.sleep(SAVE_DELAY)
+        return super().save_forecasts(rows, report_datetime)
+
+
+def expected_rows(server):
+    """全officeの予報から保存されるはずの行数"""
+    areas = server.area_data
+    total = 0
+    for office_code, office in areas["offices"].items():
+        forecast = parse_forecast(generate_forecast(office_code, areas, server.report_datetime, server.seed))
+        for c10 in office["children"]:
+            total += len(forecast_rows(forecast, c10, areas["class10s"][c10]["name"]))
+    return total
+
+
+def run(server, all_areas, store, concurrency):
+    cache = ForecastCache(server.forecast_base_url, max_entries=len(all_areas["offices"]),
+                          session=HttpClient(create_session(retries=0)))
+    return cache, prefetch_all(all_areas, cache, store, concurrency=concurrency, interval=0)
+
+
+def main():
+    with FakeJMAServer(delay=DELAY) as server, tempfile.TemporaryDirectory() as tmp:
+        all_areas = copy.deepcopy(server.area_data)
+        all_areas["offices"][MISSING] = {"name": "存在しない予報区", "children": []}
+        n_offices = len(all_areas["offices"])
+        rows = expected_rows(server)
+
+        store = SlowStore(os.path.join(tmp, "weather.db"))
+        cache, report = run(server, all_areas, store, CONCURRENCY)
+        s = report.summary()
+        stored = store.conn.execute("SELECT COUNT(*) FROM forecast_history").fetchone()[0]
+        print(f"{n_offices} office (うち1件はサーバーに無い), 応答遅延 {DELAY}s, 保存 {SAVE_DELAY}s, 同時接続 {CONCURRENCY}")
+        print(f"  成功 {s['ok']} / 失敗 {s['errors']} / 保存 {s['rows_saved']} 行 (DB {stored} 行), "
+              f"所要時間 {s['wall_time']:.2f} s")
+        print(f"  取得のレイテンシ: p50 {s['p50'] * 1000:.1f} ms / p90 {s['p90'] * 1000:.1f} ms / "
+              f"max {s['max'] * 1000:.1f} ms")
+        assert s["offices"] == n_offices and s["ok"] == n_offices - 1 and s["errors"] == 1
+        assert MISSING in report.errors and "404" in report.errors[MISSING]
+        assert s["rows_saved"] == stored == rows
+        # レイテンシは取得だけ: 応答遅延以上で、保存の待ち (SAVE_DELAY) を足した値よりはっきり小さい
+        assert min(report.latencies.values()) >= DELAY
+        assert s["p90"] < DELAY + SAVE_DELAY / 2, "レイテンシに保存の時間が含まれている"
+
+        # TTL内の2回目: すべてキャッシュから返り、新しい行は無い
+        report = prefetch_all(all_areas, cache, store, concurrency=CONCURRENCY, interval=0)
+        s = report.summary()
+        print(f"  2回目 (キャッシュ): 成功 {s['ok']} / 保存 {s['rows_saved']} 行, p90 {s['p90'] * 1000:.3f} ms")
+        assert s["ok"] == n_offices - 1 and s["rows_saved"] == 0 and s["p90"] < DELAY / 10
+        store.close()
+
+        # 同時接続数による全体の所要時間
+        serial = run(server, all_areas, None, 1)[1].wall_time
+        parallel = run(server, all_areas, None, CONCURRENCY)[1].wall_time
+        print(f"  保存なしの全体の所要時間: 同時接続 1 {serial:.2f} s / {CONCURRENCY} {parallel:.2f} s")
+        assert parallel < serial / 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""定時更新サービス (RefreshDaemon) の動作確認と計測: 偽の気象庁サーバー + 偽の時計
+
+- 11時の発表が半分のofficeにだけ先に反映され、残りは20分遅れて反映される
+- 17時の発表はなかなか反映されない
+という状況を、実時間を待たずに再現する。
+発表が変わったofficeだけが再ダウンロード・保存され、変わっていないofficeは 304 で済むことを確認する。
+DBへの保存に失敗したサイクルの発表は取り込み済みにせず、次のサイクルで保存し直すことも確かめる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_refresh_daemon.py
+"""
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import FakeJMAServer
+from forecast_cache import ForecastCache
+from refresh_daemon import RefreshDaemon
+from weather_store import JST, WeatherStore
+
+
+class FlakyStore(WeatherStore):
+    """fail_next を立てると、次の save_reports だけが「database is locked」で失敗する WeatherStore"""
+    fail_next = False
+
+    def save_reports(self, reports, raise_errors=False):
+        if self.fail_next:
+            self.fail_next = False
+            if raise_errors:
+                raise sqlite3.OperationalError("database is locked")
+            return 0
+        return super().save_reports(reports, raise_errors)
+
+
+class FakeClock:
+    """sleep() で時刻が進む時計。指定した時刻を過ぎると登録した処理を実行する"""
+
+    def __init__(self, now):
+        self.now = now
+        self.events = []  # (時刻, 処理)
+        self.sleeps = []
+
+    def at(self, when, action):
+        self.events.append((when, action))
+        self.events.sort(key=lambda e: e[0])
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += datetime.timedelta(seconds=seconds)
+        while self.events and self.events[0][0] <= self.now:
+            self.events.pop(0)[1]()
+
+
+def jst(hour, minute=0):
+    return datetime.datetime(2025, 1, 1, hour, minute, tzinfo=JST)
+
+
+def main():
+    with FakeJMAServer(report_datetime="2025-01-01T05:00:00+09:00") as server, tempfile.TemporaryDirectory() as tmp:
+        offices = list(server.area_data["offices"])
+        first_half, second_half = offices[:len(offices) // 2], offices[len(offices) // 2:]
+        clock = FakeClock(jst(6))
+        clock.at(jst(11), lambda: server.set_report_datetime("2025-01-01T11:00:00+09:00", first_half))
+        clock.at(jst(11, 20), lambda: server.set_report_datetime("2025-01-01T11:00:00+09:00", second_half))
+
+        store = FlakyStore(os.path.join(tmp, "weather.db"))
+        cache = ForecastCache(server.forecast_base_url, ttl=0, max_entries=len(offices))
+        cycles = []
+        daemon = RefreshDaemon(server.area_data, cache, store, concurrency=8, interval=0,
+                               clock=clock, sleep=clock.sleep, on_cycle=cycles.append)
+        daemon.run(max_cycles=6)
+
+        print(f"{len(offices)} 府県予報区:")
+        print(f"  {'開始時刻':8} {'更新':>4} {'304':>4} {'受信':>10} {'保存行数':>8} {'所要時間':>9}")
+        for m in cycles:
+            print(f"  {m.started_at.strftime('%H:%M'):8} {m.changed:4d} {m.not_modified:4d} "
+                  f"{m.bytes_fetched / 1024:7.1f} KiB {m.rows_saved:8d} {m.duration * 1000:7.1f} ms")
+
+        started = [m.started_at for m in cycles]
+        # 起動時 → 11:05 (半分が更新) → 11:15 (変化なし) → 11:25 (残りが更新) → 17:05 → 17:15
+        assert started == [jst(6), jst(11, 5), jst(11, 15), jst(11, 25), jst(17, 5), jst(17, 15)], started
+        assert [m.changed for m in cycles] == [len(offices), len(first_half), 0, len(second_half), 0, 0]
+        assert cycles[2].bytes_fetched == 0 and cycles[4].not_modified == len(offices)
+        assert not any(m.errors for m in cycles)
+        assert daemon.stale_offices(jst(11)) == []
+
+        full_refetch = cycles[0].bytes_fetched * len(cycles)
+        fetched = daemon.metrics()["totals"]["bytes_fetched"]
+        print(f"受信量: {fetched / 1024:.1f} KiB (毎回全件を取り直す場合 {full_refetch / 1024:.1f} KiB)")
+
+        # 再起動しても、取り込み済みの発表は保存し直さない
+        restarted = RefreshDaemon(server.area_data, ForecastCache(server.forecast_base_url, ttl=0), store,
+                                  concurrency=8, interval=0, clock=clock, sleep=clock.sleep)
+        again = restarted.run_cycle()
+        assert again.changed == 0 and again.rows_saved == 0, again.as_dict()
+        print("再起動後の1サイクル目: 保存 0 行 (OK)")
+
+        # 保存に失敗した発表は取り込み済みにしない
+        server.set_report_datetime("2025-01-01T17:00:00+09:00")
+        store.fail_next = True
+        failed = restarted.run_cycle()
+        assert failed.changed == 0 and len(failed.errors) == len(offices), failed.as_dict()
+        assert sorted(restarted.stale_offices(jst(17))) == sorted(offices)
+        retried = restarted.run_cycle()
+        assert retried.changed == len(offices) and retried.rows_saved > 0 and not retried.errors, retried.as_dict()
+        assert restarted.stale_offices(jst(17)) == []
+        print(f"保存に失敗したサイクルの次のサイクル: {retried.changed} office・{retried.rows_saved} 行を保存し直した (OK)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""地域リスト (サイドバー) の構築コストのベンチマーク: 全階層を最初に作る vs 開いた時に作る
+
+コントロール数・最初の page.update() で送るコマンドのサイズ・構築時間を比べる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_sidebar.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import generate_area_data
+from flet_payload import add_payload_bytes, count_controls
+from region_sidebar import RegionSidebar
+
+REPEAT = 10
+
+
+def measure(all_areas, lazy):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        tiles = RegionSidebar(lambda code, name: None, decorated=True, lazy=lazy).build(all_areas)
+        payload = add_payload_bytes(tiles)
+        times.append(time.perf_counter() - start)
+    return count_controls(tiles), payload, statistics.median(times)
+
+
+def main():
+    all_areas = generate_area_data()
+    print(f"{len(all_areas['centers'])} 地方 / {len(all_areas['offices'])} 府県予報区 / {len(all_areas['class10s'])} class10地域")
+    for label, lazy in (("全階層を構築 (旧)", False), ("遅延構築", True)):
+        controls, payload, elapsed = measure(all_areas, lazy)
+        print(f"  {label:14}: {controls:5d} コントロール  {payload / 1024:7.1f} KiB  構築+シリアライズ {elapsed * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""地域クリック時のハンドラ所要時間のベンチマーク: 同期取得 vs ForecastWorker
+
+応答の遅いローカルサーバーに対して、
+- ハンドラ (クリック処理) が戻るまでの時間
+- 連続クリックしたとき、最後に選んだ地域だけが描画されること
+- 描画 (page.update) に時間がかかっている間のクリックも、ハンドラがすぐに戻ること
+- 保存済みの予報 (preview) は前の地域の描画の後に描画され、前の地域の結果に上書きされないこと、
+  前の地域の取得でスレッドが埋まっていても待たされないこと
+を確認する。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_ui_latency.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import FakeJMAServer
+from forecast_cache import ForecastCache
+from forecast_worker import ForecastWorker
+
+DELAY = 0.5  # サーバーの応答遅延 (秒)
+
+
+def main():
+    with FakeJMAServer(delay=DELAY) as server:
+        offices = list(server.area_data["offices"])[:5]
+
+        # 同期: ハンドラ内で通信する (変更前の動作)
+        cache = ForecastCache(server.forecast_base_url)
+        start = time.perf_counter()
+        cache.get(offices[0])
+        sync_elapsed = time.perf_counter() - start
+
+        # 非同期: ハンドラは依頼を出すだけ
+        cache = ForecastCache(server.forecast_base_url)
+        worker = ForecastWorker()
+        rendered = []
+        done = threading.Event()
+
+        def render(result):
+            rendered.append(result[0]["publishingOffice"])
+            done.set()
+
+        handler_times = []
+        for code in offices:  # 素早く5地域をクリック
+            start = time.perf_counter()
+            worker.submit(lambda code=code: cache.get(code), render)
+            handler_times.append(time.perf_counter() - start)
+        done.wait(timeout=DELAY * 10)
+        time.sleep(DELAY * 2)  # 古い依頼の完了を待つ
+        worker.shutdown()
+
+    # 描画に時間がかかっている間にクリックする
+    slow_worker = ForecastWorker()
+    rendering = threading.Event()
+    painted = []
+
+    def slow_render(result):
+        rendering.set()
+        time.sleep(DELAY)
+        painted.append(result)
+
+    slow_worker.submit(lambda: "first", slow_render)
+    rendering.wait(timeout=DELAY * 4)
+    start = time.perf_counter()
+    slow_worker.submit(lambda: "second", slow_render)
+    during_render = time.perf_counter() - start
+    deadline = time.monotonic() + DELAY * 4
+    while len(painted) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    slow_worker.shutdown()
+
+    # 前の地域の描画中に、保存済みの予報のある地域を選ぶ (main.py の fetch_weather と同じ使い方)
+    # → 前の地域の描画が終わってから保存済みの予報、最後に最新の予報の順に描画される
+    preview_worker = ForecastWorker()
+    rendering.clear()
+    shown = []
+
+    def slow_show(result):
+        rendering.set()
+        time.sleep(DELAY)
+        shown.append(result)
+
+    preview_worker.submit(lambda: "A", slow_show)
+    rendering.wait(timeout=DELAY * 4)
+    preview_worker.submit(lambda: "B", shown.append, preview=lambda: shown.append("B (保存済み)"))
+    deadline = time.monotonic() + DELAY * 4
+    while len(shown) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # 取得に時間がかかる地域でスレッドがすべて埋まっている間に選ぶ → preview はすぐに描画される
+    blocked = threading.Event()
+    for code in range(preview_worker.executor._max_workers):
+        loading = threading.Event()
+
+        def slow_load(code=code, loading=loading):
+            loading.set()
+            blocked.wait(DELAY * 4)
+            return code
+
+        preview_worker.submit(slow_load, shown.append)
+        loading.wait(timeout=DELAY * 4)  # 取得が始まってから次を選ぶ (始まる前なら取得自体が省かれる)
+    drawn_at = []
+
+    def preview_c():
+        drawn_at.append(time.perf_counter())
+        shown.append("C (保存済み)")
+
+    start = time.perf_counter()
+    preview_worker.submit(lambda: "C", shown.append, preview=preview_c)
+    time.sleep(DELAY / 2)
+    blocked.set()
+    deadline = time.monotonic() + DELAY * 4
+    while len(shown) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(DELAY / 5)
+    preview_worker.shutdown()
+
+    expected = server.area_data["offices"][offices[-1]]["name"] + "気象台"
+    print(f"応答遅延 {DELAY}s のサーバーに対するクリック処理の所要時間")
+    print(f"  同期取得 (旧)    : {sync_elapsed * 1000:8.2f} ms")
+    print(f"  ForecastWorker   : {max(handler_times) * 1000:8.2f} ms (5連続クリック中の最大)")
+    print(f"  描画中のクリック : {during_render * 1000:8.2f} ms (描画 {DELAY}s の最中)")
+    print(f"  描画された結果   : {rendered} (期待値: ['{expected}'])")
+    print(f"  worker統計       : {worker.stats}")
+    preview_delay = drawn_at[0] - start if drawn_at else float("inf")
+    print(f"  保存済みの表示   : {shown} (スレッドが埋まっている時のクリックから描画まで {preview_delay * 1000:.2f} ms)")
+    assert max(handler_times) < DELAY / 10, "ハンドラが通信を待っている"
+    assert rendered == [expected], "古い選択の結果が描画された"
+    assert during_render < DELAY / 10, "ハンドラが描画の終わりを待っている"
+    assert painted == ["first", "second"], painted
+    assert shown == ["A", "B (保存済み)", "B", "C (保存済み)", "C"], shown
+    assert preview_delay < DELAY / 10, "保存済みの予報の描画が前の地域の取得を待っている"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""天気アイコンの分類の確認とマイクロベンチマーク: 変更前の get_weather_icon vs weather_classifier
+
+weather_classifier は変更前と同じ部分文字列の判定に「くもり」と天気コードによる分類を足したもの。
+変更前に分類できた天気は同じアイコンになり、不明だった天気だけが分類されることを確かめ、1カードあたりの時間を比べる。
+
+実行方法 (プロジェクトルートから):
+    python benchmarks/bench_weather_classifier.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fake_jma import generate_area_data, generate_forecast
+from forecast_parser import parse_forecast
+import weather_classifier
+
+REPEAT = 20
+REPORT_DATETIME = "2025-01-01T11:00:00+09:00"
+
+
+def substring_icon(weather_str, weather_code=None):
+    """変更前の get_weather_icon と同じ判定"""
+    if "晴" in weather_str and "曇" not in weather_str and "雨" not in weather_str:
+        return "wb_sunny", "orange"
+    elif "雪" in weather_str:
+        return "ac_unit", "lightBlue"
+    elif "雨" in weather_str:
+        return "umbrella", "blue"
+    elif "曇" in weather_str:
+        return "cloud", "grey"
+    else:
+        return "question_mark", "black"
+
+
+def bench(label, func, days):
+    pairs = [(day.weather, day.weather_code) for day in days]
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for weather, code in pairs:
+            func(weather, code)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:28}: {elapsed / (REPEAT * len(days)) * 1e9:7.1f} ns/カード")
+
+
+def main():
+    all_areas = generate_area_data()
+    days = []
+    for office in all_areas["offices"]:
+        forecast = parse_forecast(generate_forecast(office, all_areas, REPORT_DATETIME))
+        for code in forecast.area_codes:
+            days.extend(forecast.daily(code))
+    distinct = {day.weather for day in days}
+    print(f"{len(days)} カード / 異なる天気文字列 {len(distinct)} 種類:")
+
+    unknown = substring_icon("")
+    newly = 0
+    for day in days:
+        old, new = substring_icon(day.weather), weather_classifier.icon_for(day.weather, day.weather_code)
+        if old == unknown:
+            newly += new != unknown
+        else:
+            assert new == old, (day.weather, old, new)
+    print(f"  変更前に不明だったカードのうち分類できたもの: {newly}")
+
+    bench("部分文字列判定 (旧)", substring_icon, days)
+    bench("icon_for", weather_classifier.icon_for, days)
+    bench("category_of", weather_classifier.category_of, days)
+    bench("classify (WeatherClass)", weather_classifier.classify, days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""ベンチマーク用のダミー気象庁データとローカルHTTPサーバー
+
+実際の area.json / forecast/{office}.json と同じ形・ほぼ同じ件数のデータを乱数から作る。
+サーバーは ETag による条件付きGETと、応答遅延の指定に対応する。
+tls=True にすると自己署名証明書で HTTPS のサーバーになる (証明書の作成に openssl コマンドを使う)。
+"""
+import datetime
+import gzip
+import json
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AREA_PATH = "/bosai/common/const/area.json"
+FORECAST_PATH = "/bosai/forecast/data/forecast/"
+
+# 実際の area.json のおおよその件数
+N_CENTERS = 11
+N_OFFICES = 58
+CLASS10_PER_OFFICE = 3
+CLASS15_PER_CLASS10 = 2
+CLASS20_PER_CLASS15 = 5
+
+WEATHERS = [
+    "晴れ", "くもり", "雨", "雪", "晴れ　時々　くもり", "くもり　時々　雨", "くもり　一時　雪",
+    "雨　夜　くもり", "晴れ　夜　くもり　所により　雨", "くもり　後　晴れ",
+]
+CENTER_NAMES = ["北海道地方", "東北地方", "関東甲信地方", "東海地方", "北陸地方", "近畿地方",
+                "中国地方", "四国地方", "九州北部地方", "九州南部・奄美地方", "沖縄地方"]
+
+
+def generate_area_data():
+    """area.json と同じ構造 (centers/offices/class10s/class15s/class20s) のダミーデータを作る"""
+    areas = {"centers": {}, "offices": {}, "class10s": {}, "class15s": {}, "class20s": {}}
+    for c in range(N_CENTERS):
+        c_code = f"{10100 + c * 100:06d}"
+        areas["centers"][c_code] = {"name": CENTER_NAMES[c], "enName": f"Center {c}", "officeName": "気象台", "children": []}
+    for o in range(N_OFFICES):
+        o_code = f"{(o + 1) * 10000:06d}"
+        c_code = f"{10100 + (o % N_CENTERS) * 100:06d}"
+        areas["centers"][c_code]["children"].append(o_code)
+        office = {"name": f"県{o + 1:02d}", "enName": f"Pref {o}", "officeName": "気象台", "parent": c_code, "children": []}
+        areas["offices"][o_code] = office
+        for k in range(CLASS10_PER_OFFICE):
+            c10 = f"{(o + 1) * 10000 + (k + 1) * 10:06d}"
+            office["children"].append(c10)
+            class10 = {"name": f"県{o + 1:02d}{['北部', '南部', '東部'][k]}", "enName": "", "parent": o_code, "children": []}
+            areas["class10s"][c10] = class10
+            for m in range(CLASS15_PER_CLASS10):
+                c15 = f"{c10[:5]}{m + 5}"
+                class10["children"].append(c15)
+                class15 = {"name": f"{class10['name']}地方{m}", "enName": "", "parent": c10, "children": []}
+                areas["class15s"][c15] = class15
+                for n in range(CLASS20_PER_CLASS15):
+                    c20 = f"{c15}{n}"
+                    class15["children"].append(c20)
+                    areas["class20s"][c20] = {"name": f"市町村{c20}", "enName": "", "kana": "しちょうそん", "parent": c15}
+    return areas
+
+
+def generate_forecast(office_code, area_data, report_datetime, seed=0):
+    """forecast/{office}.json と同じ構造の予報 (短期予報 + 週間予報) を作る"""
+    rng = random.Random(f"{seed}-{office_code}-{report_datetime}")
+    office = area_data["offices"][office_code]
+    report = datetime.datetime.fromisoformat(report_datetime)
+    day0 = report.replace(hour=0, minute=0, second=0)
+    tz = report.strftime("%z")
+    tz = f"{tz[:3]}:{tz[3:]}"
+
+    def iso(dt):
+        return dt.strftime("%Y-%m-%dT%H:%M:%S") + tz
+
+    class10s = [{"name": area_data["class10s"][c]["name"], "code": c} for c in office["children"]]
+    short_days = [iso(day0 + datetime.timedelta(days=d, hours=5 if d == 0 else 0)) for d in range(3)]
+    pop_times = [iso(day0 + datetime.timedelta(hours=6 * h)) for h in range(6)]
+    week_days = [iso(day0 + datetime.timedelta(days=d)) for d in range(7)]
+    stations = [{"name": f"{office['name']}観測所{i}", "code": f"{int(office_code[:2]) * 1000 + i:05d}"} for i in range(len(class10s))]
+
+    short_term = {
+        "publishingOffice": f"{office['name']}気象台",
+        "reportDatetime": report_datetime,
+        "timeSeries": [
+            {"timeDefines": short_days, "areas": [
+                {"area": a, "weatherCodes": [str(rng.choice([100, 101, 200, 300, 400])) for _ in short_days],
+                 "weathers": [rng.choice(WEATHERS) for _ in short_days],
+                 "winds": ["北の風　やや強く" for _ in short_days]} for a in class10s]},
+            {"timeDefines": pop_times, "areas": [
+                {"area": a, "pops": [str(rng.randrange(0, 100, 10)) for _ in pop_times]} for a in class10s]},
+            {"timeDefines": short_days[:2], "areas": [
+                {"area": s, "temps": [str(rng.randint(-5, 35)) for _ in short_days[:2]]} for s in stations]},
+        ],
+    }
+    weekly = {
+        "publishingOffice": f"{office['name']}気象台",
+        "reportDatetime": report_datetime,
+        "timeSeries": [
+            {"timeDefines": week_days, "areas": [
+                {"area": class10s[0], "weatherCodes": [str(rng.choice([100, 101, 200, 300])) for _ in week_days],
+                 "pops": [""] + [str(rng.randrange(0, 100, 10)) for _ in week_days[1:]],
+                 "reliabilities": ["", ""] + ["A"] * 5}]},
+            {"timeDefines": week_days, "areas": [
+                {"area": stations[0],
+                 "tempsMin": [""] + [str(rng.randint(-5, 20)) for _ in week_days[1:]],
+                 "tempsMax": [""] + [str(rng.randint(5, 35)) for _ in week_days[1:]]}]},
+        ],
+    }
+    return [short_term, weekly]
+
+
+def _self_signed_cert(directory):
+    """127.0.0.1 用の自己署名証明書と秘密鍵を作り、(証明書, 鍵) のパスを返す"""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", keyfile, "-out", certfile, "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
+
+
+class _Server(ThreadingHTTPServer):
+    # 既定の listen バックログ (5) だと同時接続時にSYNが落ち、1秒の再送待ちが計測に混ざる
+    request_queue_size = 128
+
+
+class FakeJMAServer:
+    """area.json と各officeの予報JSONを返すローカルHTTPサーバー
+
+    with FakeJMAServer(delay=0.2) as server:
+        server.area_url / server.forecast_base_url
+    """
+
+    def __init__(self, area_data=None, delay=0.0, report_datetime="2025-01-01T11:00:00+09:00", seed=0, tls=False):
+        self.area_data = area_data if area_data is not None else generate_area_data()
+        self.delay = delay
+        self.report_datetime = report_datetime
+        self.office_reports = {}  # officeごとに発表時刻を変える場合の上書き
+        self.seed = seed
+        self.tls = tls
+        self.cafile = None  # tls=True の時、クライアントの verify に渡す証明書ファイル
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._bodies = {}
+        self._httpd = None
+
+    # --- 応答の生成 ---
+    def set_report_datetime(self, report_datetime, offices=None):
+        """発表時刻を進める (以後の予報JSONとETagが変わる)。offices を渡すとそのofficeだけを進める"""
+        with self.lock:
+            if offices is None:
+                self.report_datetime = report_datetime
+                self.office_reports.clear()
+            else:
+                self.office_reports.update((office_code, report_datetime) for office_code in offices)
+            self._bodies.clear()
+
+    def body_for(self, path):
+        with self.lock:
+            office_code = path[len(FORECAST_PATH):-len(".json")] if path != AREA_PATH else None
+            report_datetime = self.office_reports.get(office_code, self.report_datetime)
+            key = (path, report_datetime)
+            if key not in self._bodies:
+                if path == AREA_PATH:
+                    obj = self.area_data
+                else:
+                    if office_code not in self.area_data["offices"]:
+                        return None, None
+                    obj = generate_forecast(office_code, self.area_data, report_datetime, self.seed)
+                body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+                self._bodies[key] = (body, f'"{zlib.crc32(body):08x}"')
+            return self._bodies[key]
+
+    # --- サーバーの起動・停止 ---
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダーと本文を別々に書くので、Nagle と遅延ACKで keep-alive 接続に40msの待ちが入るのを防ぐ
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if server.delay:
+                    time.sleep(server.delay)
+                path = self.path.split("?")[0]
+                body, etag = server.body_for(path) if (path == AREA_PATH or path.startswith(FORECAST_PATH)) else (None, None)
+                with server.lock:
+                    server.requests += 1
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if self.headers.get("If-None-Match") == etag:
+                    with server.lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=5)
+                    encoding = "gzip"
+                else:
+                    encoding = None
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("ETag", etag)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = _Server(("127.0.0.1", 0), Handler)
+        if self.tls:
+            self._tmpdir = tempfile.TemporaryDirectory()
+            self.cafile, keyfile = _self_signed_cert(self._tmpdir.name)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cafile, keyfile)
+            self._httpd.socket = context.wrap_socket(self._httpd.socket, server_side=True)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self.tls:
+            self._tmpdir.cleanup()
+
+    @property
+    def base_url(self):
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://127.0.0.1:{self._httpd.server_port}"
+
+    @property
+    def area_url(self):
+        return self.base_url + AREA_PATH
+
+    @property
+    def forecast_base_url(self):
+        return self.base_url + FORECAST_PATH
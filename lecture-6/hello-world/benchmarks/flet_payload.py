@@ -0,0 +1,60 @@
+"""Fletのコントロールがクライアントへ送るコマンドの大きさを測るためのヘルパー (ベンチマーク用)
+
+ページに追加・更新する際に Flet が作るコマンドを、実際の送信時と同じ CommandEncoder でJSONにして測る。
+"""
+import json
+
+from flet.core.protocol import CommandEncoder
+
+
+def _encoded_size(commands):
+    return len(json.dumps(commands, cls=CommandEncoder, separators=(",", ":")).encode("utf-8"))
+
+
+def count_controls(controls):
+    """コントロールの木に含まれるコントロールの総数"""
+    total = 0
+    stack = list(controls)
+    while stack:
+        control = stack.pop()
+        total += 1
+        stack.extend(control._get_children())
+    return total
+
+
+def add_payload_bytes(controls):
+    """controls を新しく追加する時に送られるコマンドのバイト数"""
+    commands = []
+    for control in controls:
+        commands.extend(control._build_add_commands(index={}, added_controls=[]))
+    return _encoded_size(commands)
+
+
+
+class UpdateRecorder:
+    """page.update() の代わりに、送られるはずのコマンドを作ってバイト数を返す
+
+    ページと同じく、追加されたコントロールにはIDを振って以降は差分 (set/remove) だけを作る。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index = {"page": None}
+        self.next_id = 0
+        added = []
+        commands = root._build_add_commands(index=self.index, added_controls=added)
+        self._assign_ids(added)
+        self.initial_bytes = _encoded_size(commands)
+
+    def _assign_ids(self, controls):
+        for control in controls:
+            self.next_id += 1
+            uid = f"_{self.next_id}"
+            control._Control__uid = uid
+            self.index[uid] = control
+
+    def update(self):
+        commands, added, removed = [], [], []
+        self.root.build_update_commands(self.index, commands, added, removed)
+        self._assign_ids(added)
+        return _encoded_size(commands)
@@ -0,0 +1,83 @@
+# 地域データ (area.json) の逆引きインデックス
+# 予報を取得するたびに offices を線形に走査して親を探す代わりに、読み込み時に一度だけ辞書を作る
+
+AREA_LEVELS = ("centers", "offices", "class10s", "class15s", "class20s")
+
+
+class AreaIndex:
+    """地域コード → 府県予報区(office)・地方(center) と、地域名 → コードの辞書"""
+
+    __slots__ = ("office_of", "center_of", "level_of", "name_of", "codes_by_name")
+
+    def __init__(self, all_areas):
+        self.office_of = {}
+        self.center_of = {}
+        self.level_of = {}
+        self.name_of = {}
+        self.codes_by_name = {}
+
+        for level in AREA_LEVELS:
+            for code, info in all_areas.get(level, {}).items():
+                self.level_of[code] = level
+                name = info.get("name")
+                if name:
+                    self.name_of[code] = name
+                    self.codes_by_name.setdefault(name, []).append(code)
+
+        # 上の階層から children をたどって、下位のコードすべてに office/center を割り当てる
+        offices = all_areas.get("offices", {})
+        class10s = all_areas.get("class10s", {})
+        class15s = all_areas.get("class15s", {})
+        for center_code, center_info in all_areas.get("centers", {}).items():
+            for office_code in center_info.get("children", []):
+                self.center_of[office_code] = center_code
+        for office_code, office_info in offices.items():
+            center_code = self.center_of.get(office_code, office_info.get("parent"))
+            self.office_of[office_code] = office_code
+            self.center_of[office_code] = center_code
+            for c10 in office_info.get("children", []):
+                self._assign(c10, office_code, center_code)
+                for c15 in class10s.get(c10, {}).get("children", []):
+                    self._assign(c15, office_code, center_code)
+                    for c20 in class15s.get(c15, {}).get("children", []):
+                        self._assign(c20, office_code, center_code)
+
+        # children に載っていないコードは parent を上にたどって補う
+        for code, level in self.level_of.items():
+            if level in ("class10s", "class15s", "class20s") and code not in self.office_of:
+                office_code = self._office_by_parent(all_areas, code)
+                if office_code:
+                    self._assign(code, office_code, self.center_of.get(office_code))
+
+    def _assign(self, code, office_code, center_code):
+        self.office_of[code] = office_code
+        self.center_of[code] = center_code
+
+    def _office_by_parent(self, all_areas, code):
+        seen = set()
+        while code and code not in seen:
+            seen.add(code)
+            level = self.level_of.get(code)
+            if level == "offices":
+                return code
+            if level is None or level == "centers":
+                return None
+            code = all_areas[level][code].get("parent")
+        return None
+
+    def office_for(self, code):
+        """class10/class15/class20/officeコードから予報JSONを持つofficeコードを返す (不明ならNone)"""
+        return self.office_of.get(code)
+
+    def center_for(self, code):
+        return self.center_of.get(code)
+
+    def codes_for_name(self, name):
+        """地域名に一致するコードの一覧 (同名の地域が複数ある場合があるためリスト)"""
+        return self.codes_by_name.get(name, [])
+
+    def __len__(self):
+        return len(self.level_of)
+
+
+EMPTY_INDEX = AreaIndex({})
@@ -0,0 +1,159 @@
+import bisect
+import heapq
+import threading
+import unicodedata
+from typing import NamedTuple
+
+# 地域名の検索用インデックス
+# 地域データの読み込み時に一度だけ作り、キー入力のたびに all_areas を走査しないようにする
+
+SEARCH_LEVELS = ("centers", "offices", "class10s", "class20s")
+LEVEL_RANK = {"class10s": 0, "offices": 1, "class20s": 2, "centers": 3}
+DEFAULT_LIMIT = 30
+
+
+class AreaMatch(NamedTuple):
+    """検索結果1件。target_code/target_name は選択時に予報を表示する地域"""
+    code: str
+    name: str
+    level: str
+    target_code: str
+    target_name: str
+
+
+def normalize(text):
+    """全角/半角・大文字/小文字・カタカナ/ひらがなの違いを吸収する"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(chr(ord(ch) - 0x60) if "ァ" <= ch <= "ヶ" else ch for ch in text)
+
+
+def ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _area_name(all_areas, code):
+    for level in ("centers", "offices", "class10s"):
+        if code in all_areas.get(level, {}):
+            return all_areas[level][code]["name"]
+    return code
+
+
+class AreaSearchIndex:
+    """地域名 (漢字・かな) の 1-gram / 2-gram 転置インデックスと、前方一致用のソート済みリスト"""
+
+    def __init__(self, all_areas):
+        self.entries = []   # AreaMatch
+        self.keys = []      # 各エントリの検索対象文字列 (正規化した名前と読み)
+        self.unigrams = {}
+        self.bigrams = {}
+        self.prefixes = []  # (正規化した文字列, エントリ番号) のソート済みリスト
+        self.children = {}  # 地方のエントリ番号 → 配下の府県予報区のエントリ番号
+
+        class10s = all_areas.get("class10s", {})
+        class15s = all_areas.get("class15s", {})
+        office_ids = {}
+        for level in SEARCH_LEVELS:
+            for code, info in all_areas.get(level, {}).items():
+                target = self._target(level, code, info, class10s, class15s)
+                if target is None:
+                    continue
+                entry_id = len(self.entries)
+                self.entries.append(AreaMatch(code, info["name"], level, target, _area_name(all_areas, target)))
+                texts = [normalize(info["name"])]
+                if info.get("kana"):
+                    texts.append(normalize(info["kana"]))
+                self.keys.append(texts)
+                for text in texts:
+                    for gram in ngrams(text, 1):
+                        self.unigrams.setdefault(gram, []).append(entry_id)
+                    for gram in ngrams(text, 2):
+                        self.bigrams.setdefault(gram, []).append(entry_id)
+                    self.prefixes.append((text, entry_id))
+                if level == "offices":
+                    office_ids[code] = entry_id
+
+        for entry_id, entry in enumerate(self.entries):
+            if entry.level == "centers":
+                self.children[entry_id] = [office_ids[c] for c in all_areas["centers"][entry.code].get("children", [])
+                                           if c in office_ids]
+        # 同じ文字を複数回含む名前で重複しないよう、ポスティングリストを集合にしておく
+        self.unigrams = {k: frozenset(v) for k, v in self.unigrams.items()}
+        self.bigrams = {k: frozenset(v) for k, v in self.bigrams.items()}
+        self.prefixes.sort()
+
+    @staticmethod
+    def _target(level, code, info, class10s, class15s):
+        """選択時に予報を表示する地域コード (市町村は所属するclass10地域。たどれない場合はNone)"""
+        if level in ("centers", "offices", "class10s"):
+            return code
+        # class20 → class15 → class10 とたどる
+        class15 = info.get("parent")
+        class10 = class15s.get(class15, {}).get("parent")
+        return class10 if class10 in class10s else None
+
+    def _candidates(self, query):
+        if len(query) == 1:
+            return self.unigrams.get(query, frozenset())
+        postings = []
+        for gram in ngrams(query, 2):
+            posting = self.bigrams.get(gram)
+            if not posting:
+                return frozenset()
+            postings.append(posting)
+        postings.sort(key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            result = result & posting
+            if not result:
+                break
+        if len(query) == 2:
+            return result
+        # 2-gram が全部含まれていても連続しているとは限らないので部分一致を確認する
+        return [i for i in result if any(query in text for text in self.keys[i])]
+
+    def _prefix_ids(self, query):
+        ids = set()
+        i = bisect.bisect_left(self.prefixes, (query, -1))
+        while i < len(self.prefixes) and self.prefixes[i][0].startswith(query):
+            ids.add(self.prefixes[i][1])
+            i += 1
+        return ids
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """部分一致する地域を、前方一致 → class10 → 府県予報区 → 市町村 の順に最大limit件返す"""
+        query = normalize(query.strip())
+        if not query:
+            return []
+        prefix_ids = self._prefix_ids(query)
+        ids = set(self._candidates(query)) | prefix_ids
+        # 地方名に一致した場合は配下の府県予報区を結果にする
+        for entry_id in [i for i in ids if self.entries[i].level == "centers"]:
+            ids.discard(entry_id)
+            ids.update(self.children.get(entry_id, []))
+        ranked = heapq.nsmallest(limit, ids, key=lambda i: (i not in prefix_ids, LEVEL_RANK[self.entries[i].level],
+                                                            len(self.entries[i].name), i))
+        return [self.entries[i] for i in ranked]
+
+
+class Debouncer:
+    """最後の呼び出しから delay 秒たってから一度だけ func を実行する (キー入力ごとの再描画を間引く)"""
+
+    def __init__(self, delay, func):
+        self.delay = delay
+        self.func = func
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def __call__(self, *args):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.func, args)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def cancel(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
@@ -0,0 +1,50 @@
+import os
+import pickle
+import tempfile
+import time
+
+# --- 設定・定数 ---
+SNAPSHOT_FILE = "area_snapshot.pickle"
+# 保存形式を変えたら数字を上げる (古いスナップショットは読み捨てて再取得する)
+SNAPSHOT_VERSION = 2
+# 保存する階層と、各エリアから残すキー (英語名等は画面で使わないので捨てる。読みがなは地域検索で使う)
+AREA_LEVELS = ("centers", "offices", "class10s", "class15s", "class20s")
+KEEP_KEYS = ("name", "kana", "parent", "children")
+
+
+def compact_areas(all_areas):
+    """area.json から画面と地域検索に必要な階層・キーだけを抜き出す"""
+    compact = {}
+    for level in AREA_LEVELS:
+        compact[level] = {
+            code: {key: info[key] for key in KEEP_KEYS if key in info}
+            for code, info in all_areas.get(level, {}).items()
+        }
+    return compact
+
+
+def save_snapshot(all_areas, path=SNAPSHOT_FILE):
+    """地域データをバージョン付きでディスクに保存する (書き込み途中で落ちても壊れないよう置き換えで保存)"""
+    payload = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "areas": compact_areas(all_areas)}
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return payload["areas"]
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """保存済みの地域データを返す。無い・壊れている・バージョン違いの場合はNone"""
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        return None
+    return payload["areas"]
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+
+from http_client import get_client
+
+# --- 設定・定数 ---
+FORECAST_API_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
+# 気象庁の予報は1日数回 (05/11/17時) しか更新されないため、この秒数までは再取得せずメモリから返す
+DEFAULT_TTL = 600
+DEFAULT_MAX_ENTRIES = 64
+
+
+class CacheEntry:
+    """1つのofficeコードに対するキャッシュ内容"""
+    __slots__ = ("data", "etag", "last_modified", "report_datetime", "fetched_at")
+
+    def __init__(self, data, etag, last_modified, report_datetime, fetched_at):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.report_datetime = report_datetime
+        self.fetched_at = fetched_at
+
+
+def get_report_datetime(data):
+    """予報JSONの発表時刻 (reportDatetime) を返す。見つからない場合は空文字"""
+    try:
+        return data[0].get("reportDatetime", "")
+    except (IndexError, KeyError, AttributeError, TypeError):
+        return ""
+
+
+class ForecastCache:
+    """officeコードをキーにした予報JSONのLRUキャッシュ
+
+    - TTL内の再クリックはメモリから返す (hit)
+    - TTLを過ぎたエントリは ETag / Last-Modified を付けた条件付きGETで再検証する
+      (304なら revalidation、200なら refresh)
+    - 再取得したJSONの reportDatetime が手元より古い場合 (配信側の反映遅れ) は手元の予報を使い続ける
+    """
+
+    def __init__(self, base_url=FORECAST_API_BASE_URL, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 session=None, timeout=10, clock=time.monotonic):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # 既定では共有の HttpClient (keep-alive の接続プール) を使う。.get() を持つものなら差し替えられる
+        self.session = session if session is not None else get_client()
+        self.timeout = timeout
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # bytes: 200応答で受け取った本文のバイト数 (圧縮されていれば圧縮後)
+        self.stats = {"hits": 0, "misses": 0, "revalidations": 0, "refreshes": 0, "evictions": 0, "bytes": 0}
+
+    def url_for(self, office_code):
+        return f"{self.base_url}{office_code}.json"
+
+    def peek(self, office_code):
+        """通信せずに手元のJSONを返す (無ければNone)。鮮度は問わない"""
+        with self.lock:
+            entry = self.entries.get(office_code)
+            return entry.data if entry else None
+
+    def get(self, office_code):
+        """officeコードの予報JSONを返す。必要な場合だけ気象庁APIへ問い合わせる"""
+        with self.lock:
+            entry = self.entries.get(office_code)
+            if entry is not None:
+                self.entries.move_to_end(office_code)
+                if self.clock() - entry.fetched_at < self.ttl:
+                    self.stats["hits"] += 1
+                    return entry.data
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        # 通信中はロックを持たない (別の地域のクリックを待たせないため)
+        response = self.session.get(self.url_for(office_code), headers=headers, timeout=self.timeout)
+
+        if entry is not None and response.status_code == 304:
+            with self.lock:
+                entry.fetched_at = self.clock()
+                self.stats["revalidations"] += 1
+                self._store(office_code, entry)
+            return entry.data
+
+        response.raise_for_status()
+        data = response.json()
+        report_datetime = get_report_datetime(data)
+
+        with self.lock:
+            self.stats["bytes"] += int(response.headers.get("Content-Length") or len(response.content))
+            if entry is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["refreshes"] += 1
+                if report_datetime and entry.report_datetime and report_datetime < entry.report_datetime:
+                    # 古い発表が返ってきた場合は手元の新しい予報を残す
+                    entry.fetched_at = self.clock()
+                    self._store(office_code, entry)
+                    return entry.data
+            self._store(office_code, CacheEntry(
+                data,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                report_datetime,
+                self.clock(),
+            ))
+        return data
+
+    def _store(self, office_code, entry):
+        # 呼び出し側でロックを取得済みであること
+        self.entries[office_code] = entry
+        self.entries.move_to_end(office_code)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, office_code=None):
+        """指定したofficeコード (省略時は全件) のキャッシュを破棄する"""
+        with self.lock:
+            if office_code is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(office_code, None)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, size=len(self.entries))
@@ -0,0 +1,100 @@
+import flet as ft
+
+from weather_classifier import icon_for as classify_icon
+
+# 日ごとの予報カード
+# 地域を切り替えるたびにカードを作り直すと、Fletはカードの木全体をクライアントへ送り直す。
+# カードのコントロールは一度だけ作り、値 (文字・アイコン・色) だけを書き換えると、
+# 変わったプロパティだけが送られる。
+
+
+def _temp_label(value, missing):
+    return f"{value}℃" if value else missing
+
+
+class ForecastCard:
+    """予報カード1枚分のコントロールと、中身を書き換えるための参照
+
+    icon_for(weather, weather_code): 天気 → (アイコン, 色)。省略時は weather_classifier の分類を使う
+    height / elevation: カードの大きさ・影
+    bold_temps: 気温を太字 (size=14) で表示する
+    hide_missing_temps: 最低・最高気温のどちらかが無い日は気温の行を隠す (False なら "--℃" を表示)
+    """
+
+    def __init__(self, icon_for=classify_icon, height=160, elevation=None, bold_temps=False, hide_missing_temps=False):
+        self.icon_for = icon_for
+        self.hide_missing_temps = hide_missing_temps
+        self.values = None
+
+        temp_style = {"size": 14, "weight": ft.FontWeight.BOLD} if bold_temps else {}
+        self.date_text = ft.Text(size=14, weight=ft.FontWeight.BOLD)
+        self.weather_text = ft.Text(size=12, text_align=ft.TextAlign.CENTER)
+        self.icon = ft.Icon(size=36)
+        self.temp_min_text = ft.Text(color="blue", **temp_style)
+        self.temp_max_text = ft.Text(color="red", **temp_style)
+        self.temp_row = ft.Row([self.temp_min_text, ft.Text("/", size=temp_style.get("size")), self.temp_max_text],
+                               spacing=5, alignment=ft.MainAxisAlignment.CENTER)
+        self.control = ft.Card(
+            content=ft.Container(
+                content=ft.Column(
+                    [self.date_text, self.weather_text, self.icon, self.temp_row],
+                    alignment=ft.MainAxisAlignment.CENTER,
+                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                    spacing=5,
+                ),
+                padding=10,
+                width=130,
+                height=height,
+                alignment=ft.alignment.center,
+            ),
+            elevation=elevation,
+        )
+
+    def set(self, date_str, weather_str, temp_min_str=None, temp_max_str=None, weather_code=None):
+        """表示内容を書き換える。前回と同じ内容なら何もせず False を返す"""
+        values = (date_str, weather_str, temp_min_str, temp_max_str, weather_code)
+        if values == self.values:
+            return False
+        self.values = values
+
+        icon, icon_color = self.icon_for(weather_str, weather_code)
+        self.date_text.value = date_str
+        self.weather_text.value = weather_str.split("　")[0]
+        self.icon.name = icon
+        self.icon.color = icon_color
+        if self.hide_missing_temps:
+            self.temp_row.visible = temp_min_str is not None and temp_max_str is not None
+            missing = ""
+        else:
+            missing = "--℃"
+        self.temp_min_text.value = _temp_label(temp_min_str, missing)
+        self.temp_max_text.value = _temp_label(temp_max_str, missing)
+        return True
+
+
+class CardPool:
+    """予報カードを使い回す入れ物
+
+    row にカードを並べたまま、show() で中身だけを差し替える。
+    日数が増えた時だけカードを追加し、減った時は余りを隠す (削除しない)。
+    """
+
+    def __init__(self, row, **card_options):
+        self.row = row
+        self.card_options = card_options
+        self.cards = []
+
+    def show(self, days):
+        """days (DailyForecast のリスト) を表示する。書き換えたカードの枚数を返す"""
+        while len(self.cards) < len(days):
+            card = ForecastCard(**self.card_options)
+            self.cards.append(card)
+            self.row.controls.append(card.control)
+
+        changed = 0
+        for card, day in zip(self.cards, days):
+            changed += card.set(day.date, day.weather, day.temp_min, day.temp_max, day.weather_code)
+            card.control.visible = True
+        for card in self.cards[len(days):]:
+            card.control.visible = False
+        return changed
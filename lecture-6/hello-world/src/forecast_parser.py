@@ -0,0 +1,196 @@
+import datetime
+from typing import NamedTuple, Optional
+
+# 予報JSON (forecast/{office}.json) から画面・DB用のデータを取り出す処理
+# Fletに依存しないので、バックグラウンド処理やヘッドレスのジョブ・ベンチマークからも使える
+
+NO_INFO = "情報なし"
+# 気象庁の発表時刻の時間帯 (reportDatetime に時差が無い場合に使う)
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+class DailyForecast(NamedTuple):
+    """1地域・1日分の予報"""
+    date: str                    # "YYYY-MM-DD"
+    weather: str                 # 例: "くもり　時々　雨"
+    weather_code: Optional[str]  # 気象庁の天気コード (例: "200")
+    temp_min: Optional[str]
+    temp_max: Optional[str]
+
+
+def _date_of(time_define):
+    # "2025-01-01T05:00:00+09:00" → "2025-01-01" (fromisoformat + strftime と同じ結果)
+    return time_define[:10]
+
+
+def _blank_to_none(value):
+    return value if value not in (None, "") else None
+
+
+class ParsedForecast:
+    """1つのofficeの予報JSONを、地域コードで引ける形に一度だけ整理したもの"""
+
+    __slots__ = ("report_datetime", "publishing_office", "dates", "weather_by_code", "default_weather",
+                 "temps_by_code", "default_temps")
+
+    def __init__(self, data):
+        short_term = data[0]
+        self.report_datetime = short_term.get("reportDatetime", "")
+        self.publishing_office = short_term.get("publishingOffice", "")
+
+        # 短期予報: timeSeries[0] が天気 (class10単位)
+        weather_series = short_term["timeSeries"][0]
+        self.dates = [_date_of(t) for t in weather_series["timeDefines"]]
+        self.weather_by_code = {a["area"]["code"]: a for a in weather_series["areas"]}
+        # 該当地域が無い場合は主要地域 (先頭) のデータを使う
+        self.default_weather = weather_series["areas"][0]
+
+        # 週間予報: tempsMin/tempsMax を持つ系列から、日付 → (最低, 最高) を地域 (観測所) ごとに作る
+        self.temps_by_code = {}
+        self.default_temps = None
+        for series in (data[1]["timeSeries"] if len(data) > 1 else []):
+            dates = [_date_of(t) for t in series["timeDefines"]]
+            for area in series["areas"]:
+                if "tempsMin" not in area and "tempsMax" not in area:
+                    continue
+                temps_min = area.get("tempsMin", [])
+                temps_max = area.get("tempsMax", [])
+                temps = {
+                    d: (_blank_to_none(temps_min[i]) if i < len(temps_min) else None,
+                        _blank_to_none(temps_max[i]) if i < len(temps_max) else None)
+                    for i, d in enumerate(dates)
+                }
+                self.temps_by_code[area["area"]["code"]] = temps
+                if self.default_temps is None:
+                    self.default_temps = temps
+
+    @property
+    def area_codes(self):
+        return list(self.weather_by_code)
+
+    def daily(self, region_code):
+        """地域コードの日ごとの予報 (DailyForecast のリスト) を返す"""
+        weather_data = self.weather_by_code.get(region_code, self.default_weather)
+        weathers = weather_data.get("weathers", [])
+        codes = weather_data.get("weatherCodes", [])
+        temps = self.temps_by_code.get(region_code, self.default_temps) or {}
+
+        days = []
+        for i, d in enumerate(self.dates):
+            t_min, t_max = temps.get(d, (None, None))
+            days.append(DailyForecast(
+                d,
+                weathers[i] if i < len(weathers) else NO_INFO,
+                codes[i] if i < len(codes) else None,
+                t_min,
+                t_max,
+            ))
+        return days
+
+
+def parse_forecast(data):
+    """予報JSONを ParsedForecast に変換する"""
+    return ParsedForecast(data)
+
+
+def same_days(days, other):
+    """2つの DailyForecast のリストが、天気コードを除いて同じ予報か (DBの予報は天気コードを持たない)"""
+    return [(d.date, d.weather, d.temp_min, d.temp_max) for d in days] == \
+        [(d.date, d.weather, d.temp_min, d.temp_max) for d in other]
+
+
+def report_age(report_datetime, now=None):
+    """発表時刻 ("2025-01-01T05:00:00+09:00") からの経過を「3時間前」の形で返す (読めなければ空文字)"""
+    try:
+        reported = datetime.datetime.fromisoformat(report_datetime)
+    except (TypeError, ValueError):
+        return ""
+    if reported.tzinfo is None:
+        reported = reported.replace(tzinfo=JST)
+    seconds = ((now or datetime.datetime.now(JST)) - reported).total_seconds()
+    if seconds < 60:
+        return "たった今"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}分前"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}時間前"
+    return f"{int(seconds // 86400)}日前"
+
+
+# --- 時系列データ (正規化スキーマ用) ---
+
+# 予報JSONのキー → 系列の種類。(短期/週間, キー) ごとに区別する
+SHORT_TERM_KEYS = {
+    "weathers": "weather",     # 天気 (数値は weatherCodes、文字列は weathers)
+    "winds": "wind",
+    "waves": "wave",
+    "pops": "pop",
+    "temps": "temp",
+}
+WEEKLY_KEYS = {
+    "weatherCodes": "weekly_weather",
+    "pops": "weekly_pop",
+    "reliabilities": "weekly_reliability",
+    "tempsMin": "temp_min",
+    "tempsMinUpper": "temp_min_upper",
+    "tempsMinLower": "temp_min_lower",
+    "tempsMax": "temp_max",
+    "tempsMaxUpper": "temp_max_upper",
+    "tempsMaxLower": "temp_max_lower",
+}
+# 数値を持たない (文字列だけの) 系列
+TEXT_KINDS = {"wind", "wave", "weekly_reliability"}
+
+
+class SeriesPoint(NamedTuple):
+    """1地域・1系列・1時刻の値"""
+    area_code: str
+    area_name: str
+    kind: str
+    ts: int                 # UNIX時刻 (秒)
+    value: Optional[float]
+    text: Optional[str]
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_series(data):
+    """予報JSONに含まれる全ての時系列 (降水確率・風・週間予報も含む) を SeriesPoint として返す"""
+    blocks = ((data[0], SHORT_TERM_KEYS),) + (((data[1], WEEKLY_KEYS),) if len(data) > 1 else ())
+    for block, keys in blocks:
+        for series in block["timeSeries"]:
+            times = [int(datetime.datetime.fromisoformat(t).timestamp()) for t in series["timeDefines"]]
+            for area in series["areas"]:
+                code = area["area"]["code"]
+                name = area["area"].get("name", "")
+                for key, kind in keys.items():
+                    values = area.get(key)
+                    if not values:
+                        continue
+                    # 短期予報の天気は weatherCodes を数値、weathers を文字列として1点にまとめる
+                    codes = area.get("weatherCodes", []) if kind == "weather" else values
+                    for i, ts in enumerate(times):
+                        if i >= len(values) or values[i] in (None, ""):
+                            continue
+                        if kind in TEXT_KINDS:
+                            yield SeriesPoint(code, name, kind, ts, None, values[i])
+                        elif kind == "weather":
+                            yield SeriesPoint(code, name, kind, ts, _to_number(codes[i]) if i < len(codes) else None, values[i])
+                        else:
+                            yield SeriesPoint(code, name, kind, ts, _to_number(values[i]), None)
+
+
+def forecast_rows(forecast, region_code, region_name):
+    """weather_forecasts テーブルに保存する行 (area_code, area_name, date, weather, temp_max, temp_min) を返す
+
+    forecast には ParsedForecast か、予報JSONそのものを渡せる。
+    """
+    if not isinstance(forecast, ParsedForecast):
+        forecast = parse_forecast(forecast)
+    return [(region_code, region_name, day.date, day.weather, day.temp_max, day.temp_min)
+            for day in forecast.daily(region_code)]
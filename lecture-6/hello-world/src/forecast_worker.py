@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 同時に走らせる予報取得の上限 (連打されても気象庁APIへの同時接続はこれ以上増えない)
+DEFAULT_MAX_WORKERS = 4
+
+
+class ForecastWorker:
+    """予報の取得をイベントハンドラから切り離して実行し、最後に選択された地域の結果だけを描画する
+
+    submit() のたびに世代番号を1つ進め、取得が終わった時点で世代が古ければ結果を捨てる。
+    これにより、遅れて返ってきた古い地域の予報が新しい選択を上書きすることがない。
+    描画 (page.update) は世代番号のロックの外で行うので、描画中でも submit() はすぐに戻る
+    (preview を渡した場合だけ、実行中の描画が終わるのを待つ。通信は待たない)。
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast")
+        self.lock = threading.Lock()          # 世代番号と統計だけを守る (短時間しか持たない)
+        self.render_lock = threading.Lock()   # 描画を1つずつ行う (submit() は取らない)
+        self.generation = 0
+        self.stats = {"submitted": 0, "previews": 0, "rendered": 0, "discarded": 0, "errors": 0}
+
+    def submit(self, load, render, on_error=None, preview=None):
+        """load() をバックグラウンドで実行し、最新の依頼であれば render(結果) を呼ぶ (すぐに戻る)
+
+        preview があれば、呼び出したスレッドで先に preview() を呼ぶ (保存済みの予報の表示など)。世代を進めてから
+        render と同じ描画の順番で呼ぶので、前の地域の描画が preview を上書きすることはない。
+        スレッドプールを使わないので、前の地域の取得でスレッドが埋まっていても preview は待たされない。
+        """
+        with self.lock:
+            self.generation += 1
+            token = self.generation
+            self.stats["submitted"] += 1
+        if preview is not None:
+            self._deliver(token, "previews", preview)
+        return self.executor.submit(self._run, token, load, render, on_error)
+
+    def is_current(self, token):
+        with self.lock:
+            return token == self.generation
+
+    def cancel_pending(self):
+        """実行中・待機中の依頼をすべて古い扱いにする (結果は描画されない)"""
+        with self.lock:
+            self.generation += 1
+
+    def _run(self, token, load, render, on_error):
+        if not self.is_current(token):
+            # 待っている間に次の選択があった場合は通信自体を省く
+            with self.lock:
+                self.stats["discarded"] += 1
+            return
+        try:
+            result = load()
+        except Exception as e:
+            if on_error is None:
+                self._claim(token, "errors")
+            else:
+                self._deliver(token, "errors", on_error, e)
+            return
+        self._deliver(token, "rendered", render, result)
+
+    def _claim(self, token, stat):
+        """token が最新なら stats[stat] を、古ければ stats["discarded"] を数え、最新かどうかを返す"""
+        with self.lock:
+            current = token == self.generation
+            self.stats[stat if current else "discarded"] += 1
+        return current
+
+    def _deliver(self, token, stat, callback, *args):
+        # 描画は1つずつ行い、その直前に世代を確かめる。描画中に次の選択があっても、
+        # 次の描画はこの描画の後になるので、古い結果が新しい結果を上書きすることはない
+        with self.render_lock:
+            current = self._claim(token, stat)
+            if current:
+                callback(*args)
+        return current
+
+    def shutdown(self):
+        self.cancel_pending()
+        self.executor.shutdown(wait=False)
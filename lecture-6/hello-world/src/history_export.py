@@ -0,0 +1,301 @@
+"""予報の履歴 (forecast_history) を列ごとの NumPy 配列 (.npy) に書き出し、メモリマップで読む
+
+SQLiteから1行ずつ読むと、気温 (TEXT) や天気 (自由な文字列) を分析のたびに変換し直すことになる。
+書き出しの時に一度だけ型を揃えておけば、np.load(mmap_mode="r") でSQLもコピーも無しに1年分を読める。
+
+出力先のディレクトリ:
+    meta.json        行数・辞書 (地域コード・天気文字列・カテゴリ名)・チャンクごとの日付の範囲・書き出し済みの seq
+    area.npy         int32          地域 (meta["areas"] の番号)
+    target_date.npy  datetime64[D]  予報の対象日
+    report_time.npy  datetime64[s]  発表時刻 (UTC)
+    weather.npy      int32          天気文字列 (meta["weathers"] の番号)
+    category.npy     uint8          天気カテゴリ (weather_classifier の値。名前は meta["categories"])
+    temp_max.npy / temp_min.npy  float32 (値の無い日は NaN)
+
+2回目以降は、前回より後にDBに保存された行 (forecast_history.seq が前回より大きい行) だけを各ファイルの末尾に追記する
+(--full で作り直す)。行は保存された順に並ぶ。
+NumPy が必要 (pip install numpy)。アプリ本体はこのモジュールを読み込まない。
+
+実行例 (プロジェクトルートから):
+    python src/history_export.py --db weather_history.db --out history_npy
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from weather_classifier import CATEGORY_NAMES
+from weather_store import DB_NAME, WeatherStore, to_timestamp
+
+ARCHIVE_VERSION = 2
+META_FILE = "meta.json"
+# 1回に読み込んで追記する行数 (= 日付の範囲を記録するチャンクの大きさ)
+BATCH_ROWS = 50_000
+
+COLUMNS = {
+    "area": np.dtype(np.int32),
+    "target_date": np.dtype("datetime64[D]"),
+    "report_time": np.dtype("datetime64[s]"),
+    "weather": np.dtype(np.int32),
+    "category": np.dtype(np.uint8),
+    "temp_max": np.dtype(np.float32),
+    "temp_min": np.dtype(np.float32),
+}
+
+
+def _column_path(path, name):
+    return os.path.join(path, f"{name}.npy")
+
+
+def read_meta(path):
+    """出力先の meta.json を返す (まだ書き出していなければ None)"""
+    try:
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == ARCHIVE_VERSION else None
+
+
+def _write_meta(path, meta):
+    # 一時ファイルに書いてから置き換える (meta.json の行数が書き出しの確定点)
+    fd, tmp = tempfile.mkstemp(dir=path, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(path, META_FILE))
+
+
+def _empty_meta():
+    return {
+        "version": ARCHIVE_VERSION,
+        "rows": 0,
+        "areas": [],
+        "weathers": [],
+        "categories": {str(k): v for k, v in CATEGORY_NAMES.items()},
+        "chunks": [],             # [開始行, 終了行, 最小の対象日, 最大の対象日]
+        "last_seq": 0,            # 書き出し済みの forecast_history.seq の最大値
+    }
+
+
+def _append_npy(path, array, rows):
+    """.npy ファイルの先頭 rows 行の後ろに array を追記し、ヘッダーの行数を書き換える
+
+    NumPy は行数が増えてもヘッダーの長さが変わらないよう余白を取っているので、ヘッダーはその場で書き換えられる。
+    前回の追記が途中で止まっていても、meta.json の行数より後ろは切り捨ててから追記する。
+    """
+    if not os.path.exists(path):
+        np.save(path, array[:0])
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        _, _, dtype = read_header(f)
+        if dtype != array.dtype:
+            raise ValueError(f"{path}: 型が一致しません ({dtype} != {array.dtype})")
+        offset = f.tell()
+        f.truncate(offset + rows * dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(array).tobytes())
+        f.seek(0)
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                  "shape": (rows + len(array),)}
+        (np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0)(f, header)
+        if f.tell() != offset:
+            raise ValueError(f"{path}: ヘッダーの長さが変わりました")
+
+
+def _encoder(values):
+    """辞書 (リスト) に無い値を末尾に追加しながら番号を振る関数を返す"""
+    index = {v: i for i, v in enumerate(values)}
+
+    def encode(value):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+    return encode
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _encode_batch(rows, encode_area, encode_weather, report_times):
+    """SQLiteの行 (seq, area_code, target_date, report_datetime, weather, weather_category, temp_max, temp_min) を列ごとの配列にする"""
+    _, areas, dates, reports, weathers, categories, t_max, t_min = zip(*rows)
+    for report in set(reports) - report_times.keys():
+        report_times[report] = to_timestamp(report)
+    return {
+        "area": np.array([encode_area(a) for a in areas], dtype=COLUMNS["area"]),
+        "target_date": np.array(dates, dtype=COLUMNS["target_date"]),
+        "report_time": np.array([report_times[r] for r in reports], dtype=np.int64).astype(COLUMNS["report_time"]),
+        "weather": np.array([encode_weather(w or "") for w in weathers], dtype=COLUMNS["weather"]),
+        "category": np.array([c or 0 for c in categories], dtype=COLUMNS["category"]),
+        "temp_max": np.array([_number(t) for t in t_max], dtype=COLUMNS["temp_max"]),
+        "temp_min": np.array([_number(t) for t in t_min], dtype=COLUMNS["temp_min"]),
+    }
+
+
+def _remove_archive(path):
+    """path にある、このモジュールが書き出したファイル (列の .npy と meta.json) だけを削除する"""
+    for name in [*(f"{column}.npy" for column in COLUMNS), META_FILE]:
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+
+
+def _ensure_seq(db_name):
+    """seq 列の無い古いDBなら、WeatherStore で一度開いて seq を振る (以降は読み取り専用で開ける)"""
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(forecast_history)")}
+    finally:
+        conn.close()
+    if "seq" not in columns:
+        WeatherStore(db_name).close()
+
+
+def export_history(db_name, out_dir, full=False, batch_rows=BATCH_ROWS):
+    """forecast_history を out_dir に書き出す (既にあれば前回より後に保存された行だけを追記する)。追記した行数を返す
+
+    DBは読み取り専用の別接続で開くので、アプリや定時更新サービスの書き込みを止めない (WALモード)。
+    差分は発表時刻ではなく保存の順番 (seq) で取るので、古い発表が後から保存されても漏れない。
+    """
+    if full:
+        _remove_archive(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    _ensure_seq(db_name)
+    meta = read_meta(out_dir) or _empty_meta()
+    encode_area = _encoder(meta["areas"])
+    encode_weather = _encoder(meta["weathers"])
+    report_times = {}
+
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    try:
+        cur = conn.execute('''
+            SELECT seq, area_code, target_date, report_datetime, weather, weather_category, temp_max, temp_min
+            FROM forecast_history
+            WHERE seq > ?
+            ORDER BY seq
+        ''', (meta["last_seq"],))
+        written = 0
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            columns = _encode_batch(rows, encode_area, encode_weather, report_times)
+            start = meta["rows"]
+            for name, array in columns.items():
+                _append_npy(_column_path(out_dir, name), array, start)
+            dates = columns["target_date"]
+            meta["rows"] = start + len(rows)
+            meta["chunks"].append([start, meta["rows"], str(dates.min()), str(dates.max())])
+            meta["last_seq"] = rows[-1][0]
+            written += len(rows)
+    finally:
+        conn.close()
+    if not meta["chunks"]:
+        # 空のDBでも読み込めるように、空の列ファイルを作っておく
+        for name, dtype in COLUMNS.items():
+            _append_npy(_column_path(out_dir, name), np.empty(0, dtype), 0)
+    # 最後に meta.json を書き換えて確定する (途中で止まった場合、追記した分は次回に切り捨てて書き直す)
+    _write_meta(out_dir, meta)
+    return written
+
+
+class HistoryArchive:
+    """export_history の出力をメモリマップで開いたもの
+
+    columns[name] は .npy ファイルをそのまま指す読み取り専用の配列 (読んだ部分だけがディスクから読み込まれる)。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = read_meta(path)
+        if self.meta is None:
+            raise FileNotFoundError(f"{path} に書き出された履歴がありません")
+        self.rows = self.meta["rows"]
+        self.areas = self.meta["areas"]
+        self.weathers = self.meta["weathers"]
+        self.categories = {int(k): v for k, v in self.meta["categories"].items()}
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            # meta.json の行数より後ろ (途中で止まった追記) は読まない
+            self.columns[name] = (np.load(_column_path(path, name), mmap_mode="r")[:self.rows] if self.rows
+                                  else np.empty(0, dtype))
+
+    def span(self, start=None, end=None):
+        """対象日が [start, end) の行を含みうる行の範囲 (slice)。チャンクごとの日付の範囲だけで決める"""
+        hits = [(lo, hi) for lo, hi, first, last in self.meta["chunks"]
+                if (end is None or first < end) and (start is None or last >= start)]
+        if not hits:
+            return slice(0, 0)
+        return slice(hits[0][0], hits[-1][1])
+
+    def select(self, start=None, end=None, latest=False):
+        """対象日が [start, end) ("YYYY-MM-DD") の行を列ごとの配列で返す
+
+        latest=True なら (地域, 対象日) ごとに最も新しい発表の行だけを残す (forecast_latest と同じ内容)。
+        """
+        rows = self.span(start, end)
+        dates = self.columns["target_date"][rows]
+        mask = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            mask &= dates >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= dates < np.datetime64(end, "D")
+        if mask.all():
+            # 範囲がチャンクの境界と一致すればコピーせずにメモリマップのまま返す
+            result = {name: column[rows] for name, column in self.columns.items()}
+        else:
+            result = {name: column[rows][mask] for name, column in self.columns.items()}
+        if latest:
+            result = _keep_latest(result)
+        return result
+
+    def area_codes(self, area):
+        """area 列 (番号) を地域コードの配列に戻す"""
+        return np.asarray(self.areas, dtype=object)[area]
+
+    def weather_texts(self, weather):
+        """weather 列 (番号) を天気文字列の配列に戻す"""
+        return np.asarray(self.weathers, dtype=object)[weather]
+
+
+def _keep_latest(columns):
+    """(地域, 対象日) ごとに report_time が最大の行だけを残す"""
+    if not len(columns["area"]):
+        return columns
+    order = np.lexsort((columns["report_time"], columns["target_date"], columns["area"]))
+    area, date = columns["area"][order], columns["target_date"][order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (area[1:] != area[:-1]) | (date[1:] != date[:-1])
+    keep = order[last]
+    return {name: column[keep] for name, column in columns.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="予報の履歴を列ごとの .npy ファイルに書き出す (2回目以降は追記)")
+    parser.add_argument("--db", default=DB_NAME, help="読み込むSQLiteファイル")
+    parser.add_argument("--out", default="history_npy", help="出力先のディレクトリ")
+    parser.add_argument("--full", action="store_true", help="追記せずに全件を書き出し直す")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    written = export_history(args.db, args.out, full=args.full)
+    elapsed = time.perf_counter() - start
+    total = read_meta(args.out)["rows"]
+    print(f"{written} 行を書き出しました (合計 {total} 行, {elapsed:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+import calendar
+
+import flet as ft
+
+from forecast_cards import ForecastCard
+from weather_classifier import CATEGORY_NAMES, CLOUDY, RAIN, SNOW, SUNNY, UNKNOWN
+
+# 過去予報の月表示 (カードの一覧 / カレンダー形式のヒートマップ)
+# WeatherStore.month_for_area の列指向の結果から、1回の page.update() で描画できるコントロールを作る
+
+# ヒートマップのマスの色 (天気カテゴリごと)
+HEATMAP_COLORS = {
+    SUNNY: "orange200",
+    CLOUDY: "grey400",
+    RAIN: "blue300",
+    SNOW: "lightBlue100",
+    UNKNOWN: "grey200",
+}
+EMPTY_COLOR = "white"
+WEEKDAYS = ("月", "火", "水", "木", "金", "土", "日")
+CELL_SIZE = 44
+
+
+def next_month(month):
+    """ "YYYY-MM" の翌月"""
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def month_cards(columns):
+    """1か月分の予報をカードのリストにする"""
+    cards = []
+    for date_str, weather, t_max, t_min in zip(columns["date"], columns["weather"],
+                                               columns["temp_max"], columns["temp_min"]):
+        card = ForecastCard()
+        card.set(date_str, weather or "", t_min, t_max)
+        cards.append(card.control)
+    return cards
+
+
+def month_heatmap(columns, month):
+    """1か月分の予報を、天気カテゴリで色分けしたカレンダーにする (予報の無い日は白)"""
+    by_day = {
+        int(date_str[8:10]): (weather, category, t_max)
+        for date_str, weather, category, t_max in zip(columns["date"], columns["weather"],
+                                                      columns["category"], columns["temp_max"])
+    }
+    header = ft.Row([ft.Container(ft.Text(w, size=12), width=CELL_SIZE, alignment=ft.alignment.center)
+                     for w in WEEKDAYS], spacing=2)
+    weeks = [header]
+    for week in calendar.Calendar().monthdayscalendar(int(month[:4]), int(month[5:7])):
+        cells = []
+        for day in week:
+            if day == 0:
+                cells.append(ft.Container(width=CELL_SIZE, height=CELL_SIZE))
+                continue
+            weather, category, t_max = by_day.get(day, (None, None, None))
+            label = f"{day}" if t_max in (None, "") else f"{day}\n{t_max}℃"
+            cells.append(ft.Container(
+                ft.Text(label, size=10, text_align=ft.TextAlign.CENTER),
+                width=CELL_SIZE,
+                height=CELL_SIZE,
+                alignment=ft.alignment.center,
+                bgcolor=HEATMAP_COLORS.get(category, HEATMAP_COLORS[UNKNOWN]) if weather else EMPTY_COLOR,
+                border=ft.border.all(1, "grey300"),
+                border_radius=4,
+                tooltip=weather,
+            ))
+        weeks.append(ft.Row(cells, spacing=2))
+    return ft.Column(weeks, spacing=2)
+
+
+def summary_text(summary):
+    """WeatherStore.monthly_summary の1か月分を「晴れ 10日 / 雨 5日 … 平均 12.3℃ / 4.5℃」の形にする"""
+    if not summary["month"]:
+        return ""
+    parts = [
+        f"{CATEGORY_NAMES[category]} {summary[column][0]}日"
+        for category, column in ((SUNNY, "n_sunny"), (CLOUDY, "n_cloudy"), (RAIN, "n_rain"), (SNOW, "n_snow"))
+        if summary[column][0]
+    ]
+    avg_max, avg_min = summary["avg_temp_max"][0], summary["avg_temp_min"][0]
+    temps = f"平均 {avg_max:.1f}℃ / {avg_min:.1f}℃" if avg_max is not None and avg_min is not None else ""
+    return " / ".join(parts) + (f"  {temps}" if temps else "")
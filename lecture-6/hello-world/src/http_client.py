@@ -0,0 +1,113 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 気象庁APIへの通信をまとめる共通のHTTPクライアント
+# requests.get を毎回呼ぶと、呼ぶたびにTCP/TLS接続を張り直す。
+# Session を1つ共有すれば keep-alive の接続プールが使い回され、2回目以降はハンドシェイクが要らない。
+
+# (接続, 読み込み) のタイムアウト秒数。無指定だと応答が止まった時にUIが永遠に待ち続ける
+DEFAULT_TIMEOUT = (5, 30)
+# 接続プール: 同時に保持する接続数 (ホストごと)
+DEFAULT_POOL_SIZE = 8
+# 失敗時の再試行: 回数と待ち時間 (backoff_factor * 2^(n-1) 秒)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+USER_AGENT = "dsprog2-weather-app"
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """keep-alive の接続プール・gzip・再試行を設定した requests.Session を作る"""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": USER_AGENT})
+    return session
+
+
+class RequestTiming:
+    """1リクエスト分の計測値"""
+    __slots__ = ("method", "url", "status", "elapsed", "bytes")
+
+    def __init__(self, method, url, status, elapsed, nbytes):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.elapsed = elapsed  # 送信から本文の受信完了までの秒数
+        self.bytes = nbytes     # 受信した本文のバイト数 (圧縮されていれば圧縮後)
+
+
+class HttpClient:
+    """Session を共有し、既定のタイムアウトとリクエストごとの計測フックを付けたクライアント
+
+    ForecastCache などには .get() を持つものとしてそのまま渡せる。
+    add_hook(func) で登録した func(RequestTiming) がリクエストごとに呼ばれる。
+    """
+
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT):
+        self.session = session if session is not None else create_session()
+        self.timeout = timeout
+        self.hooks = []
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0, "elapsed": 0.0}
+
+    def add_hook(self, func):
+        self.hooks.append(func)
+
+    def remove_hook(self, func):
+        self.hooks.remove(func)
+
+    def get(self, url, timeout=None, **kwargs):
+        """GETリクエスト (timeout を省略すると DEFAULT_TIMEOUT)。通信エラーは requests の例外のまま送出する"""
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            with self.lock:
+                self.stats["requests"] += 1
+                self.stats["errors"] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        nbytes = int(response.headers.get("Content-Length") or len(response.content))
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += nbytes
+            self.stats["elapsed"] += elapsed
+        if self.hooks:
+            timing = RequestTiming("GET", url, response.status_code, elapsed, nbytes)
+            for hook in list(self.hooks):
+                hook(timing)
+        return response
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """アプリ全体で共有する HttpClient を返す (初回呼び出し時に作る)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -1,107 +1,56 @@
-import flet as ft
-import requests
 import datetime
-import sqlite3
-import os
+
+import flet as ft
+
+from area_index import EMPTY_INDEX, AreaIndex
+from area_search import AreaSearchIndex, Debouncer
+from area_snapshot import load_snapshot, save_snapshot
+from forecast_cards import CardPool, ForecastCard
+from forecast_cache import ForecastCache
+from forecast_parser import JST, DailyForecast, forecast_rows, iter_series, parse_forecast, report_age
+from forecast_worker import ForecastWorker
+from history_view import month_cards, month_heatmap, next_month, summary_text
+from http_client import get_client
+from region_sidebar import RegionSidebar
+from weather_store import get_store
 
 # --- 設定・定数 ---
 # 課題要件に基づき SQLite DB名を指定
 DB_NAME = "weather_history.db"
-AREA_API_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
+AREA_API_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
 FORECAST_API_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
-
-# --- データベース関連の関数 (DB格納・設計の要件) ---
-
-def init_db():
-    """DBの初期化: テーブル設計とプライマリーキーの設定"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    # 課題のヒントに基づき、area_codeとdateをキーとして一意性を確保
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS weather_forecasts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            area_code TEXT,
-            area_name TEXT,
-            date TEXT,
-            weather TEXT,
-            temp_max TEXT,
-            temp_min TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(area_code, date)
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def save_forecast_to_db(area_code, area_name, date_str, weather, t_max, t_min):
-    """取得したJSONデータをDBに移行する処理"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    try:
-        # 重複がある場合は最新の天気情報で更新（正規化とデータ整合性の考慮）
-        cursor.execute('''
-            INSERT OR REPLACE INTO weather_forecasts (area_code, area_name, date, weather, temp_max, temp_min)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (area_code, area_name, date_str, weather, t_max, t_min))
-        conn.commit()
-    except sqlite3.Error as e:
-        print(f"DB保存エラー: {e}")
-    finally:
-        conn.close()
-
-def get_forecast_from_db(area_code, date_str):
-    """日付選択で過去の予報を閲覧するための関数"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT weather, temp_max, temp_min FROM weather_forecasts 
-        WHERE area_code = ? AND date = ?
-    ''', (area_code, date_str))
-    result = cursor.fetchone()
-    conn.close()
-    return result
+# 地域データのローカルスナップショット (起動時はこれを先に描画する)
+SNAPSHOT_FILE = "area_snapshot.pickle"
+# 地域検索: 入力が止まってから検索するまでの秒数
+SEARCH_DEBOUNCE = 0.15
 
 # --- UIヘルパー関数 ---
 
-def get_weather_icon(weather_str):
-    if "晴" in weather_str and "曇" not in weather_str and "雨" not in weather_str:
-        return ft.Icons.WB_SUNNY, "orange"
-    elif "雪" in weather_str:
-        return ft.Icons.AC_UNIT, "lightBlue"
-    elif "雨" in weather_str:
-        return ft.Icons.UMBRELLA, "blue"
-    elif "曇" in weather_str:
-        return ft.Icons.CLOUD, "grey"
-    else:
-        return ft.Icons.QUESTION_MARK, "black"
-
 def create_forecast_card(date_str, weather_str, temp_min_str=None, temp_max_str=None):
-    icon, icon_color = get_weather_icon(weather_str)
-    
-    temp_row = ft.Row([
-        ft.Text(f"{temp_min_str if temp_min_str else '--'}℃", color="blue"),
-        ft.Text("/"),
-        ft.Text(f"{temp_max_str if temp_max_str else '--'}℃", color="red")
-    ], spacing=5, alignment=ft.MainAxisAlignment.CENTER)
-
-    return ft.Card(
-        content=ft.Container(
-            content=ft.Column([
-                ft.Text(date_str, size=14, weight="bold"),
-                ft.Text(weather_str.split("　")[0], size=12, text_align="center"),
-                ft.Icon(icon, size=36, color=icon_color),
-                temp_row,
-            ], alignment="center", horizontal_alignment="center", spacing=5),
-            padding=10, width=130, height=160
-        )
-    )
+    """単発の予報カード (過去予報の表示用)。地域ごとの予報は CardPool のカードを使い回す"""
+    card = ForecastCard()
+    card.set(date_str, weather_str, temp_min_str, temp_max_str)
+    return card.control
 
 # --- メインロジック ---
 
 all_areas = {}
+area_index = EMPTY_INDEX
+area_search = AreaSearchIndex({})
+# officeコードごとの予報JSONキャッシュ (同じ府県の再クリックは通信しない)
+forecast_cache = ForecastCache(FORECAST_API_BASE_URL)
+# 予報取得をUIスレッドから切り離す実行器 (連続クリック時は最後の地域だけを描画)
+forecast_worker = ForecastWorker()
+
+def set_area_data(areas):
+    """地域データを差し替え、コード→officeの逆引きインデックスと地域名の検索インデックスを作り直す"""
+    global all_areas, area_index, area_search
+    all_areas = areas
+    area_index = AreaIndex(areas)
+    area_search = AreaSearchIndex(areas)
 
 def main(page: ft.Page):
-    init_db() # 起動時にDBテーブル作成
+    store = get_store(DB_NAME) # 起動時にDB接続を開き、テーブル作成
     
     page.title = "天気予報アプリ (DB/Git Flow課題対応版)"
     page.window_width = 1000
@@ -113,102 +62,202 @@ def main(page: ft.Page):
 
     # UIコンポーネント
     forecast_display = ft.Row(wrap=True, spacing=15)
+    # 地域を切り替えてもカードは作り直さず、中身だけを書き換える
+    forecast_cards = CardPool(forecast_display)
+    forecast_loading = ft.ProgressRing(visible=False)
+    forecast_error = ft.Text(color="red", visible=False)
+    # 保存済みの予報を表示している間の目印 (発表からの経過時間・オフライン表示)
+    forecast_badge_text = ft.Text(size=12)
+    forecast_badge = ft.Container(forecast_badge_text, padding=ft.padding.symmetric(4, 10), border_radius=12,
+                                  visible=False)
     history_display = ft.Container()
     
+    # 月表示の切り替え (カードの一覧 / ヒートマップ)
+    heatmap_switch = ft.Switch(label="ヒートマップで表示", value=True, on_change=lambda e: render_history())
+
+    def render_history():
+        """選んだ日の予報と、その月の予報 (1クエリで取得) をまとめて1回の更新で描画する"""
+        selected_date = state.get("history_date")
+        if not selected_date:
+            return
+        db_data = store.get_forecast(state["area_code"], selected_date)
+
+        if db_data:
+            weather, t_max, t_min = db_data
+            controls = [
+                ft.Text(f"📅 DBに保存されている予報 ({selected_date})", size=16, weight="bold"),
+                create_forecast_card(selected_date, weather, t_min, t_max)
+            ]
+            # 発表ごとに予報が変わっていれば、その変遷も表示する
+            revisions = store.get_revisions(state["area_code"], selected_date)
+            if len(revisions) > 1:
+                controls.append(ft.Text("🕒 予報の変遷 (発表時刻順)", size=14, weight="bold"))
+                controls.extend(
+                    ft.Text(f"{report[:16].replace('T', ' ')}  {w}  {r_min or '--'}℃ / {r_max or '--'}℃", size=12)
+                    for report, w, r_max, r_min in revisions
+                )
+        else:
+            controls = [ft.Text(f"❌ {selected_date} のデータはDBに見当たりません。", color="orange")]
+
+        # 同じ月の予報: 日別の行は forecast_latest から、月の内訳は集計テーブル forecast_monthly から読む
+        month = selected_date[:7]
+        columns = store.month_for_area(state["area_code"], month)
+        if columns["date"]:
+            summary = store.monthly_summary(state["area_code"], month, next_month(month))
+            controls += [
+                ft.Divider(),
+                ft.Row([ft.Text(f"🗓 {month} の予報 ({len(columns['date'])} 日分)", size=14, weight="bold"),
+                        heatmap_switch], alignment="spaceBetween"),
+                ft.Text(summary_text(summary), size=12),
+                month_heatmap(columns, month) if heatmap_switch.value
+                else ft.Row(month_cards(columns), wrap=True, spacing=10),
+            ]
+        history_display.content = ft.Column(controls)
+        page.update()
+
     # 過去予報閲覧機能（オプション要件）のためのDatePicker
     def on_date_picked(e):
         if date_picker.value:
-            selected_date = date_picker.value.strftime("%Y-%m-%d")
-            db_data = get_forecast_from_db(state["area_code"], selected_date)
-            
-            if db_data:
-                weather, t_max, t_min = db_data
-                history_display.content = ft.Column([
-                    ft.Text(f"📅 DBに保存されている予報 ({selected_date})", size=16, weight="bold"),
-                    create_forecast_card(selected_date, weather, t_min, t_max)
-                ])
-            else:
-                history_display.content = ft.Text(f"❌ {selected_date} のデータはDBに見当たりません。", color="orange")
-            page.update()
+            state["history_date"] = date_picker.value.strftime("%Y-%m-%d")
+            render_history()
 
     date_picker = ft.DatePicker(on_change=on_date_picked)
     page.overlay.append(date_picker)
 
+    def load_forecast(region_code, region_name):
+        """予報JSONを取得してDBに保存し、日ごとの予報 (DailyForecast) のリストを返す (バックグラウンドで実行)"""
+        parent_office = area_index.office_for(region_code) or region_code
+        
+        data = forecast_cache.get(parent_office)
+        forecast = parse_forecast(data)
+
+        # 表示の際にDBへ移行（課題の「JSONからDBに移行」要件）: 1回の取得分を1トランザクションで保存
+        store.save_forecasts(forecast_rows(forecast, region_code, region_name), forecast.report_datetime)
+        # 降水確率・風・週間予報を含む全時系列も保存 (同じ発表の2回目以降は何もしない)
+        store.save_series(parent_office, forecast.report_datetime, iter_series(data))
+        return forecast.daily(region_code)
+
+    def load_saved(region_code):
+        """DBに保存済みの今日以降の予報 (DailyForecast のリスト) と、その発表時刻を返す (ローカルの検索だけ)"""
+        today = datetime.datetime.now(JST).date().isoformat()
+        rows = store.saved_forecast(region_code, today)
+        # 天気コードはDBに保存していない (アイコンは天気文字列から決まる)
+        days = [DailyForecast(d, w, None, t_min, t_max) for d, w, t_max, t_min, _ in rows]
+        return days, max((row[4] for row in rows), default="")
+
+    def show_badge(message, color):
+        forecast_badge_text.value = message
+        forecast_badge_text.color = color
+        forecast_badge.bgcolor = f"{color}50"
+        forecast_badge.visible = True
+
+    def show_pending(saved, reported):
+        """地域を選んだ直後の表示: 保存済みの予報があればそれを、無ければロード中を表示する"""
+        forecast_error.visible = False
+        if saved:
+            forecast_cards.show(saved)
+            forecast_loading.visible = False
+            forecast_display.visible = True
+            show_badge(f"💾 保存済みの予報 ({report_age(reported)}の発表) ・ 最新の予報を確認中...", "blueGrey")
+        else:
+            forecast_loading.visible = True
+            forecast_display.visible = False
+            forecast_badge.visible = False
+        page.update()
+
+    def show_forecast(days):
+        # 保存済みの予報と同じ内容のカードは CardPool が書き換えない
+        forecast_cards.show(days)
+        forecast_loading.visible = False
+        forecast_badge.visible = False
+        forecast_display.visible = True
+        page.update()
+
+    def show_error(e, saved=None, reported=""):
+        if saved:
+            # 通信できなくても、保存済みの予報を表示したままにする
+            show_badge(f"⚠ オフライン: {report_age(reported)}の発表を表示しています ({type(e).__name__})", "orange")
+        else:
+            forecast_error.value = f"エラー: {e}"
+            forecast_error.visible = True
+        forecast_loading.visible = False
+        page.update()
+
     def fetch_weather(region_code, region_name):
+        """地域選択時の処理: 保存済みの予報があれば先に表示し、最新の予報はバックグラウンドで取得する
+
+        保存済みの予報 (またはロード中の表示) も最新の予報と同じく ForecastWorker の描画の順番で表示するので、
+        前に選んだ地域の描画が後から上書きすることはない (最後に選んだ地域だけが描画される)。
+        """
         state["area_code"] = region_code
         state["area_name"] = region_name
-        
-        forecast_display.controls = [ft.ProgressRing()]
+        saved, reported = load_saved(region_code)
         history_display.content = None
+
+        forecast_worker.submit(
+            lambda: load_forecast(region_code, region_name),
+            show_forecast,
+            lambda e: show_error(e, saved, reported),
+            preview=lambda: show_pending(saved, reported),
+        )
+
+    # 地域リストの生成
+    region_list = ft.ListView(expand=True)
+    sidebar = RegionSidebar(fetch_weather, dense=True)
+    region_tree = []  # 検索していない時に表示する地方のタイル
+
+    def show_regions():
+        """検索欄が空なら地域リストを、入力があれば検索結果を表示する"""
+        query = search_field.value or ""
+        if query.strip():
+            matches = area_search.search(query)
+            body = sidebar.build_results(matches) if matches else [ft.Text("該当する地域がありません", color="grey")]
+        else:
+            body = region_tree
+        region_list.controls = [ft.Text("地域選択", size=20, weight="bold"), search_field, ft.Divider()] + body
         page.update()
 
-        try:
-            parent_office = region_code
-            for office_code, office_info in all_areas.get("offices", {}).items():
-                if region_code in office_info.get("children", []):
-                    parent_office = office_code
-                    break
-            
-            res = requests.get(f"{FORECAST_API_BASE_URL}{parent_office}.json")
-            data = res.json()
-            
-            time_defines = data[0]['timeSeries'][0]['timeDefines']
-            weather_data = next((a for a in data[0]['timeSeries'][0]['areas'] if a['area']['code'] == region_code), data[0]['timeSeries'][0]['areas'][0])
-            
-            temp_data = None
-            if len(data) > 1:
-                for ts in data[1]['timeSeries']:
-                    for area in ts['areas']:
-                        if area['area']['code'] == region_code:
-                            temp_data = area
-                            break
-
-            cards = []
-            for i in range(len(time_defines)):
-                d_str = datetime.datetime.fromisoformat(time_defines[i]).strftime("%Y-%m-%d")
-                w_str = weather_data['weathers'][i] if i < len(weather_data['weathers']) else "情報なし"
-                t_min = temp_data['tempsMin'][i] if temp_data and 'tempsMin' in temp_data and i < len(temp_data['tempsMin']) else None
-                t_max = temp_data['tempsMax'][i] if temp_data and 'tempsMax' in temp_data and i < len(temp_data['tempsMax']) else None
-                
-                # 表示の際にDBへ移行（課題の「JSONからDBに移行」要件）
-                save_forecast_to_db(region_code, region_name, d_str, w_str, t_max, t_min)
-                cards.append(create_forecast_card(d_str, w_str, t_min, t_max))
-            
-            forecast_display.controls = cards
-            page.update()
+    # キー入力のたびではなく、入力が止まってから一度だけ検索・描画する
+    search_debouncer = Debouncer(SEARCH_DEBOUNCE, show_regions)
+    search_field = ft.TextField(
+        hint_text="地域名・よみがなで検索",
+        prefix_icon=ft.Icons.SEARCH,
+        dense=True,
+        on_change=lambda e: search_debouncer(),
+        on_submit=lambda e: show_regions(),
+    )
 
-        except Exception as e:
-            forecast_display.controls = [ft.Text(f"エラー: {e}", color="red")]
-            page.update()
+    def render_sidebar():
+        """all_areas から地域リストのUIを組み立てる (府県予報区・class10地域のタイルは開いた時に作る)"""
+        region_tree[:] = sidebar.build(all_areas)
+        show_regions()
 
-    # 地域リストの生成
-    region_list = ft.Column(scroll="adaptive", expand=True)
+    def refresh_area_data():
+        """気象庁APIから最新の地域データを取得してスナップショットを更新する (バックグラウンドで実行)"""
+        try:
+            res = get_client().get(AREA_API_URL)
+            res.raise_for_status()
+            fresh_areas = save_snapshot(res.json(), SNAPSHOT_FILE)
+        except Exception as e:
+            if not all_areas:
+                region_list.controls = [ft.Text(f"地域データの取得に失敗しました: {e}", color="red")]
+                page.update()
+            return
+        # 内容が変わった時だけ描画し直す
+        if fresh_areas != all_areas:
+            set_area_data(fresh_areas)
+            render_sidebar()
 
     def build_sidebar():
-        global all_areas
-        res = requests.get(AREA_API_URL)
-        all_areas = res.json()
-        
-        controls = [ft.Text("地域選択", size=20, weight="bold"), ft.Divider()]
-        for c_code, c_info in all_areas["centers"].items():
-            office_tiles = []
-            for o_code in c_info.get("children", []):
-                if o_code in all_areas["offices"]:
-                    office_name = all_areas["offices"][o_code]["name"]
-                    class_tiles = []
-                    for cl_code in all_areas["offices"][o_code].get("children", []):
-                        if cl_code in all_areas["class10s"]:
-                            cl_name = all_areas["class10s"][cl_code]["name"]
-                            class_tiles.append(ft.ListTile(
-                                title=ft.Text(cl_name),
-                                on_click=lambda e, code=cl_code, name=cl_name: fetch_weather(code, name),
-                                dense=True
-                            ))
-                    office_tiles.append(ft.ExpansionTile(title=ft.Text(office_name), controls=class_tiles))
-            controls.append(ft.ExpansionTile(title=ft.Text(c_info["name"]), controls=office_tiles))
-        
-        region_list.controls = controls
-        page.update()
+        # 前回保存したスナップショットがあれば通信を待たずに即座に描画する
+        snapshot = load_snapshot(SNAPSHOT_FILE)
+        if snapshot:
+            set_area_data(snapshot)
+            render_sidebar()
+        else:
+            region_list.controls = [ft.Text("地域データを取得中..."), ft.ProgressRing()]
+            page.update()
+        page.run_thread(refresh_area_data)
 
     # --- レイアウト（エラー修正箇所） ---
     # Columnからpadding引数を削除し、Containerでラップしています
@@ -217,6 +266,9 @@ def main(page: ft.Page):
             ft.Text(f"天気予報表示", size=24, weight="bold"),
             ft.ElevatedButton("過去予報をDB検索", icon=ft.Icons.SEARCH_ROUNDED, on_click=lambda _: date_picker.pick_date())
         ], alignment="spaceBetween"),
+        forecast_loading,
+        forecast_error,
+        forecast_badge,
         forecast_display,
         ft.Divider(),
         history_display
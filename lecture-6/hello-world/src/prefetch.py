@@ -0,0 +1,166 @@
+"""全府県予報区の予報を一括で先読みするヘッドレスジョブ
+
+ft.app を起動せずに実行でき、cron 等から定期実行できる。
+取得した予報JSONは ForecastCache に入り、各class10地域の日別予報は forecast_history に、
+全時系列 (降水確率・風・週間予報など) は forecast_series に保存される。
+
+実行例 (プロジェクトルートから):
+    python src/prefetch.py --concurrency 4 --interval 0.2
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from area_snapshot import SNAPSHOT_FILE, load_snapshot, save_snapshot
+from forecast_cache import FORECAST_API_BASE_URL, ForecastCache
+from forecast_parser import forecast_rows, iter_series, parse_forecast
+from http_client import get_client
+from weather_store import DB_NAME, WeatherStore
+
+AREA_API_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
+DEFAULT_CONCURRENCY = 4
+# 気象庁サーバーへの配慮: リクエストの開始間隔の下限 (秒)
+DEFAULT_INTERVAL = 0.2
+
+
+class RateLimiter:
+    """スレッド間で共有し、リクエストの開始間隔を interval 秒以上あける"""
+
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = self.clock()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        if start_at > now:
+            self.sleep(start_at - now)
+
+
+def percentile(sorted_values, p):
+    """ソート済みのリストのpパーセンタイル (線形補間)"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class PrefetchReport:
+    """先読み1回分の結果 (全体の所要時間・リクエストごとの所要時間・失敗)
+
+    latencies は予報JSONの取得 (cache.get) だけの所要時間で、解析とDBへの保存の時間は含まない。
+    """
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.latencies = {}
+        self.errors = {}
+        self.rows_saved = 0
+
+    def summary(self):
+        values = sorted(self.latencies.values())
+        return {
+            "offices": len(self.latencies) + len(self.errors),
+            "ok": len(self.latencies),
+            "errors": len(self.errors),
+            "rows_saved": self.rows_saved,
+            "wall_time": self.wall_time,
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": values[-1] if values else 0.0,
+        }
+
+
+def prefetch_all(all_areas, cache, store=None, concurrency=DEFAULT_CONCURRENCY, interval=DEFAULT_INTERVAL,
+                 limiter=None):
+    """all_areas["offices"] の全officeの予報を取得し、キャッシュ (と、storeがあればDB) に格納する"""
+    offices = all_areas.get("offices", {})
+    class10s = all_areas.get("class10s", {})
+    limiter = limiter or RateLimiter(interval)
+    report = PrefetchReport()
+    lock = threading.Lock()
+
+    def fetch_one(office_code):
+        limiter.wait()
+        try:
+            start = time.perf_counter()
+            data = cache.get(office_code)
+            elapsed = time.perf_counter() - start
+            forecast = parse_forecast(data)
+            rows = []
+            for c10 in offices[office_code].get("children", []):
+                if c10 in class10s:
+                    rows.extend(forecast_rows(forecast, c10, class10s[c10]["name"]))
+            saved = 0
+            if store is not None:
+                saved = store.save_forecasts(rows, forecast.report_datetime)
+                store.save_series(office_code, forecast.report_datetime, iter_series(data))
+        except Exception as e:
+            with lock:
+                report.errors[office_code] = f"{type(e).__name__}: {e}"
+            return
+        with lock:
+            report.latencies[office_code] = elapsed
+            report.rows_saved += saved
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="prefetch") as executor:
+        list(executor.map(fetch_one, offices))
+    report.wall_time = time.perf_counter() - start
+    return report
+
+
+def load_areas(area_url, snapshot_file):
+    """地域データを取得する (失敗した場合は前回のスナップショットを使う)"""
+    try:
+        res = get_client().get(area_url)
+        res.raise_for_status()
+        return save_snapshot(res.json(), snapshot_file)
+    except requests.exceptions.RequestException as e:
+        areas = load_snapshot(snapshot_file)
+        if areas is None:
+            raise
+        print(f"地域データの取得に失敗したため、スナップショットを使用します: {e}")
+        return areas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="全府県予報区の天気予報を先読みしてDBに保存する")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同時接続数の上限")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="リクエスト開始間隔の下限 (秒)")
+    parser.add_argument("--db", default=DB_NAME, help="保存先のSQLiteファイル")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="地域データのスナップショット")
+    parser.add_argument("--area-url", default=AREA_API_URL)
+    parser.add_argument("--forecast-url", default=FORECAST_API_BASE_URL)
+    args = parser.parse_args(argv)
+
+    all_areas = load_areas(args.area_url, args.snapshot)
+    cache = ForecastCache(args.forecast_url, max_entries=len(all_areas.get("offices", {})) or 1)
+    store = WeatherStore(args.db)
+    try:
+        report = prefetch_all(all_areas, cache, store, args.concurrency, args.interval)
+    finally:
+        store.close()
+
+    s = report.summary()
+    print(f"{s['ok']}/{s['offices']} 府県予報区を取得 ({s['rows_saved']} 行保存), 所要時間 {s['wall_time']:.2f} s")
+    print(f"レイテンシ: p50 {s['p50'] * 1000:.0f} ms / p90 {s['p90'] * 1000:.0f} ms / "
+          f"p99 {s['p99'] * 1000:.0f} ms / max {s['max'] * 1000:.0f} ms")
+    for office_code, error in sorted(report.errors.items()):
+        print(f"  [失敗] {office_code}: {error}")
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
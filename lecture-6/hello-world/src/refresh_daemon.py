@@ -0,0 +1,302 @@
+"""気象庁の発表時刻 (05/11/17時 JST) に合わせて全府県予報区の予報を更新し続けるヘッドレスのサービス
+
+ft.app を起動せずに実行できる。
+- 予報JSONは ETag 付きの条件付きGETで確認し、変わっていないofficeは本文をダウンロードしない
+- reportDatetime が前回取り込んだ発表から変わったofficeだけを、1サイクル分まとめて1トランザクションでDBに保存する
+- サイクルごとの所要時間・受信バイト数などを metrics() と --metrics-file (JSON) で公開する
+
+時計 (clock) と待機 (sleep) は差し替えられるので、偽の気象庁サーバーと偽の時計で動作を確かめられる
+(benchmarks/bench_refresh_daemon.py)。
+
+実行例 (プロジェクトルートから):
+    python src/refresh_daemon.py --metrics-file refresh_metrics.json
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from area_snapshot import SNAPSHOT_FILE
+from forecast_cache import FORECAST_API_BASE_URL, ForecastCache, get_report_datetime
+from forecast_parser import forecast_rows, iter_series, parse_forecast
+from prefetch import AREA_API_URL, DEFAULT_CONCURRENCY, DEFAULT_INTERVAL, RateLimiter, load_areas
+from weather_store import DB_NAME, JST, WeatherStore, to_timestamp
+
+# 気象庁の予報の定時発表 (日本時間)
+PUBLISH_HOURS = (5, 11, 17)
+# 発表時刻から取得を始めるまでの余裕 (秒)。配信側への反映を待つ
+DEFAULT_DELAY = 5 * 60
+# 発表時刻を過ぎても古い予報のままのofficeがあれば、この間隔で再確認する (秒)
+DEFAULT_RETRY_INTERVAL = 10 * 60
+# 発表時刻からこの秒数を過ぎたら再確認をやめて次の発表を待つ
+DEFAULT_RETRY_WINDOW = 60 * 60
+# metrics() に残すサイクルの数
+HISTORY_SIZE = 100
+
+
+def now_jst():
+    return datetime.datetime.now(JST)
+
+
+def publish_times(now, hours=PUBLISH_HOURS):
+    """now の前日から翌日までの発表時刻を古い順に返す"""
+    day = now.astimezone(JST).replace(hour=0, minute=0, second=0, microsecond=0)
+    return [day + datetime.timedelta(days=d, hours=h) for d in (-1, 0, 1) for h in sorted(hours)]
+
+
+def last_publish_time(now, hours=PUBLISH_HOURS):
+    """now 以前で最後の発表時刻"""
+    return [t for t in publish_times(now, hours) if t <= now][-1]
+
+
+def next_publish_time(now, hours=PUBLISH_HOURS):
+    """now より後で最初の発表時刻"""
+    return [t for t in publish_times(now, hours) if t > now][0]
+
+
+class CycleMetrics:
+    """更新1サイクル分の計測値"""
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.duration = 0.0
+        self.offices = 0
+        self.changed = 0
+        self.not_modified = 0
+        self.bytes_fetched = 0
+        self.rows_saved = 0
+        self.series_saved = 0
+        self.errors = {}
+
+    def as_dict(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration": self.duration,
+            "offices": self.offices,
+            "changed": self.changed,
+            "not_modified": self.not_modified,
+            "bytes_fetched": self.bytes_fetched,
+            "rows_saved": self.rows_saved,
+            "series_saved": self.series_saved,
+            "errors": len(self.errors),
+        }
+
+
+class RefreshDaemon:
+    """全officeの予報を発表時刻ごとに確認し、新しい発表だけをDBに取り込む
+
+    cache: ForecastCache (ttl=0 にして毎回 ETag で再検証させる)
+    store: WeatherStore
+    clock(): 現在時刻 (タイムゾーン付きのdatetime) / sleep(秒): 待機
+    """
+
+    def __init__(self, all_areas, cache, store, concurrency=DEFAULT_CONCURRENCY, interval=DEFAULT_INTERVAL,
+                 clock=now_jst, sleep=time.sleep, hours=PUBLISH_HOURS, delay=DEFAULT_DELAY,
+                 retry_interval=DEFAULT_RETRY_INTERVAL, retry_window=DEFAULT_RETRY_WINDOW, on_cycle=None):
+        self.all_areas = all_areas
+        self.cache = cache
+        self.store = store
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(interval)
+        self.clock = clock
+        self.sleep = sleep
+        self.hours = hours
+        self.delay = delay
+        self.retry_interval = retry_interval
+        self.retry_window = retry_window
+        self.on_cycle = on_cycle
+        # officeコード → 取り込み済みの最新の発表時刻 (UNIX時刻)。再起動しても同じ発表を取り込み直さない
+        self.last_reports = store.latest_reports()
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self.totals = {"cycles": 0, "bytes_fetched": 0, "rows_saved": 0, "errors": 0}
+        self.stopped = threading.Event()
+
+    # --- 1サイクル ---
+    def _office_rows(self, office_code, forecast):
+        class10s = self.all_areas.get("class10s", {})
+        rows = []
+        for c10 in self.all_areas["offices"][office_code].get("children", []):
+            if c10 in class10s:
+                rows.extend(forecast_rows(forecast, c10, class10s[c10]["name"]))
+        return rows
+
+    def run_cycle(self):
+        """全officeを1回確認し、発表が変わったofficeだけを保存する。CycleMetrics を返す"""
+        metrics = CycleMetrics(self.clock())
+        offices = list(self.all_areas.get("offices", {}))
+        metrics.offices = len(offices)
+        stats_before = self.cache.get_stats()
+        start = time.perf_counter()
+        lock = threading.Lock()
+        changed = {}  # officeコード → (発表時刻, 予報JSON)
+
+        def check(office_code):
+            self.limiter.wait()
+            try:
+                data = self.cache.get(office_code)
+                report_datetime = get_report_datetime(data)
+                report_ts = to_timestamp(report_datetime)
+            except Exception as e:
+                with lock:
+                    metrics.errors[office_code] = f"{type(e).__name__}: {e}"
+                return
+            if report_ts > self.last_reports.get(office_code, 0):
+                with lock:
+                    changed[office_code] = (report_datetime, data)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="refresh") as executor:
+            list(executor.map(check, offices))
+
+        # 変わったofficeの日別予報は1トランザクションでまとめて保存する
+        reports = {}
+        for office_code, (report_datetime, data) in changed.items():
+            try:
+                reports[office_code] = (report_datetime, self._office_rows(office_code, parse_forecast(data)))
+            except Exception as e:
+                metrics.errors[office_code] = f"{type(e).__name__}: {e}"
+        try:
+            metrics.rows_saved = self.store.save_reports(list(reports.values()), raise_errors=True)
+        except sqlite3.Error as e:
+            for office_code in reports:
+                metrics.errors[office_code] = f"{type(e).__name__}: {e}"
+        # 保存できたofficeだけ取り込み済みにする (失敗したofficeは次のサイクルで取り込み直す)
+        for office_code, (report_datetime, data) in changed.items():
+            if office_code in metrics.errors:
+                continue
+            try:
+                metrics.series_saved += self.store.save_series(office_code, report_datetime, iter_series(data),
+                                                               raise_errors=True)
+            except sqlite3.Error as e:
+                metrics.errors[office_code] = f"{type(e).__name__}: {e}"
+                continue
+            self.last_reports[office_code] = to_timestamp(report_datetime)
+        metrics.changed = len(changed) - sum(1 for code in changed if code in metrics.errors)
+
+        stats_after = self.cache.get_stats()
+        metrics.not_modified = stats_after["revalidations"] - stats_before["revalidations"]
+        metrics.bytes_fetched = stats_after["bytes"] - stats_before["bytes"]
+        metrics.duration = time.perf_counter() - start
+
+        self.history.append(metrics)
+        self.totals["cycles"] += 1
+        self.totals["bytes_fetched"] += metrics.bytes_fetched
+        self.totals["rows_saved"] += metrics.rows_saved
+        self.totals["errors"] += len(metrics.errors)
+        if self.on_cycle is not None:
+            self.on_cycle(metrics)
+        return metrics
+
+    # --- スケジュール ---
+    def stale_offices(self, published_at):
+        """published_at の発表をまだ取り込めていないofficeコードのリスト"""
+        threshold = to_timestamp(published_at)
+        return [code for code in self.all_areas.get("offices", {}) if self.last_reports.get(code, 0) < threshold]
+
+    def _sleep_until(self, when):
+        while not self.stopped.is_set():
+            remaining = (when - self.clock()).total_seconds()
+            if remaining <= 0:
+                return True
+            self.sleep(remaining)
+        return False
+
+    def run(self, max_cycles=None):
+        """起動時に1回確認し、以後は発表時刻 + delay ごとに確認する
+
+        発表時刻を過ぎても古いままのofficeがあれば retry_window の間 retry_interval ごとに確認し直す。
+        max_cycles を指定するとその回数で終了する (テスト用)。
+        """
+        cycles = 0
+
+        def done():
+            return self.stopped.is_set() or (max_cycles is not None and cycles >= max_cycles)
+
+        self.run_cycle()
+        cycles += 1
+        published_at = last_publish_time(self.clock(), self.hours)
+        while not done():
+            # 直近の発表を取り込めていないofficeがあり、再確認の期間内なら少し待って確認し直す
+            retry_at = self.clock() + datetime.timedelta(seconds=self.retry_interval)
+            if (self.stale_offices(published_at)
+                    and retry_at <= published_at + datetime.timedelta(seconds=self.retry_window)):
+                if not self._sleep_until(retry_at):
+                    break
+            else:
+                published_at = next_publish_time(self.clock(), self.hours)
+                if not self._sleep_until(published_at + datetime.timedelta(seconds=self.delay)):
+                    break
+            self.run_cycle()
+            cycles += 1
+
+    def stop(self):
+        self.stopped.set()
+
+    def metrics(self):
+        """直近のサイクルと累計の計測値"""
+        recent = [m.as_dict() for m in self.history]
+        durations = [m["duration"] for m in recent]
+        return {
+            "totals": dict(self.totals),
+            "last_cycle": recent[-1] if recent else None,
+            "mean_duration": sum(durations) / len(durations) if durations else 0.0,
+            "cycles": recent,
+        }
+
+
+def write_metrics(path, metrics):
+    """metrics をJSONで書き出す (読み手が書き込み途中のファイルを見ないよう置き換えで保存)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="気象庁の発表時刻に合わせて全府県予報区の天気予報をDBに取り込み続ける")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同時接続数の上限")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="リクエスト開始間隔の下限 (秒)")
+    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY, help="発表時刻から確認を始めるまでの秒数")
+    parser.add_argument("--db", default=DB_NAME, help="保存先のSQLiteファイル")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="地域データのスナップショット")
+    parser.add_argument("--metrics-file", help="サイクルごとに計測値をJSONで書き出すファイル")
+    parser.add_argument("--once", action="store_true", help="1回だけ確認して終了する")
+    parser.add_argument("--area-url", default=AREA_API_URL)
+    parser.add_argument("--forecast-url", default=FORECAST_API_BASE_URL)
+    args = parser.parse_args(argv)
+
+    all_areas = load_areas(args.area_url, args.snapshot)
+    cache = ForecastCache(args.forecast_url, ttl=0, max_entries=len(all_areas.get("offices", {})) or 1)
+    store = WeatherStore(args.db)
+
+    def on_cycle(metrics):
+        m = metrics.as_dict()
+        print(f"[{m['started_at']}] {m['changed']}/{m['offices']} 府県予報区が更新 "
+              f"(304: {m['not_modified']}), {m['rows_saved']} 行保存, "
+              f"{m['bytes_fetched'] / 1024:.1f} KiB, {m['duration']:.2f} s, 失敗 {m['errors']}")
+        if args.metrics_file:
+            write_metrics(args.metrics_file, daemon.metrics())
+
+    daemon = RefreshDaemon(all_areas, cache, store, args.concurrency, args.interval, delay=args.delay,
+                           on_cycle=on_cycle)
+    try:
+        daemon.run(max_cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        daemon.stop()
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+import flet as ft
+
+# 地域リスト (地方 → 府県予報区 → class10地域) のUI
+# 起動時は地方のタイルだけを作り、府県予報区・class10地域のタイルは親が初めて開かれた時に作る
+
+
+class RegionSidebar:
+    """地域リストのタイルを組み立てるクラス
+
+    on_select(code, name): class10地域がクリックされた時に呼ばれる
+    decorated: 各階層のタイルにアイコンを付け、地方名を太字にする
+    dense: class10地域のタイルを詰めて表示する
+    lazy: False にすると全階層を最初に作る (計測用)
+    """
+
+    def __init__(self, on_select, decorated=False, dense=False, lazy=True):
+        self.on_select = on_select
+        self.decorated = decorated
+        self.dense = dense
+        self.lazy = lazy
+        self.all_areas = {}
+
+    def build(self, all_areas):
+        """地方ごとの ExpansionTile のリストを返す (子を持たない地方は含めない)"""
+        self.all_areas = all_areas
+        tiles = []
+        for center_code, center_info in all_areas.get("centers", {}).items():
+            if not self._office_codes(center_code):
+                continue
+            tile = ft.ExpansionTile(
+                title=ft.Text(center_info["name"], weight=ft.FontWeight.BOLD if self.decorated else None),
+                leading=ft.Icon(ft.Icons.TERRAIN) if self.decorated else None,
+                data=center_code,
+                on_change=self._expand_center,
+            )
+            if not self.lazy:
+                tile.controls = self._office_tiles(center_code)
+            tiles.append(tile)
+        return tiles
+
+    # --- 子のコード ---
+    def _office_codes(self, center_code):
+        offices = self.all_areas.get("offices", {})
+        return [code for code in self.all_areas["centers"][center_code].get("children", [])
+                if code in offices and self._class10_codes(code)]
+
+    def _class10_codes(self, office_code):
+        class10s = self.all_areas.get("class10s", {})
+        return [code for code in self.all_areas["offices"][office_code].get("children", []) if code in class10s]
+
+    # --- タイルの生成 ---
+    def _office_tiles(self, center_code):
+        tiles = []
+        for office_code in self._office_codes(center_code):
+            tile = ft.ExpansionTile(
+                title=ft.Text(self.all_areas["offices"][office_code]["name"]),
+                leading=ft.Icon(ft.Icons.MAP) if self.decorated else None,
+                data=office_code,
+                on_change=self._expand_office,
+            )
+            if not self.lazy:
+                tile.controls = self._class10_tiles(office_code)
+            tiles.append(tile)
+        return tiles
+
+    def _class10_tiles(self, office_code):
+        class10s = self.all_areas["class10s"]
+        return [
+            ft.ListTile(
+                title=ft.Text(class10s[code]["name"]),
+                leading=ft.Icon(ft.Icons.LOCATION_ON) if self.decorated else None,
+                on_click=lambda e, code=code, name=class10s[code]["name"]: self.on_select(code, name),
+                data=code,
+                dense=self.dense,
+            )
+            for code in self._class10_codes(office_code)
+        ]
+
+    def build_results(self, matches):
+        """地域検索の結果 (area_search.AreaMatch のリスト) をクリックできるタイルにする"""
+        tiles = []
+        for match in matches:
+            # 市町村など、選択すると別の地域の予報になるものは表示先を添える
+            subtitle = ft.Text(f"→ {match.target_name}", size=12) if match.target_code != match.code else None
+            tiles.append(ft.ListTile(
+                title=ft.Text(match.name),
+                subtitle=subtitle,
+                leading=ft.Icon(ft.Icons.SEARCH) if self.decorated else None,
+                on_click=lambda e, code=match.target_code, name=match.target_name: self.on_select(code, name),
+                data=match.target_code,
+                dense=self.dense,
+            ))
+        return tiles
+
+    # --- 展開時の遅延生成 ---
+    def _expand_center(self, e):
+        tile = e.control
+        if e.data == "true" and not tile.controls:
+            tile.controls = self._office_tiles(tile.data)
+            tile.update()
+
+    def _expand_office(self, e):
+        tile = e.control
+        if e.data == "true" and not tile.controls:
+            tile.controls = self._class10_tiles(tile.data)
+            tile.update()
+
@@ -0,0 +1,68 @@
+from typing import NamedTuple
+
+# 天気の分類 (アイコン・色・カテゴリ)
+# 天気文字列の部分文字列で分類し、文字列で分からなければ天気コードを使う。
+# 判定は数回の in だけで十分速い (分類済みの文字列を表に覚えても速くならなかった) ので、毎回判定する。
+# Fletに依存しないので、DBへの保存や集計からも使える (アイコンはFletのアイコン名の文字列)
+
+# カテゴリ (DBの weather_category 列に保存する値。一度決めたら変えないこと)
+UNKNOWN = 0
+SUNNY = 1
+CLOUDY = 2
+RAIN = 3
+SNOW = 4
+CATEGORY_NAMES = {UNKNOWN: "不明", SUNNY: "晴れ", CLOUDY: "くもり", RAIN: "雨", SNOW: "雪"}
+
+
+class WeatherClass(NamedTuple):
+    category: int
+    icon: str     # Fletのアイコン名 (ft.Icons の値)
+    color: str
+
+
+CLASSES = {
+    UNKNOWN: WeatherClass(UNKNOWN, "question_mark", "black"),
+    SUNNY: WeatherClass(SUNNY, "wb_sunny", "orange"),
+    CLOUDY: WeatherClass(CLOUDY, "cloud", "grey"),
+    RAIN: WeatherClass(RAIN, "umbrella", "blue"),
+    SNOW: WeatherClass(SNOW, "ac_unit", "lightBlue"),
+}
+
+# カード用の (アイコン, 色)
+ICONS = {category: (weather_class.icon, weather_class.color) for category, weather_class in CLASSES.items()}
+
+# 天気コード (weatherCodes) の百の位が主な天気: 1xx 晴れ / 2xx くもり / 3xx 雨 / 4xx 雪
+CODE_TABLE = {
+    str(code): category
+    for hundreds, category in ((1, SUNNY), (2, CLOUDY), (3, RAIN), (4, SNOW))
+    for code in range(hundreds * 100, hundreds * 100 + 100)
+}
+
+
+def category_of(weather_str, weather_code=None):
+    """DB・集計用の整数カテゴリ
+
+    天気文字列で分類し (「晴」は曇・雨を含まない時だけ。次に雪 → 雨 → 曇/くもり の順)、分からなければ天気コードを使う。
+    """
+    weather_str = weather_str or ""
+    if "晴" in weather_str and "曇" not in weather_str and "雨" not in weather_str:
+        return SUNNY
+    elif "雪" in weather_str:
+        return SNOW
+    elif "雨" in weather_str:
+        return RAIN
+    elif "曇" in weather_str or "くもり" in weather_str:
+        return CLOUDY
+    if weather_code is not None:
+        return CODE_TABLE.get(str(weather_code), UNKNOWN)
+    return UNKNOWN
+
+
+def classify(weather_str, weather_code=None):
+    """天気文字列 (分類できなければ天気コード) から WeatherClass を返す"""
+    return CLASSES[category_of(weather_str, weather_code)]
+
+
+def icon_for(weather_str, weather_code=None):
+    """カード用の (アイコン, 色)"""
+    return ICONS[category_of(weather_str, weather_code)]
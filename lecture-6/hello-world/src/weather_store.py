@@ -0,0 +1,549 @@
+import datetime
+import sqlite3
+import threading
+
+from weather_classifier import CATEGORY_NAMES, CLOUDY, RAIN, SNOW, SUNNY, UNKNOWN, category_of
+
+# --- 設定・定数 ---
+DB_NAME = "weather_history.db"
+
+# 接続ごとに一度だけ適用するチューニング用PRAGMA
+# WAL: 読み込みと書き込みが互いをブロックしない / synchronous=NORMAL: WALではコミット毎のfsyncを省略できる
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# 時系列の種類 (series_kinds の初期値)。IDは一度決めたら変えないこと
+SERIES_KINDS = (
+    "weather", "wind", "wave", "pop", "temp",
+    "weekly_weather", "weekly_pop", "weekly_reliability",
+    "temp_min", "temp_min_upper", "temp_min_lower",
+    "temp_max", "temp_max_upper", "temp_max_lower",
+)
+
+
+# 集計テーブル (forecast_daily / forecast_monthly) で天気カテゴリごとに数える列
+AGGREGATE_CATEGORIES = ((UNKNOWN, "n_unknown"), (SUNNY, "n_sunny"), (CLOUDY, "n_cloudy"), (RAIN, "n_rain"), (SNOW, "n_snow"))
+# 集計テーブルの加算する列 (件数・カテゴリ別の件数・気温の合計と件数)
+AGGREGATE_COLUMNS = ("n_total",) + tuple(c for _, c in AGGREGATE_CATEGORIES) + (
+    "sum_temp_max", "n_temp_max", "sum_temp_min", "n_temp_min")
+
+
+def _aggregate_terms(row):
+    """forecast_latest の1行 (NEW / OLD) が集計の各列に足し込む値のSQL式"""
+    terms = ["1"]
+    terms += [f"(COALESCE({row}.weather_category, 0) = {category})" for category, _ in AGGREGATE_CATEGORIES]
+    for col in ("temp_max", "temp_min"):
+        terms += [f"COALESCE(CAST(NULLIF({row}.{col}, '') AS REAL), 0)", f"(NULLIF({row}.{col}, '') IS NOT NULL)"]
+    return terms
+
+
+def _aggregate_upsert(table, keys, key_values, terms):
+    """集計テーブルに差分 terms を足し込む UPSERT 文"""
+    columns = ", ".join(keys + AGGREGATE_COLUMNS)
+    values = ", ".join(key_values + tuple(terms))
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in AGGREGATE_COLUMNS)
+    return f"INSERT INTO {table} ({columns}) VALUES ({values}) ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates};"
+
+
+def _aggregate_triggers():
+    """forecast_latest の追加・更新に合わせて日別・月別の集計を差分で更新するトリガー"""
+    new_terms = _aggregate_terms("NEW")
+    delta_terms = [f"({n}) - ({o})" for n, o in zip(new_terms, _aggregate_terms("OLD"))]
+    statements = []
+    for event, terms in (("INSERT", new_terms), ("UPDATE", delta_terms)):
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_forecast_latest_aggregate_{event.lower()}
+            AFTER {event} ON forecast_latest
+            BEGIN
+                {_aggregate_upsert("forecast_daily", ("target_date",), ("NEW.target_date",), terms)}
+                {_aggregate_upsert("forecast_monthly", ("area_code", "month"),
+                                   ("NEW.area_code", "substr(NEW.target_date, 1, 7)"), terms)}
+            END;""")
+    return "\n".join(statements)
+
+
+def _columns(names, rows):
+    """行のリストを {列名: 値のリスト} の列指向の形にする"""
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def _summary_columns(rows, key_names):
+    """集計テーブルの行 (キー列 + AGGREGATE_COLUMNS) を、平均気温付きの列指向の形にする"""
+    names = key_names + AGGREGATE_COLUMNS
+    columns = _columns(names, rows)
+    for col in ("temp_max", "temp_min"):
+        columns[f"avg_{col}"] = [total / n if n else None
+                                 for total, n in zip(columns.pop(f"sum_{col}"), columns.pop(f"n_{col}"))]
+    return columns
+
+
+# 気象庁の時刻は日本時間。タイムゾーンの無い日付・日時は日本時間として扱う
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+def to_timestamp(value):
+    """UNIX時刻 (int)・"YYYY-MM-DD"・ISO形式の文字列・date/datetime を UNIX時刻 (秒) に揃える"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=JST)
+    return int(value.timestamp())
+
+
+class WeatherStore:
+    """天気予報DBへの接続を1本だけ保持し、読み書きを共有するストレージ層"""
+
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+        # Fletのイベントハンドラは別スレッドから呼ばれるため、ロックで直列化した上で接続を共有する
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.lock = threading.Lock()
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.init_db()
+
+    def init_db(self):
+        """DBの初期化: テーブル設計とプライマリーキーの設定"""
+        with self.lock, self.conn:
+            # 旧形式のテーブル (INSERT OR REPLACE で1日1行)。既存DBの移行元として残している
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS weather_forecasts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    area_code TEXT,
+                    area_name TEXT,
+                    date TEXT,
+                    weather TEXT,
+                    temp_max TEXT,
+                    temp_min TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(area_code, date)
+                )
+            ''')
+            # 予報の履歴 (追記のみ): 発表ごとに1行。主キーが「地域・日付の全版」の検索をカバーする
+            # forecast_latest は各 (地域, 日付) の最新版だけを持つテーブルで、履歴への追記時にトリガーで更新する
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS forecast_history (
+                    area_code TEXT NOT NULL,
+                    target_date TEXT NOT NULL,
+                    report_datetime TEXT NOT NULL,
+                    area_name TEXT,
+                    weather TEXT,
+                    temp_max TEXT,
+                    temp_min TEXT,
+                    weather_category INTEGER,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    seq INTEGER,
+                    PRIMARY KEY (area_code, target_date, report_datetime)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS forecast_latest (
+                    area_code TEXT NOT NULL,
+                    target_date TEXT NOT NULL,
+                    report_datetime TEXT NOT NULL,
+                    area_name TEXT,
+                    weather TEXT,
+                    temp_max TEXT,
+                    temp_min TEXT,
+                    weather_category INTEGER,
+                    PRIMARY KEY (area_code, target_date)
+                ) WITHOUT ROWID;
+            ''')
+            self._add_weather_category()
+            self._add_history_seq()
+            # 天気カテゴリの列を追加した時にトリガーも作り直す (旧版のトリガーはカテゴリをコピーしない)
+            self.conn.executescript('''
+                DROP TRIGGER IF EXISTS trg_forecast_history_latest;
+                CREATE TRIGGER trg_forecast_history_latest
+                AFTER INSERT ON forecast_history
+                BEGIN
+                    INSERT INTO forecast_latest
+                        (area_code, target_date, report_datetime, area_name, weather, temp_max, temp_min, weather_category)
+                    VALUES (NEW.area_code, NEW.target_date, NEW.report_datetime, NEW.area_name,
+                            NEW.weather, NEW.temp_max, NEW.temp_min, NEW.weather_category)
+                    ON CONFLICT(area_code, target_date) DO UPDATE SET
+                        report_datetime = excluded.report_datetime, area_name = excluded.area_name,
+                        weather = excluded.weather, temp_max = excluded.temp_max, temp_min = excluded.temp_min,
+                        weather_category = excluded.weather_category
+                    WHERE excluded.report_datetime > forecast_latest.report_datetime;
+                END;
+                -- 「ある日の全地域の天気の内訳」の集計用
+                CREATE INDEX IF NOT EXISTS idx_latest_date_category ON forecast_latest (target_date, weather_category);
+            ''')
+            # 日別 (全地域) ・月別 (地域ごと) の集計。forecast_latest のトリガーで差分だけ更新する
+            aggregate_columns = ", ".join(f"{c} {'REAL' if c.startswith('sum_') else 'INTEGER'} NOT NULL DEFAULT 0"
+                                          for c in AGGREGATE_COLUMNS)
+            self.conn.executescript(f'''
+                CREATE TABLE IF NOT EXISTS forecast_daily (
+                    target_date TEXT PRIMARY KEY,
+                    {aggregate_columns}
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS forecast_monthly (
+                    area_code TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    {aggregate_columns},
+                    PRIMARY KEY (area_code, month)
+                ) WITHOUT ROWID;
+                {_aggregate_triggers()}
+            ''')
+            self._backfill_aggregates()
+            self._migrate_weather_forecasts()
+            # 正規化した時系列: 地域・系列の種類・時刻ごとに数値 (風などは文字列) を1行で持つ
+            # 主キー (area_code, kind_id, ts) のクラスタ化B-treeが「地域Xの期間指定」の検索をそのままカバーする
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS areas (
+                    area_code TEXT PRIMARY KEY,
+                    area_name TEXT NOT NULL,
+                    office_code TEXT
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS series_kinds (
+                    kind_id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                );
+                CREATE TABLE IF NOT EXISTS forecast_series (
+                    area_code TEXT NOT NULL,
+                    kind_id INTEGER NOT NULL REFERENCES series_kinds(kind_id),
+                    ts INTEGER NOT NULL,
+                    value REAL,
+                    text TEXT,
+                    report_ts INTEGER NOT NULL,
+                    PRIMARY KEY (area_code, kind_id, ts)
+                ) WITHOUT ROWID;
+                -- 「ある日時の全地域」の集計用 (valueまで含めてインデックスだけで答えられる)
+                CREATE INDEX IF NOT EXISTS idx_series_kind_ts ON forecast_series (kind_id, ts, area_code, value);
+                -- 取り込み済みの発表 (同じ発表を再度取り込まないため)
+                CREATE TABLE IF NOT EXISTS series_reports (
+                    office_code TEXT NOT NULL,
+                    report_ts INTEGER NOT NULL,
+                    points INTEGER NOT NULL,
+                    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (office_code, report_ts)
+                ) WITHOUT ROWID;
+            ''')
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO series_kinds (kind_id, name) VALUES (?, ?)",
+                enumerate(SERIES_KINDS, start=1),
+            )
+        self.kind_ids = dict(self.conn.execute("SELECT name, kind_id FROM series_kinds"))
+
+    def _add_weather_category(self):
+        """天気カテゴリ (weather_classifier の整数) の列が無いDBに列を追加し、既存の行を分類して埋める"""
+        self.conn.create_function("weather_category", 1, category_of, deterministic=True)
+        for table in ("forecast_history", "forecast_latest"):
+            columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if "weather_category" not in columns:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN weather_category INTEGER")
+                self.conn.execute(f"UPDATE {table} SET weather_category = weather_category(weather) WHERE weather IS NOT NULL")
+
+    def _add_history_seq(self):
+        """履歴の追記順の番号 (seq) の列と採番用のテーブルを用意する
+
+        WITHOUT ROWID のテーブルには rowid が無く、fetched_at は秒単位なので、追記の順番は seq で表す。
+        seq は書き込みのトランザクションの最初に採番するので、コミットの順に増える (history_export の差分の基準)。
+        列が無い既存のDBでは、保存時刻・発表時刻の順に番号を振る。
+        """
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(forecast_history)")}
+        if "seq" not in columns:
+            self.conn.execute("ALTER TABLE forecast_history ADD COLUMN seq INTEGER")
+            self.conn.execute('''
+                UPDATE forecast_history SET seq = numbered.n
+                FROM (SELECT area_code, target_date, report_datetime,
+                             row_number() OVER (ORDER BY fetched_at, report_datetime, area_code, target_date) AS n
+                      FROM forecast_history) AS numbered
+                WHERE forecast_history.area_code = numbered.area_code
+                  AND forecast_history.target_date = numbered.target_date
+                  AND forecast_history.report_datetime = numbered.report_datetime
+            ''')
+        self.conn.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_history_seq ON forecast_history (seq);
+            CREATE TABLE IF NOT EXISTS history_seq (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                value INTEGER NOT NULL
+            );
+        ''')
+        self.conn.execute(
+            "INSERT OR IGNORE INTO history_seq (id, value) SELECT 1, COALESCE(MAX(seq), 0) FROM forecast_history"
+        )
+
+    def _next_seq(self, count):
+        """履歴に追記する count 行分の seq を予約し、最初の番号を返す (書き込みのトランザクションの中で最初に呼ぶ)"""
+        end = self.conn.execute("UPDATE history_seq SET value = value + ? WHERE id = 1 RETURNING value",
+                                (count,)).fetchone()[0]
+        return end - count + 1
+
+    def _backfill_aggregates(self):
+        """集計テーブルを追加する前からあるDBでは、forecast_latest から一度だけ集計を作る"""
+        if (self.conn.execute("SELECT 1 FROM forecast_daily LIMIT 1").fetchone()
+                or not self.conn.execute("SELECT 1 FROM forecast_latest LIMIT 1").fetchone()):
+            return
+        terms = ", ".join(f"SUM({t})" for t in _aggregate_terms("forecast_latest"))
+        columns = ", ".join(AGGREGATE_COLUMNS)
+        self.conn.execute(f"""
+            INSERT INTO forecast_daily (target_date, {columns})
+            SELECT target_date, {terms} FROM forecast_latest GROUP BY target_date
+        """)
+        self.conn.execute(f"""
+            INSERT INTO forecast_monthly (area_code, month, {columns})
+            SELECT area_code, substr(target_date, 1, 7), {terms} FROM forecast_latest
+            GROUP BY area_code, substr(target_date, 1, 7)
+        """)
+
+    def _migrate_weather_forecasts(self):
+        """旧テーブル weather_forecasts の行を履歴テーブルに1度だけ移す (発表時刻の代わりに保存時刻を使う)"""
+        if self.conn.execute("SELECT 1 FROM forecast_history LIMIT 1").fetchone():
+            return
+        rows = []
+        for area_code, area_name, date_str, weather, t_max, t_min, updated_at in self.conn.execute(
+            "SELECT area_code, area_name, date, weather, temp_max, temp_min, updated_at FROM weather_forecasts"
+        ):
+            # CURRENT_TIMESTAMP はUTCなので、発表時刻と同じ日本時間のISO形式に揃える
+            saved = datetime.datetime.fromisoformat(updated_at or "1970-01-01 00:00:00").replace(tzinfo=datetime.timezone.utc)
+            rows.append((area_code, date_str, saved.astimezone(JST).isoformat(), area_name, weather, t_max, t_min,
+                         category_of(weather)))
+        if not rows:
+            return
+        first = self._next_seq(len(rows))
+        self.conn.executemany('''
+            INSERT OR IGNORE INTO forecast_history
+                (area_code, target_date, report_datetime, area_name, weather, temp_max, temp_min, weather_category, seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [row + (first + i,) for i, row in enumerate(rows)])
+
+    def save_forecasts(self, rows, report_datetime):
+        """1回分の予報 (area_code, area_name, date, weather, temp_max, temp_min) を1トランザクションで履歴に追記する
+
+        同じ発表の2回目以降や、最新版と内容が変わらない日は書き込まない。書き込んだ行数を返す。
+        """
+        return self.save_reports([(report_datetime, rows)])
+
+    def save_reports(self, reports, raise_errors=False):
+        """複数の発表 [(report_datetime, rows), ...] をまとめて1トランザクションで履歴に追記する
+
+        rows の形式と書き込まない条件は save_forecasts と同じ。書き込んだ行数を返す。
+        DBのエラーは表示して0を返す (raise_errors=True なら sqlite3.Error をそのまま送出する)。
+        """
+        params = [
+            {"area_code": a, "area_name": n, "date": d, "weather": w, "temp_max": t_max, "temp_min": t_min,
+             "category": category_of(w), "report_datetime": report_datetime}
+            for report_datetime, rows in reports
+            for a, n, d, w, t_max, t_min in rows
+        ]
+        if not params:
+            return 0
+        try:
+            with self.lock, self.conn:
+                # 書き込みのロックを先に取ってから採番する (他の接続の書き込みと seq の順番が入れ替わらない)
+                first = self._next_seq(len(params))
+                for i, param in enumerate(params):
+                    param["seq"] = first + i
+                cur = self.conn.executemany('''
+                    INSERT OR IGNORE INTO forecast_history
+                        (area_code, target_date, report_datetime, area_name, weather, temp_max, temp_min, weather_category,
+                         seq)
+                    SELECT :area_code, :date, :report_datetime, :area_name, :weather, :temp_max, :temp_min, :category,
+                           :seq
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM forecast_latest
+                        WHERE area_code = :area_code AND target_date = :date
+                          AND (report_datetime = :report_datetime
+                               OR (weather IS :weather AND temp_max IS :temp_max AND temp_min IS :temp_min))
+                    )
+                ''', params)
+                # rowcount はトリガーによる forecast_latest の更新を含まない (= 履歴に追記した行数)
+                written = cur.rowcount
+        except sqlite3.Error as e:
+            if raise_errors:
+                raise
+            print(f"DB保存エラー: {e}")
+            return 0
+        return written
+
+    def get_forecast(self, area_code, date_str):
+        """日付選択で過去の予報を閲覧するための関数 (その日の最新版)"""
+        with self.lock:
+            return self.conn.execute('''
+                SELECT weather, temp_max, temp_min FROM forecast_latest
+                WHERE area_code = ? AND target_date = ?
+            ''', (area_code, date_str)).fetchone()
+
+    def saved_forecast(self, area_code, since_date):
+        """地域の since_date 以降の保存済みの予報を、日付順の (日付, 天気, 最高, 最低, 発表時刻) のリストで返す
+
+        通信を待たずに (またはオフライン時に) 前回の予報を表示するために使う。
+        """
+        with self.lock:
+            return self.conn.execute('''
+                SELECT target_date, weather, temp_max, temp_min, report_datetime FROM forecast_latest
+                WHERE area_code = ? AND target_date >= ?
+                ORDER BY target_date
+            ''', (area_code, since_date)).fetchall()
+
+    def get_revisions(self, area_code, date_str):
+        """ある地域・日付の予報の変遷を (発表時刻, 天気, 最高, 最低) のリストで古い順に返す"""
+        with self.lock:
+            return self.conn.execute('''
+                SELECT report_datetime, weather, temp_max, temp_min FROM forecast_history
+                WHERE area_code = ? AND target_date = ?
+                ORDER BY report_datetime
+            ''', (area_code, date_str)).fetchall()
+
+    def category_counts(self, date_str):
+        """ある日の全地域の最新の予報を天気カテゴリごとに数え、{カテゴリ名: 地域数} で返す"""
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT weather_category, COUNT(*) FROM forecast_latest
+                WHERE target_date = ?
+                GROUP BY weather_category
+            ''', (date_str,)).fetchall()
+        counts = {}
+        for category, count in rows:
+            name = CATEGORY_NAMES.get(category, CATEGORY_NAMES[UNKNOWN])
+            counts[name] = counts.get(name, 0) + count
+        return counts
+
+    # --- 期間指定の検索 (列指向で返す) ---
+
+    def month_for_area(self, area_code, month):
+        """地域の1か月 ("YYYY-MM") 分の最新の予報を、日付順の列ごとのリストで返す
+
+        {"date": [...], "weather": [...], "temp_max": [...], "temp_min": [...], "category": [...]}
+        """
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT target_date, weather, temp_max, temp_min, weather_category FROM forecast_latest
+                WHERE area_code = ? AND target_date >= ? AND target_date < ?
+                ORDER BY target_date
+            ''', (area_code, f"{month}-01", f"{month}-32")).fetchall()
+        return _columns(("date", "weather", "temp_max", "temp_min", "category"), rows)
+
+    def areas_on_date(self, date_str):
+        """ある日の全地域の最新の予報を、地域コード順の列ごとのリストで返す"""
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT area_code, area_name, weather, temp_max, temp_min, weather_category FROM forecast_latest
+                WHERE target_date = ?
+                ORDER BY area_code
+            ''', (date_str,)).fetchall()
+        return _columns(("area_code", "area_name", "weather", "temp_max", "temp_min", "category"), rows)
+
+    def daily_summary(self, start_date, end_date):
+        """[start_date, end_date) の日ごとの全地域の集計 (カテゴリ別の地域数・平均気温) を列指向で返す"""
+        with self.lock:
+            rows = self.conn.execute(f'''
+                SELECT target_date, {", ".join(AGGREGATE_COLUMNS)} FROM forecast_daily
+                WHERE target_date >= ? AND target_date < ?
+                ORDER BY target_date
+            ''', (start_date, end_date)).fetchall()
+        return _summary_columns(rows, ("date",))
+
+    def monthly_summary(self, area_code, start_month="0000-00", end_month="9999-99"):
+        """地域の [start_month, end_month) の月ごとの集計 (カテゴリ別の日数・平均気温) を列指向で返す"""
+        with self.lock:
+            rows = self.conn.execute(f'''
+                SELECT month, {", ".join(AGGREGATE_COLUMNS)} FROM forecast_monthly
+                WHERE area_code = ? AND month >= ? AND month < ?
+                ORDER BY month
+            ''', (area_code, start_month, end_month)).fetchall()
+        return _summary_columns(rows, ("month",))
+
+    # --- 時系列 ---
+
+    def _kind_id(self, kind):
+        # 呼び出し側でロックを取得済みであること
+        if kind not in self.kind_ids:
+            cur = self.conn.execute("INSERT INTO series_kinds (name) VALUES (?)", (kind,))
+            self.kind_ids[kind] = cur.lastrowid
+        return self.kind_ids[kind]
+
+    def save_series(self, office_code, report_datetime, points, raise_errors=False):
+        """1回分の発表に含まれる時系列 (forecast_parser.SeriesPoint) を1トランザクションでまとめて保存する
+
+        取り込み済みの発表なら何もせずに0を返す (points は読まれない)。
+        値が変わっていない点は書き換えない。DBのエラーの扱いは save_reports と同じ。
+        """
+        report_ts = to_timestamp(report_datetime)
+        try:
+            with self.lock, self.conn:
+                if self.conn.execute(
+                    "SELECT 1 FROM series_reports WHERE office_code = ? AND report_ts = ?", (office_code, report_ts)
+                ).fetchone():
+                    return 0
+                points = list(points)
+                areas = {(p.area_code, p.area_name) for p in points}
+                self.conn.executemany('''
+                    INSERT INTO areas (area_code, area_name, office_code) VALUES (?, ?, ?)
+                    ON CONFLICT(area_code) DO UPDATE SET area_name = excluded.area_name, office_code = excluded.office_code
+                    WHERE areas.area_name IS NOT excluded.area_name OR areas.office_code IS NOT excluded.office_code
+                ''', [(code, name, office_code) for code, name in areas])
+                self.conn.executemany('''
+                    INSERT INTO forecast_series (area_code, kind_id, ts, value, text, report_ts) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(area_code, kind_id, ts) DO UPDATE
+                        SET value = excluded.value, text = excluded.text, report_ts = excluded.report_ts
+                        WHERE excluded.report_ts >= forecast_series.report_ts
+                          AND (forecast_series.value IS NOT excluded.value OR forecast_series.text IS NOT excluded.text)
+                ''', [(p.area_code, self._kind_id(p.kind), p.ts, p.value, p.text, report_ts) for p in points])
+                self.conn.execute(
+                    "INSERT INTO series_reports (office_code, report_ts, points) VALUES (?, ?, ?)",
+                    (office_code, report_ts, len(points)),
+                )
+        except sqlite3.Error as e:
+            if raise_errors:
+                raise
+            print(f"DB保存エラー: {e}")
+            return 0
+        return len(points)
+
+    def latest_reports(self):
+        """officeコードごとに、取り込み済みの最新の発表時刻 (UNIX時刻) を返す"""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT office_code, MAX(report_ts) FROM series_reports GROUP BY office_code"
+            ))
+
+    def series_range(self, area_code, kind, start, end):
+        """地域X・系列kindの [start, end) の値を (ts, value, text) のリストで返す (主キーの範囲検索のみ)"""
+        with self.lock:
+            kind_id = self.kind_ids.get(kind)
+            if kind_id is None:
+                return []
+            return self.conn.execute('''
+                SELECT ts, value, text FROM forecast_series
+                WHERE area_code = ? AND kind_id = ? AND ts >= ? AND ts < ?
+                ORDER BY ts
+            ''', (area_code, kind_id, to_timestamp(start), to_timestamp(end))).fetchall()
+
+    def series_across_areas(self, kind, start, end):
+        """系列kindの [start, end) の値を全地域分 (ts, area_code, value) のリストで返す"""
+        with self.lock:
+            kind_id = self.kind_ids.get(kind)
+            if kind_id is None:
+                return []
+            return self.conn.execute('''
+                SELECT ts, area_code, value FROM forecast_series
+                WHERE kind_id = ? AND ts >= ? AND ts < ?
+                ORDER BY ts, area_code
+            ''', (kind_id, to_timestamp(start), to_timestamp(end))).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_store = None
+
+
+def get_store(db_name=DB_NAME):
+    """アプリ全体で共有するWeatherStoreを返す (初回呼び出し時に接続を開く)"""
+    global _store
+    if _store is None:
+        _store = WeatherStore(db_name)
+    return _store
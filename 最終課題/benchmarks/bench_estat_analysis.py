@@ -0,0 +1,101 @@
+"""地域ごとの分析 (estat_analysis) のベンチマーク: 1地域ずつ vs 全地域まとめて
+
+1. 比率の計算: 地域ごとにSQLiteへ問い合わせて比率を計算する vs 表を1回読んで全地域を列の演算で計算する
+   (--db の整形済みの表と、ダミーの表を整形した --regions 行の表の2つで比べる。
+   ダミーの表の1地域ずつは先頭の --sample 地域だけを測り、全地域分に換算する)
+2. グラフ: 都道府県ごとに「問い合わせ → 図を作る → 保存」を繰り返す vs render_charts で一括 (プロセスプール)
+両方の空き家率が一致すること、東京都の空き家率が analysis_東京都.png と同じ 10.93% であることも確認する。
+
+実行方法 (最終課題ディレクトリから):
+    python benchmarks/bench_estat_analysis.py [--db estat_data.db] [--regions 20000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from estat_analysis import RATIOS, analyze, chart_path, load_table, prefectures, render_chart, render_charts
+from estat_cleanse import cleanse_table
+from estat_ingest import ingest_workbook
+from fake_estat import generate_workbook
+
+
+def one_region(conn, table_name, name):
+    """1地域分の行だけを問い合わせて比率を計算する (これまでの1地域ずつの分析と同じ流れ)"""
+    table = pd.read_sql_query(f'SELECT * FROM "{table_name}" WHERE 地域名 = ? LIMIT 1', conn, params=(name,))
+    return analyze(table).iloc[0]
+
+
+def compare_ratios(conn, table_name, names, label, sample=None):
+    measured = names[:sample] if sample else names
+    start = time.perf_counter()
+    per_region = {name: one_region(conn, table_name, name) for name in measured}
+    one_by_one = (time.perf_counter() - start) / len(measured) * len(names)
+    start = time.perf_counter()
+    summary = analyze(load_table(conn, table_name))
+    vectorized = time.perf_counter() - start
+    rows = summary.drop_duplicates("地域名").set_index("地域名")
+    for name, row in per_region.items():
+        assert all(row[ratio] == rows.loc[name, ratio] or (pd.isna(row[ratio]) and pd.isna(rows.loc[name, ratio]))
+                   for ratio in RATIOS)
+    estimated = " (換算)" if len(measured) < len(names) else ""
+    print(f"  {label:28}: 1地域ずつ {one_by_one * 1000:9.1f} ms{estimated} / まとめて {vectorized * 1000:7.1f} ms "
+          f"({one_by_one / vectorized:.0f} 倍, 比率 {len(RATIOS)} 種類 × {len(summary)} 地域)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(HERE), "estat_data.db"), help="整形済みの表があるDB")
+    parser.add_argument("--regions", type=int, default=20000, help="ダミーの表の行数")
+    parser.add_argument("--sample", type=int, default=500, help="ダミーの表で1地域ずつの時間を測る地域の数")
+    args = parser.parse_args()
+    # ベンチマークの環境に日本語フォントが無くても止めない (グラフの文字が豆腐になるだけ)
+    warnings.filterwarnings("ignore", message="Glyph .* missing")
+
+    print("空き家率の計算:")
+    conn = sqlite3.connect(args.db)
+    names = list(dict.fromkeys(load_table(conn)["地域名"]))
+    summary = compare_ratios(conn, "cleansed_housing_data", names, f"実データ ({len(names)} 地域)")
+    targets = prefectures(summary)
+    assert round(targets.loc["東京都", "空き家率"], 2) == 10.93
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_workbook(os.path.join(tmp, "estat.xlsx"), regions=args.regions)
+        synthetic = sqlite3.connect(os.path.join(tmp, "estat.db"))
+        ingest_workbook(path, synthetic)
+        cleanse_table(synthetic, "e001_1")
+        names = list(dict.fromkeys(load_table(synthetic, "cleansed_e001_1")["地域名"]))
+        compare_ratios(synthetic, "cleansed_e001_1", names, f"ダミー ({len(names)} 地域, 索引あり)", args.sample)
+        synthetic.close()
+
+        print(f"グラフ ({len(targets)} 都道府県, CPU {os.cpu_count()} コア):")
+        one_dir = os.path.join(tmp, "one_by_one")
+        os.makedirs(one_dir)
+        start = time.perf_counter()
+        for name in targets.index:
+            render_chart(one_region(conn, "cleansed_housing_data", name), chart_path(one_dir, name))
+        one_by_one = time.perf_counter() - start
+        print(f"  1地域ずつ (問い合わせ + 図を作り直す): {one_by_one:6.2f} s")
+
+        batch_dir = os.path.join(tmp, "batch")
+        start = time.perf_counter()
+        paths = render_charts(targets, batch_dir)
+        batch = time.perf_counter() - start
+        print(f"  まとめて (render_charts)             : {batch:6.2f} s ({one_by_one / batch:.1f} 倍, "
+              f"プロセスの起動を含む)")
+        assert sorted(os.listdir(batch_dir)) == sorted(os.listdir(one_dir))
+        assert len(paths) == len(targets)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""e-Stat統計表の整形 (estat_cleanse) のベンチマーク: 取り込んだままの表 vs 型付き・インデックス付きの表
+
+analysis_東京都.png などを作った都道府県ごとの分析 (総数・居住世帯あり・空き家 → 空き家率) を、
+- 整形前: "Unnamed: N" TEXT の表から、地域名を LIKE で探して CAST する (全行の走査)
+- 整形後: 型付きの表から、地域名のインデックスで1行を引く
+で47都道府県分実行して比べる。両方の空き家率が一致することも確認する。
+値の大半が秘匿 ("x" "…") の地域の行が捨てられず、記号が NULL として書き込まれることも確かめる。
+
+実行方法 (最終課題ディレクトリから):
+    python benchmarks/bench_estat_cleanse.py [--regions 20000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from estat_cleanse import cleanse_table
+from estat_ingest import ingest_workbook, quote
+from fake_estat import REGION_NAMES, generate_workbook
+
+PREFECTURES = REGION_NAMES[1:]
+REPEAT = 5
+
+# 取り込んだままの表と同じ形 (列はすべて TEXT) の、秘匿の多い地域を含む小さな表
+SUPPRESSED_ROWS = [
+    ("住宅・土地統計調査 (市区町村)", None, None, None, None, None),
+    ("地域識別コード", "地域区分", "総数", "居住世帯あり", "空き家", "その他"),
+    ("0", "00000_全国", "100", "90", "10", "0"),
+    ("2", "01202_函館市", "x", "x", "…", "x"),
+    ("2", "01203_小樽市", "50", "-", "5", "1"),
+    ("注) x は秘匿", None, None, None, None, None),
+]
+
+
+def check_suppressed(conn):
+    conn.execute(f"CREATE TABLE suppressed ({', '.join(f'c{i} TEXT' for i in range(6))})")
+    conn.executemany("INSERT INTO suppressed VALUES (?, ?, ?, ?, ?, ?)", SUPPRESSED_ROWS)
+    result = cleanse_table(conn, "suppressed")
+    rows = {row[1]: row[2:] for row in conn.execute(f"SELECT * FROM {quote(result.table_name)}")}
+    print(f"秘匿の多い地域の行: {result.rows} 行を書き込み, 注記/空行 {result.dropped_rows} 行を除外, 函館市 = {rows.get('01202')}")
+    assert result.rows == 3 and result.dropped_rows == 1
+    assert rows["01202"] == ("函館市", None, None, None, None)
+    assert rows["01203"] == ("小樽市", 50, 0, 5, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=20000, help="データ行数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_workbook(os.path.join(tmp, "estat.xlsx"), regions=args.regions)
+        conn = sqlite3.connect(os.path.join(tmp, "estat.db"))
+        ingest_workbook(path, conn)
+
+        start = time.perf_counter()
+        result = cleanse_table(conn, "e001_1")
+        elapsed = time.perf_counter() - start
+        types = {}
+        for _, kind in result.columns:
+            types[kind] = types.get(kind, 0) + 1
+        print(f"整形: {result.rows} 行 {elapsed:.2f} s (見出し {result.header_rows} 行・注記/空行 {result.dropped_rows} 行を除外, "
+              f"列の型 {types})")
+
+        raw_columns = [row[1] for row in conn.execute("PRAGMA table_info(e001_1)")]
+        region, total, occupied, vacant = (quote(raw_columns[i]) for i in (1, 2, 3, 8))
+
+        def before(name):
+            row = conn.execute(f'''
+                SELECT CAST({total} AS INTEGER), CAST({occupied} AS INTEGER), CAST({vacant} AS INTEGER)
+                FROM e001_1 WHERE {region} LIKE ? ESCAPE '\\'
+            ''', (f"%\\_{name}",)).fetchone()
+            return row
+
+        def after(name):
+            return conn.execute(f'''
+                SELECT "0_総数", "1_居住世帯あり", "22_空き家" FROM {quote(result.table_name)} WHERE 地域名 = ?
+            ''', (name,)).fetchone()
+
+        print(f"47都道府県の空き家率 ({args.regions} 行の表, {REPEAT} 回の平均):")
+        rates = {}
+        for label, query in (("整形前 (LIKE + CAST)", before), ("整形後 (インデックス)", after)):
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                rates[label] = {name: (lambda r: r[2] / r[0])(query(name)) for name in PREFECTURES}
+            per_run = (time.perf_counter() - start) / REPEAT
+            print(f"  {label:22}: {per_run * 1000:9.2f} ms ({per_run / len(PREFECTURES) * 1e6:8.1f} µs/都道府県)")
+        first, second = rates.values()
+        assert first == second
+        print(f"東京都の空き家率: {first['東京都']:.2%} (整形前後で一致)")
+        plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM {quote(result.table_name)} WHERE 地域名 = '東京都'").fetchall()
+        print(f"整形後のクエリプラン: {plan[0][-1]}")
+        check_suppressed(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""複数データセットの取り込み (estat_harvest) のベンチマーク: 1つずつ順番に vs スケジューラ + プロセスプール
+
+ダミーe-Statサーバー (応答に --latency 秒の遅延) から --datasets 個の統計表を
+- 順番に: 「間隔を空ける → sync_workbook」をデータセットの数だけ繰り返す (これまでのノートブックと同じ流れ)
+- harvest: ホストごとの間隔・同時接続数を守りつつ並行してダウンロードし、解析はプロセスプールで行う
+で取り込み、時間とデータセットごとの内訳を比べる。両方のDBのテーブルとマニフェスト (シートのXMLのハッシュを含む) が一致すること、
+スケジューラがリクエストを始めた時刻の間隔が --interval 秒以上空いていること、存在しないIDが他を止めないことを確認する。
+(サーバーに届いた時刻の間隔は通信の揺らぎを含むので、参考として表示する)
+最後に harvest を別プロセスで実行して途中で止め (解析のプロセスプールを含めてプロセスグループごと止める)、
+再実行で残りだけがダウンロードされることを確かめる。
+
+実行方法 (最終課題ディレクトリから):
+    python benchmarks/bench_estat_harvest.py [--datasets 8] [--regions 2000] [--interval 0.2] [--latency 0.3]
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from estat_harvest import FAILED, HostScheduler, harvest, table_prefix_for
+from estat_ingest import quote
+from estat_sync import NOT_MODIFIED, UPDATED, sync_workbook
+from fake_estat import DOWNLOAD_PATH, FakeEStatServer, generate_workbook
+
+MISSING_ID = "999999999999"
+
+
+class RecordingScheduler(HostScheduler):
+    """リクエストを始めた時刻 (slot.started) を記録する HostScheduler"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slots = []
+
+    def slot(self, url):
+        slot = super().slot(url)
+        self.slots.append(slot)
+        return slot
+
+
+def tables(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        names = [name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'estat\\_0%' ESCAPE '\\' ORDER BY name")]
+        return {name: conn.execute(f"SELECT * FROM {quote(name)}").fetchall() for name in names}
+    finally:
+        conn.close()
+
+
+def manifest(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return conn.execute("SELECT url, sheet_name, table_name, rows, row_hash, part_hash FROM estat_sheet_manifest "
+                            "ORDER BY url, sheet_name").fetchall()
+    finally:
+        conn.close()
+
+
+def report(result):
+    if result.status == FAILED:
+        print(f"    {result.stat_inf_id} {result.status:12} {result.error[:60]}")
+        return
+    print(f"    {result.stat_inf_id} {result.status:12} {result.size / 1024:7.1f} KB  待機 {result.wait:5.2f}s  "
+          f"受信 {result.download:5.2f}s  解析 {result.parse:5.2f}s  保存 {result.load:5.2f}s  入れ替え {len(result.changed)}")
+
+
+def worker(args):
+    """--worker: 別プロセスで harvest を実行し、データセットが終わるたびに1行出力する (中断のテスト用)"""
+    def progress(result):
+        print(result.stat_inf_id, result.status, flush=True)
+    harvest(args.ids.split(","), args.db, url_template=args.url_template,
+            scheduler=HostScheduler(args.interval, 2), on_dataset=progress)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", type=int, default=8, help="データセットの数")
+    parser.add_argument("--regions", type=int, default=2000, help="1シートあたりのデータ行数")
+    parser.add_argument("--interval", type=float, default=0.2, help="同じホストへのリクエストの間隔 (秒)")
+    parser.add_argument("--latency", type=float, default=0.3, help="サーバーの応答の遅延 (秒)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--ids", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--url-template", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = [f"0000402{n:05d}" for n in range(args.datasets)]
+        files = {stat_inf_id: generate_workbook(os.path.join(tmp, f"{stat_inf_id}.xlsx"), regions=args.regions,
+                                                sheets=2, seed=n * 10)
+                 for n, stat_inf_id in enumerate(ids)}
+        print(f"{args.datasets} データセット × 2 シート × {args.regions} 行, 遅延 {args.latency}s, "
+              f"間隔 {args.interval}s, CPU {os.cpu_count()} コア")
+
+        with FakeEStatServer(files, delay=args.latency) as server:
+            url_template = f"{server.base_url}{DOWNLOAD_PATH}?statInfId={{}}&fileKind=0"
+
+            sequential_db = os.path.join(tmp, "sequential.db")
+            conn = sqlite3.connect(sequential_db)
+            session = requests.Session()
+            start = time.perf_counter()
+            for stat_inf_id in ids:
+                time.sleep(args.interval)
+                result = sync_workbook(conn, url_template.format(stat_inf_id), session=session,
+                                       table_prefix=table_prefix_for(stat_inf_id))
+                assert result.status == UPDATED
+            sequential = time.perf_counter() - start
+            session.close()
+            conn.close()
+            print(f"  順番に取り込み : {sequential:6.2f} s")
+
+            harvest_db = os.path.join(tmp, "harvest.db")
+            server.request_times.clear()
+            print("  harvest のデータセットごとの内訳:")
+            scheduler = RecordingScheduler(args.interval, 2)
+            start = time.perf_counter()
+            results = harvest(ids + [MISSING_ID], harvest_db, url_template=url_template,
+                              scheduler=scheduler, on_dataset=report)
+            parallel = time.perf_counter() - start
+            print(f"  harvest        : {parallel:6.2f} s ({sequential / parallel:.1f} 倍)")
+            statuses = {result.stat_inf_id: result.status for result in results}
+            assert statuses.pop(MISSING_ID) == FAILED
+            assert set(statuses.values()) == {UPDATED}
+            starts = sorted(slot.started for slot in scheduler.slots)
+            gaps = [b - a for a, b in zip(starts, starts[1:])]
+            assert len(starts) == args.datasets + 1 and min(gaps) >= args.interval, min(gaps)
+            arrivals = [b - a for a, b in zip(server.request_times, server.request_times[1:])]
+            print(f"  リクエストの開始の間隔: 最小 {min(gaps):.3f} s (間隔 {args.interval}s を守っている, "
+                  f"サーバーへの到着の間隔は最小 {min(arrivals):.3f} s)")
+            assert tables(harvest_db) == tables(sequential_db)
+            sheets = manifest(harvest_db)
+            assert sheets == manifest(sequential_db) and all(sheet[5] for sheet in sheets)
+            print("  順番に取り込んだDBと同じテーブル・マニフェストになりました")
+            # harvest で取り込んだDBでも、sync_workbook はシートのXMLのハッシュだけで変化なしと分かる
+            conn = sqlite3.connect(harvest_db)
+            result = sync_workbook(conn, url_template.format(ids[0]), force=True, table_prefix=table_prefix_for(ids[0]))
+            conn.close()
+            assert result.sheets and not result.changed_sheets and all(sheet.seconds == 0.0 for sheet in result.sheets)
+
+            start = time.perf_counter()
+            results = harvest(ids, harvest_db, url_template=url_template, scheduler=HostScheduler(args.interval, 2))
+            assert {result.status for result in results} == {NOT_MODIFIED}
+            print(f"  2回目 (すべて 304): {time.perf_counter() - start:6.2f} s")
+
+            # 中断と再開: 別プロセスで半分ほど終わったところで止め、もう一度実行する
+            resume_db = os.path.join(tmp, "resume.db")
+            process = subprocess.Popen(
+                [sys.executable, __file__, "--worker", "--ids", ",".join(ids), "--db", resume_db,
+                 "--url-template", url_template, "--interval", str(args.interval)],
+                stdout=subprocess.PIPE, text=True, start_new_session=True)
+            finished = []
+            try:
+                for line in process.stdout:
+                    finished.append(line.split()[0])
+                    if len(finished) >= args.datasets // 2:
+                        break
+            finally:
+                # 解析のプロセスプール (spawn) の子プロセスも stdout を引き継いでいるので、グループごと止める
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+                process.stdout.close()
+            before = server.requests - server.not_modified
+            results = harvest(ids, resume_db, url_template=url_template, scheduler=HostScheduler(args.interval, 2))
+            downloaded = server.requests - server.not_modified - before
+            statuses = {result.stat_inf_id: result.status for result in results}
+            assert all(statuses[stat_inf_id] == NOT_MODIFIED for stat_inf_id in finished)
+            assert downloaded == args.datasets - sum(1 for s in statuses.values() if s == NOT_MODIFIED)
+            assert tables(resume_db) == tables(sequential_db)
+            print(f"  中断 ({len(finished)} 件完了) → 再開: 完了済みは 304、残りの {downloaded} 件だけをダウンロード")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""e-Stat Excel の取り込みのベンチマーク: 一括 (BytesIO + pd.read_excel + to_sql) vs ストリーミング (estat_ingest)
+
+大きなダミーの統計表をローカルサーバーから取得し、取り込み方ごとに別プロセスで
+- ピークのメモリ使用量 (最大RSS。ライブラリ読み込み直後からの増分も表示)
+- 取り込みの所要時間と行/秒
+を測る。両方の結果のテーブルが同じ内容であることも確認する。
+
+実行方法 (最終課題ディレクトリから):
+    python benchmarks/bench_estat_ingest.py [--regions 30000] [--sheets 3]
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+STAT_INF_ID = "000040209841"
+
+
+def peak_rss_mib():
+    # Linux の ru_maxrss は KiB 単位
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_bulk(url, db_name):
+    """変更前のノートブックと同じ手順"""
+    from io import BytesIO
+
+    import pandas as pd
+    import requests
+
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    with BytesIO(response.content) as excel_file:
+        dict_df = pd.read_excel(excel_file, sheet_name=None)
+    rows = 0
+    with sqlite3.connect(db_name) as conn:
+        for sheet_name, df in dict_df.items():
+            table_name = sheet_name.replace(' ', '_').replace('-', '_').replace('.', '_')
+            df.to_sql(table_name, conn, if_exists='replace', index=False)
+            rows += len(df)
+    return baseline, time.perf_counter() - start, rows
+
+
+def run_streaming(url, db_name):
+    from estat_ingest import ingest_url
+
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    _, results = ingest_url(url, db_name)
+    return baseline, time.perf_counter() - start, sum(r.rows for r in results)
+
+
+WORKERS = {"bulk": run_bulk, "streaming": run_streaming}
+
+
+def worker(mode, url, db_name):
+    baseline, elapsed, rows = WORKERS[mode](url, db_name)
+    print(json.dumps({"baseline": baseline, "peak": peak_rss_mib(), "elapsed": elapsed, "rows": rows}))
+
+
+def table_contents(db_name):
+    conn = sqlite3.connect(db_name)
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+    contents = {t: (conn.execute(f'SELECT * FROM "{t}"').fetchall(),
+                    [r[1] for r in conn.execute(f'PRAGMA table_info("{t}")')]) for t in tables}
+    conn.close()
+    return contents
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=30000, help="1シートあたりのデータ行数")
+    parser.add_argument("--sheets", type=int, default=3)
+    args = parser.parse_args()
+
+    from fake_estat import FakeEStatServer, generate_workbook
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "estat.xlsx")
+        start = time.perf_counter()
+        generate_workbook(path, regions=args.regions, sheets=args.sheets)
+        print(f"ダミーの統計表: {args.sheets} シート × {args.regions} 行, "
+              f"{os.path.getsize(path) / 2**20:.1f} MiB (作成 {time.perf_counter() - start:.1f} s)")
+
+        results = {}
+        with FakeEStatServer({STAT_INF_ID: path}) as server:
+            for mode in WORKERS:
+                db_name = os.path.join(tmp, f"{mode}.db")
+                out = subprocess.run([sys.executable, __file__, "--worker", mode, server.url_for(STAT_INF_ID), db_name],
+                                     check=True, capture_output=True, text=True).stdout
+                results[mode] = json.loads(out.strip().splitlines()[-1])
+
+        print(f"  {'取り込み方':14} {'最大RSS':>10} {'増分':>10} {'所要時間':>9} {'行/秒':>10}")
+        for mode, r in results.items():
+            print(f"  {mode:14} {r['peak']:7.1f} MiB {r['peak'] - r['baseline']:7.1f} MiB "
+                  f"{r['elapsed']:7.2f} s {r['rows'] / r['elapsed']:10,.0f}")
+        assert results["bulk"]["rows"] == results["streaming"]["rows"]
+        assert table_contents(os.path.join(tmp, "bulk.db")) == table_contents(os.path.join(tmp, "streaming.db"))
+        print("両方のDBの内容が一致")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:5])
+    else:
+        main()
@@ -0,0 +1,152 @@
+"""e-Statの差分取り込み (estat_sync) のベンチマーク: 毎回の全件取り込み vs 変わった部分だけの取り込み
+
+ローカルのダミーe-Statサーバー (fake_estat.FakeEStatServer) に対して、
+1. 初回: ingest_url (全件) と sync_workbook の時間を比べる
+2. 変更なし: 条件付きGETで 304 が返り、何も受信しない
+3. 検証子を返さないサーバー: 全体を受信するが、内容のハッシュが同じなのでシートを読まない
+4. 作り直したファイル (シートの中身は同じ): シートのXMLのハッシュが同じなので、セルを解析せず、
+   DBには (ファイルの記録以外) 何も書き込まない。全件取り込みより速いことも確かめる
+5. XMLのハッシュの記録が無いDB: 読むだけで行のハッシュを比べ、テーブルには書き込まない (記録だけを更新する)
+6. 1シートだけ変更: そのシートのテーブルだけを入れ替え、他のテーブルはそのまま
+を実行し、各段階のテーブルが全件取り込みの結果と一致することを確認する。
+テーブルを入れ替えていないことは sqlite_master の rootpage が変わらないことで確かめる。
+
+実行方法 (最終課題ディレクトリから):
+    python benchmarks/bench_estat_sync.py [--regions 5000] [--sheets 3]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import requests
+from openpyxl import Workbook
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from estat_ingest import ingest_url, quote
+from estat_sync import NOT_MODIFIED, UNCHANGED, UPDATED, sync_workbook
+from fake_estat import FakeEStatServer, sheet_rows
+
+STAT_INF_ID = "000040209841"
+
+
+def write_workbook(path, regions, seeds):
+    """シートごとの乱数の種を指定してExcelファイルを書き出す (seeds[n] が e001_{n+1} の中身を決める)"""
+    workbook = Workbook(write_only=True)
+    for n, seed in enumerate(seeds):
+        worksheet = workbook.create_sheet(f"e001_{n + 1}")
+        for row in sheet_rows(regions, seed=seed):
+            worksheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def rootpages(conn):
+    return dict(conn.execute("SELECT name, rootpage FROM sqlite_master WHERE type = 'table' AND name LIKE 'e001%'"))
+
+
+def tables(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return {name: conn.execute(f"SELECT * FROM {quote(name)}").fetchall()
+                for name in sorted(rootpages(conn))}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=5000, help="1シートあたりのデータ行数")
+    parser.add_argument("--sheets", type=int, default=3, help="シート数")
+    args = parser.parse_args()
+    seeds = list(range(args.sheets))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original = write_workbook(os.path.join(tmp, "v1.xlsx"), args.regions, seeds)
+        print(f"ダミーの表: {args.sheets} シート × {args.regions} 行 ({os.path.getsize(original) / 1e6:.1f} MB)")
+        db_name = os.path.join(tmp, "sync.db")
+        full_db = os.path.join(tmp, "full.db")
+        conn = sqlite3.connect(db_name)
+        session = requests.Session()
+        elapsed = written = 0  # 直前の step の所要時間と、書き込んだ行数 (取り消した分を含む)
+
+        def step(label, expected_status, expected_changed):
+            nonlocal elapsed, written
+            before = conn.total_changes
+            start = time.perf_counter()
+            result = sync_workbook(conn, url, session=session)
+            elapsed = time.perf_counter() - start
+            written = conn.total_changes - before
+            changed = [sheet.sheet_name for sheet in result.changed_sheets]
+            print(f"  {label:32}: {elapsed * 1000:9.1f} ms  {result.status:12} 受信 {result.size / 1e6:5.2f} MB  "
+                  f"入れ替え {changed or 'なし'}")
+            assert result.status == expected_status, result.status
+            assert changed == expected_changed, changed
+            return result
+
+        with FakeEStatServer({STAT_INF_ID: original}) as server:
+            url = server.url_for(STAT_INF_ID)
+            start = time.perf_counter()
+            ingest_url(url, full_db)
+            full_seconds = time.perf_counter() - start
+            print(f"  {'全件取り込み (ingest_url)':32}: {full_seconds * 1000:9.1f} ms")
+
+            all_sheets = [f"e001_{n + 1}" for n in seeds]
+            step("初回 (sync_workbook)", UPDATED, all_sheets)
+            assert tables(db_name) == tables(full_db)
+            pages = rootpages(conn)
+
+            step("変更なし (条件付きGET)", NOT_MODIFIED, [])
+            assert server.not_modified == 1
+
+        with FakeEStatServer({STAT_INF_ID: original}, send_validators=False) as server:
+            url_without = server.url_for(STAT_INF_ID)
+            # 同じURLとして扱うため、マニフェストのURLを付け替える
+            with conn:
+                conn.execute("UPDATE estat_manifest SET url = ?", (url_without,))
+                conn.execute("UPDATE estat_sheet_manifest SET url = ?", (url_without,))
+            url = url_without
+            step("検証子なし・内容も同じ", UNCHANGED, [])
+
+            rebuilt = write_workbook(os.path.join(tmp, "v1_rebuilt.xlsx"), args.regions, seeds)
+            server.set_file(STAT_INF_ID, rebuilt)
+            step("作り直したファイル (中身は同じ)", UPDATED, [])
+            assert rootpages(conn) == pages
+            # 書き込むのはファイルの記録 (estat_manifest) の1行だけ
+            assert written == 1, written
+            assert elapsed < full_seconds, (elapsed, full_seconds)
+            print(f"    書き込み {written} 行 (全件取り込みの {elapsed / full_seconds:.0%} の時間)")
+
+            # XMLのハッシュを記録する前のDB: 行のハッシュで比べる (セルは解析するが、テーブルには書き込まない)
+            with conn:
+                conn.execute("UPDATE estat_sheet_manifest SET part_hash = NULL")
+                conn.execute("UPDATE estat_manifest SET content_hash = NULL")
+            step("XMLのハッシュの記録なし (行で比較)", UPDATED, [])
+            assert rootpages(conn) == pages
+            # 書き込むのはファイルの記録1行と、シートごとの XMLのハッシュ
+            assert written == 1 + len(all_sheets), written
+            assert conn.execute("SELECT count(*) FROM estat_sheet_manifest WHERE part_hash IS NULL").fetchone()[0] == 0
+            print(f"    書き込み {written} 行 (全件取り込みの {elapsed / full_seconds:.0%} の時間)")
+
+            changed_seeds = seeds[:-1] + [seeds[-1] + 100]
+            updated = write_workbook(os.path.join(tmp, "v2.xlsx"), args.regions, changed_seeds)
+            server.set_file(STAT_INF_ID, updated)
+            step("1シートだけ変更", UPDATED, all_sheets[-1:])
+            after = rootpages(conn)
+            assert all(after[name] == pages[name] for name in all_sheets[:-1])
+            assert conn.execute("SELECT count(*) FROM sqlite_master WHERE name LIKE '%__staging'").fetchone()[0] == 0
+
+            os.remove(full_db)
+            ingest_url(url, full_db)
+            assert tables(db_name) == tables(full_db)
+        session.close()
+        conn.close()
+        print("すべての段階で、全件取り込みと同じテーブルになりました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""ベンチマーク用のダミーe-Stat統計表 (Excel) とローカルHTTPサーバー
+
+実際の「住宅・土地統計調査」の表と同じ並び (表題 → 空行 → 表章項目/事項名/項目名/表章単位の見出し行
+→ 地域識別コードの行 → 地域ごとのデータ行) のワークシートを、行数を指定して作る。
+サーバーは /stat-search/file-download?statInfId=...&fileKind=0 でファイルを返し、
+ETag / Last-Modified による条件付きGETに対応する。
+"""
+import email.utils
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from openpyxl import Workbook
+
+DOWNLOAD_PATH = "/stat-search/file-download"
+
+ITEM_NAMES = [
+    "0_総数", "1_居住世帯あり", "11_同居世帯なし", "12_同居世帯あり", "2_居住世帯なし", "21_一時現在者のみ",
+    "22_空き家", "221_賃貸・売却用及び二次的住宅を除く空き家", "222_賃貸用の空き家", "223_売却用の空き家",
+    "224_二次的住宅", "2241_別荘", "2242_その他", "23_建築中",
+]
+BUILDING_NAMES = ["0_総数", "1_高齢者居住施設", "2_会社等の寮・寄宿舎", "3_学校等の寮・寄宿舎", "4_旅館・宿泊所", "5_その他の建物"]
+# 先頭の地域は実際の表と同じ名前にする (以降は "地域N")
+REGION_NAMES = ["全国"] + [
+    "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県", "茨城県", "栃木県", "群馬県", "埼玉県", "千葉県",
+    "東京都", "神奈川県", "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県", "岐阜県", "静岡県", "愛知県", "三重県",
+    "滋賀県", "京都府", "大阪府", "兵庫県", "奈良県", "和歌山県", "鳥取県", "島根県", "岡山県", "広島県", "山口県", "徳島県",
+    "香川県", "愛媛県", "高知県", "福岡県", "佐賀県", "長崎県", "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県",
+]
+NOTES = ["注）「-」は該当数値がないことを示す。", "資料：総務省統計局「住宅・土地統計調査」"]
+
+
+def sheet_rows(regions, seed=0, notes=True, title="第１－１表　居住世帯の有無(9区分)別住宅数及び建物の種類(5区分)別住宅以外で人が居住する建物数"):
+    """1シート分の行 (タプル) を上から順に返すジェネレーター (notes=True なら末尾に注記の行を付ける)"""
+    rng = random.Random(seed)
+    width = 2 + len(ITEM_NAMES) + len(BUILDING_NAMES)
+    yield (title,) + (None,) * (width - 1)
+    yield (None,) * width
+    yield (None,) * width
+    yield (None, "表章項目") + ("住宅数",) * len(ITEM_NAMES) + ("住宅以外で人が居住する建物数",) * len(BUILDING_NAMES)
+    yield (None, "事項名") + ("居住世帯の有無",) * len(ITEM_NAMES) + ("住宅以外の建物の種類",) * len(BUILDING_NAMES)
+    yield (None, "項目名") + tuple(ITEM_NAMES) + tuple(BUILDING_NAMES)
+    yield (None, "表章単位") + ("戸",) * len(ITEM_NAMES) + ("棟",) * len(BUILDING_NAMES)
+    yield ("地域識別コード", "地域区分", " ") + (None,) * (width - 3)
+    for i in range(regions):
+        code = "a" if i % 4 else "1"
+        if i < len(REGION_NAMES):
+            region = f"{i:02d}000_{REGION_NAMES[i]}"
+        else:
+            region = f"{i % 100000:05d}_地域{i}"
+        total = rng.randint(10_000, 5_000_000)
+        values = [total] + [rng.randint(0, total) for _ in ITEM_NAMES[1:]]
+        buildings = [rng.choice((rng.randint(0, 50_000), "-")) for _ in BUILDING_NAMES]
+        yield (code, region) + tuple(values) + tuple(buildings)
+    if notes:
+        yield (None,) * width
+        for note in NOTES:
+            yield (note,) + (None,) * (width - 1)
+
+
+def generate_workbook(path, regions=1000, sheets=1, seed=0):
+    """sheets 枚のシート (e001_1, e001_2, …) に regions 行ずつのデータを持つExcelファイルを書き出す"""
+    workbook = Workbook(write_only=True)
+    for n in range(sheets):
+        worksheet = workbook.create_sheet(f"e001_{n + 1}")
+        for row in sheet_rows(regions, seed=seed + n):
+            worksheet.append(row)
+    workbook.save(path)
+    return path
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+class FakeEStatServer:
+    """statInfId ごとのExcelファイルを返すローカルHTTPサーバー
+
+    with FakeEStatServer({"000040209841": "/tmp/a.xlsx"}) as server:
+        server.url_for("000040209841")
+    """
+
+    def __init__(self, files, delay=0.0, send_validators=True):
+        self.files = dict(files)  # statInfId → ファイルのパス (差し替えると内容が変わる)
+        self.delay = delay
+        self.send_validators = send_validators  # False なら ETag / Last-Modified を返さない (条件付きGETも無効)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.request_times = []  # リクエストを受けた時刻 (time.monotonic)
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._httpd = None
+
+    def set_file(self, stat_inf_id, path):
+        with self.lock:
+            self.files[stat_inf_id] = path
+
+    def validators(self, path):
+        """ファイルの内容から (ETag, Last-Modified) を作る"""
+        with open(path, "rb") as f:
+            etag = '"' + hashlib.sha1(f.read()).hexdigest()[:16] + '"'
+        return etag, email.utils.formatdate(os.path.getmtime(path), usegmt=True)
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if server.delay:
+                    time.sleep(server.delay)
+                url = urlparse(self.path)
+                stat_inf_id = parse_qs(url.query).get("statInfId", [None])[0]
+                with server.lock:
+                    server.requests += 1
+                    server.request_times.append(time.monotonic())
+                    path = server.files.get(stat_inf_id) if url.path == DOWNLOAD_PATH else None
+                if path is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag, last_modified = server.validators(path)
+                if server.send_validators and (self.headers.get("If-None-Match") == etag or (
+                        "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == last_modified)):
+                    with server.lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", last_modified)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                size = os.path.getsize(path)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                if server.send_validators:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", last_modified)
+                self.send_header("Content-Length", str(size))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    while chunk := f.read(1 << 16):
+                        self.wfile.write(chunk)
+                with server.lock:
+                    server.bytes_sent += size
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = _Server(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def url_for(self, stat_inf_id):
+        return f"{self.base_url}{DOWNLOAD_PATH}?statInfId={stat_inf_id}&fileKind=0"
@@ -0,0 +1,176 @@
+"""整形済みの住宅の表 (cleansed_housing_data) を全地域まとめて分析し、都道府県ごとのグラフを一括で描く
+
+analysis_東京都.png のような図を1地域ずつ作ると、地域ごとにSQLiteへ問い合わせて比率を計算し、
+matplotlib の図を作り直すことになる。ここでは
+1. 表を1回だけ読み込み (pandas の列ごとの配列)
+2. 空き家率などの比率を全地域まとめて列どうしの演算で計算し
+3. 都道府県のグラフをプロセスプールで一括して描く (各プロセスは図を1つだけ作って使い回す)
+を行う。pandas と matplotlib が必要。
+
+実行例 (最終課題ディレクトリから):
+    python estat_analysis.py --db estat_data.db --out charts
+    python estat_analysis.py --regions 東京都 長野県
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+
+from estat_ingest import quote
+
+TABLE_NAME = "cleansed_housing_data"
+TOTAL = "0_総数"
+OCCUPIED = "1_居住世帯あり"
+UNOCCUPIED = "2_居住世帯なし"
+VACANT = "22_空き家"
+
+# 比率の名前 → (分子の列, 分母の列)
+RATIOS = {
+    "空き家率": (VACANT, TOTAL),
+    "居住世帯あり率": (OCCUPIED, TOTAL),
+    "居住世帯なし率": (UNOCCUPIED, TOTAL),
+    "一時現在者のみ率": ("21_一時現在者のみ", TOTAL),
+    "建築中率": ("23_建築中", TOTAL),
+    "賃貸用の空き家の割合": ("222_賃貸用の空き家", VACANT),
+    "売却用の空き家の割合": ("223_売却用の空き家", VACANT),
+    "二次的住宅の割合": ("224_二次的住宅", VACANT),
+    "その他の空き家の割合": ("221_賃貸・売却用及び二次的住宅を除く空き家", VACANT),
+}
+
+PREFECTURES = [
+    "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県", "茨城県", "栃木県", "群馬県", "埼玉県", "千葉県",
+    "東京都", "神奈川県", "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県", "岐阜県", "静岡県", "愛知県", "三重県",
+    "滋賀県", "京都府", "大阪府", "兵庫県", "奈良県", "和歌山県", "鳥取県", "島根県", "岡山県", "広島県", "山口県", "徳島県",
+    "香川県", "愛媛県", "高知県", "福岡県", "佐賀県", "長崎県", "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県",
+]
+
+# 円グラフの項目と色 (その他 = 総数 - 居住世帯あり - 空き家)
+PIE_LABELS = ["居住世帯あり", "空き家", "その他(建築中等)"]
+PIE_COLORS = ["#4CAF50", "#FF5722", "#FFC107"]
+# 日本語を表示できるフォント (最初に見つかったものを使う)
+JAPANESE_FONTS = ["IPAexGothic", "IPAGothic", "Noto Sans CJK JP", "Hiragino Sans", "Yu Gothic", "Meiryo", "TakaoGothic"]
+# 1つのプロセスにまとめて渡すグラフの数
+CHART_CHUNK = 8
+
+
+def load_table(conn, table_name=TABLE_NAME):
+    """型付きの表を1回で読み込み、DataFrame (列ごとの配列) で返す"""
+    return pd.read_sql_query(f"SELECT * FROM {quote(table_name)}", conn)
+
+
+def analyze(table):
+    """全地域の比率を列どうしの演算でまとめて計算する
+
+    地域名・円グラフの値 (居住世帯あり / 空き家 / その他)・RATIOS の各比率 (%) を列に持つ DataFrame を返す。
+    分母が 0 または欠損の比率は NaN。
+    """
+    result = pd.DataFrame({"地域名": table["地域名"]})
+    total = table[TOTAL].astype("float64")
+    result["居住世帯あり"] = table[OCCUPIED]
+    result["空き家"] = table[VACANT]
+    result["その他"] = (table[TOTAL] - table[OCCUPIED] - table[VACANT]).clip(lower=0)
+    result[TOTAL] = table[TOTAL]
+    for name, (numerator, denominator) in RATIOS.items():
+        base = total if denominator == TOTAL else table[denominator].astype("float64")
+        result[name] = table[numerator].astype("float64") / base.where(base != 0) * 100
+    return result
+
+
+def prefectures(summary):
+    """analyze の結果から都道府県の行だけを都道府県コードの順に取り出す (同じ名前の市区町村より先に出る行を使う)"""
+    rows = summary.drop_duplicates("地域名").set_index("地域名", drop=False)
+    return rows.reindex([name for name in PREFECTURES if name in rows.index])
+
+
+def chart_path(out_dir, name):
+    return os.path.join(out_dir, f"analysis_{name}.png")
+
+
+def _figure():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
+    available = {font.name for font in font_manager.fontManager.ttflist}
+    fonts = [name for name in JAPANESE_FONTS if name in available]
+    if fonts:
+        plt.rcParams["font.family"] = fonts[0]
+    return plt.figure(figsize=(8, 6))
+
+
+def _draw(figure, row, path):
+    figure.clf()
+    ax = figure.add_subplot()
+    ax.pie([row["居住世帯あり"], row["空き家"], row["その他"]], labels=PIE_LABELS, colors=PIE_COLORS,
+           autopct="%1.1f%%", startangle=90)
+    ax.set_title(f"{row['地域名']} の住宅利用状況 (空き家率: {row['空き家率']:.2f}%)")
+    figure.savefig(path)
+    return path
+
+
+def render_chart(row, path):
+    """1地域分の円グラフを描いて path に保存する"""
+    import matplotlib.pyplot as plt
+
+    figure = _figure()
+    try:
+        return _draw(figure, row, path)
+    finally:
+        plt.close(figure)
+
+
+def _render_chunk(rows, out_dir):
+    # プロセスプールで実行する。図は1つだけ作り、地域ごとに描き直す
+    import matplotlib.pyplot as plt
+
+    figure = _figure()
+    try:
+        return [_draw(figure, row, chart_path(out_dir, row["地域名"])) for row in rows]
+    finally:
+        plt.close(figure)
+
+
+def render_charts(summary, out_dir, workers=None, chunk=CHART_CHUNK):
+    """summary (analyze の結果) の全行の円グラフを out_dir に一括で描き、保存したパスのリストを返す"""
+    os.makedirs(out_dir, exist_ok=True)
+    rows = summary[["地域名", "居住世帯あり", "空き家", "その他", "空き家率"]].to_dict("records")
+    chunks = [rows[i:i + chunk] for i in range(0, len(rows), chunk)]
+    if not chunks:
+        return []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        return [path for paths in pool.map(_render_chunk, chunks, [out_dir] * len(chunks)) for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="全地域の住宅の比率を計算し、都道府県の円グラフを一括で描く")
+    parser.add_argument("--db", default="estat_data.db", help="整形済みの表があるSQLiteファイル")
+    parser.add_argument("--table", default=TABLE_NAME, help="整形済みの表の名前")
+    parser.add_argument("--out", default=".", help="グラフの出力先")
+    parser.add_argument("--regions", nargs="*", help="グラフを描く地域 (省略時は47都道府県)")
+    parser.add_argument("--workers", type=int, default=None, help="グラフを描くプロセス数 (既定はCPUのコア数)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with sqlite3.connect(args.db) as conn:
+        summary = analyze(load_table(conn, args.table))
+    targets = prefectures(summary)
+    if args.regions:
+        targets = summary.drop_duplicates("地域名").set_index("地域名", drop=False).reindex(args.regions).dropna(
+            subset=["地域名"])
+    print(f"{len(summary)} 地域の比率を計算しました ({time.perf_counter() - start:.2f} s)")
+    print(prefectures(summary).sort_values("空き家率", ascending=False)[["空き家率", "居住世帯なし率"]]
+          .head(10).round(2).to_string())
+
+    start = time.perf_counter()
+    paths = render_charts(targets, args.out, args.workers)
+    print(f"{len(paths)} 枚のグラフを {args.out} に保存しました ({time.perf_counter() - start:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+"""取り込んだままのe-Stat統計表 (列はすべて TEXT) を、型の付いた分析用のテーブルに整える
+
+e-Statの表は、表題・空行・複数行の見出し (表章項目 / 事項名 / 項目名 / 表章単位 …) の下にデータ行が続き、
+末尾に注記が付くことがある。pd.read_excel + to_sql のままでは見出しがデータ行に埋もれ、
+列名は "Unnamed: N"、値は文字列なので、分析のたびに全行を文字列から変換することになる。ここでは
+1. データ行 (ラベル + 数値が並ぶ行) の手前までを見出しとみなし、列名を見出しの行から決める
+2. 列ごとに全行を見て INTEGER / REAL / TEXT を決める ("-" は 0、"…" "x" などは NULL)
+3. 表題・空行・注記の行を捨てる (地域コードの付いた行は、値の大半が秘匿 ("x" "…") でも残す)
+4. "00000_全国" のような地域の列を 地域コード / 地域名 に分け、地域名にインデックスを張る
+を行い、型の付いたテーブルを1トランザクションで書き出す。元のテーブルは2回読むだけで、全体をメモリに載せない。
+"""
+import re
+from typing import NamedTuple
+
+from estat_ingest import INSERT_CHUNK, begin, quote
+
+# 「該当なし」を表す記号 (0 として扱う)
+ZERO_MARKS = {"-", "－", "―"}
+# 「不詳・秘匿・未集計」などを表す記号 (NULL として扱う)
+NULL_MARKS = {"…", "...", "x", "X", "***", "*", "△", ""}
+# 注記の行の書き出し
+NOTE_PREFIXES = ("注", "(注", "（注", "※", "資料", "出典", "備考")
+# "00000_全国" のような地域区分の値
+REGION_PATTERN = re.compile(r"^(\d{5})_(.+)$")
+# 見出しの行のうち、列名には使わないもの (単位など)
+UNIT_LABELS = {"表章単位", "単位"}
+
+
+class CleanseResult(NamedTuple):
+    """整形の結果"""
+    table_name: str
+    rows: int
+    columns: list        # [(列名, 型), ...]
+    header_rows: int     # 見出しとみなした行数 (表題・空行を含む)
+    dropped_rows: int    # 捨てた注記・空行の数 (地域コードの付いた行は含まない)
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _number(value):
+    """値を int / float に変換する (記号は 0 / None)。数値でなければ ValueError"""
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip().replace(",", "")
+    if text in ZERO_MARKS:
+        return 0
+    if text in NULL_MARKS:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _is_number(value):
+    try:
+        _number(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_data_row(row):
+    """ラベルの後ろに数値 (または記号) が並んでいる行"""
+    values = [_text(v) for v in row if _text(v) not in (None, "")]
+    if len(values) < 3:
+        return False
+    numeric = sum(1 for v in values if _is_number(v) and str(v).strip() not in NULL_MARKS)
+    return numeric >= len(values) / 2
+
+
+def _is_note_row(row):
+    values = [_text(v) for v in row if _text(v) not in (None, "")]
+    if not values:
+        return True
+    first = str(values[0])
+    return first.startswith(NOTE_PREFIXES) or (len(values) == 1 and not _is_number(first))
+
+
+def _region_of(row, column):
+    """row の column 列が "00000_全国" のような地域区分の値なら、その match"""
+    if column is None or column >= len(row):
+        return None
+    return REGION_PATTERN.match(str(_text(row[column])))
+
+
+def _column_names(header, width, label_columns):
+    """見出しの行から列名を決める
+
+    数値の列: 値の種類が最も多い見出しの行 (e-Statでは「項目名」) の値。重複には "_1" "_2" … を付ける
+    ラベルの列: 下の見出しの行から順に探して最初に見つかった値 (例: 地域識別コード)
+    """
+    header = [list(row) + [None] * (width - len(row)) for row in header]
+    rows = [row for row in header if not any(_text(v) in UNIT_LABELS for v in row)]
+    names = [None] * width
+    value_columns = [i for i in range(width) if i not in label_columns]
+    if rows and value_columns:
+        leaf = max(reversed(rows), key=lambda row: len({_text(row[i]) for i in value_columns} - {None, ""}))
+        for i in value_columns:
+            names[i] = _text(leaf[i])
+    for i in label_columns:
+        names[i] = next((_text(row[i]) for row in reversed(header) if _text(row[i]) not in (None, "")), None)
+
+    result, seen = [], {}
+    for i, name in enumerate(names):
+        name = str(name) if name not in (None, "") else f"列{i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        result.append(name)
+    return result
+
+
+# 列の型: 値を見るたびに広い方へだけ変わる (INTEGER → REAL → TEXT)
+TYPE_ORDER = {"INTEGER": 0, "REAL": 1, "TEXT": 2}
+
+
+def _value_type(value):
+    if value in (None, ""):
+        return "INTEGER"
+    try:
+        number = _number(value)
+    except ValueError:
+        return "TEXT"
+    return "REAL" if isinstance(number, float) else "INTEGER"
+
+
+def cleanse_table(conn, source_table, target_table=None):
+    """source_table (取り込んだままの表) を整形して target_table (省略時は cleansed_<元の名前>) に書き出す
+
+    既存の target_table は置き換える。CleanseResult を返す。データ行が見つからなければ ValueError。
+    """
+    target_table = target_table or f"cleansed_{source_table}"
+    select = f"SELECT * FROM {quote(source_table)}"
+
+    # 1回目: 見出しの範囲・列の種類・列ごとの型を決める
+    header, width = [], 0
+    data_start = None
+    label_columns = set()
+    region_column = None
+    kinds = None  # 列ごとの型 (全行を保持せず、行を読むたびに更新する)
+    dropped = set()  # データ行の間に出てきた注記・空行の番号
+    for index, row in enumerate(conn.execute(select)):
+        width = max(width, len(row))
+        if data_start is None:
+            if not _is_data_row(row):
+                header.append(row)
+                continue
+            data_start = index
+            # 最初のデータ行で数値でない列と、地域の列より左の列 (地域識別コードなど) をラベルの列とする
+            label_columns = {i for i, v in enumerate(row) if v not in (None, "") and not _is_number(v)}
+            region_column = next((i for i in sorted(label_columns) if REGION_PATTERN.match(str(_text(row[i])))), None)
+            if region_column is not None:
+                label_columns |= set(range(region_column))
+            kinds = ["INTEGER"] * width
+        # 地域コードの付いた行は、秘匿の記号ばかりでも地域の行として残す (記号は NULL として書き込む)。
+        # 注記・数値の数による判定は、地域コードの無い行だけに使う
+        if _region_of(row, region_column) is None and (_is_note_row(row) or not _is_data_row(row)):
+            dropped.add(index)
+            continue
+        kinds += ["INTEGER"] * (width - len(kinds))
+        for i, value in enumerate(row):
+            if i not in label_columns and kinds[i] != "TEXT":
+                kinds[i] = max(kinds[i], _value_type(value), key=TYPE_ORDER.get)
+    if data_start is None:
+        raise ValueError(f"{source_table}: データ行が見つかりません")
+
+    names = _column_names(header, width, label_columns)
+    columns = []
+    for i, name in enumerate(names):
+        if i == region_column:
+            columns += [("地域コード", "TEXT"), ("地域名", "TEXT")]
+        else:
+            columns.append((name, "TEXT" if i in label_columns else kinds[i]))
+
+    def convert(row):
+        row = list(row) + [None] * (width - len(row))
+        values = []
+        for i, value in enumerate(row):
+            if i == region_column:
+                match = _region_of(row, region_column)
+                values += [match.group(1), match.group(2)] if match else [None, _text(value)]
+            elif i in label_columns or kinds[i] == "TEXT":
+                values.append(_text(value))
+            else:
+                number = _number(value) if value not in (None, "") else None
+                values.append(float(number) if kinds[i] == "REAL" and number is not None else number)
+        return values
+
+    # 2回目: データ行だけを型を揃えて書き込む
+    insert = (f"INSERT INTO {quote(target_table)} ({', '.join(quote(n) for n, _ in columns)}) "
+              f"VALUES ({', '.join('?' * len(columns))})")
+    rows = 0
+    with conn:
+        begin(conn)
+        conn.execute(f"DROP TABLE IF EXISTS {quote(target_table)}")
+        conn.execute(f"CREATE TABLE {quote(target_table)} ({', '.join(f'{quote(n)} {t}' for n, t in columns)})")
+        batch = []
+        # 見出し (data_start より前) ・注記・空行は書き込まない
+        for index, row in enumerate(conn.execute(select)):
+            if index < data_start or index in dropped:
+                continue
+            batch.append(convert(row))
+            if len(batch) >= INSERT_CHUNK:
+                conn.executemany(insert, batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(insert, batch)
+            rows += len(batch)
+        if any(n == "地域名" for n, _ in columns):
+            conn.execute(f"CREATE INDEX {quote(f'idx_{target_table}_地域名')} ON {quote(target_table)} (地域名)")
+    return CleanseResult(target_table, rows, columns, data_start, len(dropped))
@@ -0,0 +1,305 @@
+"""複数のe-Stat統計表 (statInfId) をまとめて取り込む
+
+1つずつ「3秒待つ → ダウンロード → Excelを解析 → SQLiteへ保存」を繰り返すと、待ち時間・通信・解析が
+すべて直列になる。ここでは
+1. ダウンロード: スレッドで並行して行う。ホストごとに同時接続数とリクエストの間隔 (既定 3秒) を守る
+2. 解析: Excelの解析はCPUを使うので、プロセスプールで別のコアに任せる。
+   各プロセスはデータセットごとの一時DBファイルに全シートを書き込み、行のハッシュとシートのXMLのハッシュを計算する
+3. 保存: メインのDBへの書き込みはメインスレッドだけが行う。行のハッシュが前回と違うシートだけを
+   一時DBからコピーし、estat_sync と同じく一時テーブル → 名前の変更で入れ替える
+を重ねて実行する。取り込みの記録は estat_sync のマニフェストに残すので、途中で止まっても
+もう一度実行すれば、取り込み済みのデータセットは条件付きGET (304) だけで済む
+(fresh_for 秒以内に確認済みのものはリクエストも送らない)。
+
+テーブル名は "estat_<statInfId>_<シート名>"。
+
+実行例:
+    python estat_harvest.py 000040209841 000040209842 --db estat_data.db
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+import requests
+from openpyxl import load_workbook
+
+from estat_ingest import INSERT_CHUNK, begin, quote, table_name_for, write_sheet
+from estat_sync import (STAGING_SUFFIX, UPDATED, fetch, init_manifest, previous_fetch, record_fetch, sheet_part_hashes,
+                        swap_table, unchanged_rows)
+
+DOWNLOAD_URL = "https://www.e-stat.go.jp/stat-search/file-download?statInfId={}&fileKind=0"
+# 同じホストへのリクエストの間隔 (秒) と同時接続数
+HOST_INTERVAL = 3.0
+HOST_CONCURRENCY = 2
+# 並行してダウンロードするデータセットの数 (ホストごとの制限とは別の全体の上限)
+DOWNLOAD_WORKERS = 4
+# データセットの処理結果 (DatasetResult.status)
+FAILED = "failed"
+SKIPPED = "skipped"  # fresh_for 秒以内に確認済みなのでリクエストを送らなかった
+
+
+def table_prefix_for(stat_inf_id):
+    return f"estat_{stat_inf_id}_"
+
+
+class HostScheduler:
+    """ホストごとに、同時接続数と「前のリクエストを始めてから次を始めるまでの間隔」を守る
+
+    with scheduler.slot(url): の中でリクエストを送る。待った秒数は slot(url).waited、
+    リクエストを始めてよいとされた時刻 (time.monotonic) は slot(url).started で分かる。
+    """
+
+    def __init__(self, interval=HOST_INTERVAL, concurrency=HOST_CONCURRENCY):
+        self.interval = interval
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._hosts = {}  # ホスト名 → [セマフォ, 開始の順番を守るロック, 前のリクエストを始めた時刻]
+
+    def slot(self, url):
+        return _HostSlot(self, urlparse(url).netloc)
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = [threading.Semaphore(self.concurrency), threading.Lock(), None]
+            return self._hosts[host]
+
+    def _start(self, host):
+        """前のリクエストを始めてから interval 秒経つまで待ち、始めた時刻を返す
+
+        実際に始めた時刻 (sleep から戻った時刻) を次の基準にするので、sleep が長引いても間隔は縮まない。
+        """
+        state = self._host(host)
+        with state[1]:
+            if state[2] is not None:
+                delay = state[2] + self.interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            state[2] = time.monotonic()
+            return state[2]
+
+
+class _HostSlot:
+    def __init__(self, scheduler, host):
+        self.scheduler = scheduler
+        self.host = host
+        self.waited = 0.0
+        self.started = None
+
+    def __enter__(self):
+        entered = time.monotonic()
+        self.scheduler._host(self.host)[0].acquire()
+        self.started = self.scheduler._start(self.host)
+        self.waited = self.started - entered
+        return self
+
+    def __exit__(self, *exc):
+        self.scheduler._host(self.host)[0].release()
+
+
+class StagedSheet(NamedTuple):
+    """一時DBに書き込んだ1シート分の情報"""
+    sheet_name: str
+    table_name: str
+    rows: int
+    row_hash: str
+    part_hash: str   # シートのXMLのハッシュ (sheet_part_hashes の値。読み取れなければ None)
+
+
+class DatasetResult(NamedTuple):
+    """1データセット分の取り込み結果 (秒数は待ち時間・ダウンロード・解析 (プロセスの空き待ちを含む)・保存の内訳)"""
+    stat_inf_id: str
+    status: str
+    size: int
+    sheets: int           # 読んだシートの数
+    changed: list         # 入れ替えたテーブル名のリスト
+    wait: float
+    download: float
+    parse: float
+    load: float
+    error: str = ""
+
+
+def stage_workbook(path, staging_db, table_prefix, chunk_rows=INSERT_CHUNK):
+    """Excelファイルの全シートを staging_db (新しいDBファイル) に書き込み、StagedSheet のリストを返す
+
+    プロセスプールで実行する (メインのDBには触れない)。
+    """
+    parts = sheet_part_hashes(path)
+    conn = sqlite3.connect(staging_db)
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        # 一時DBなので、書き込みの同期を省く
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        staged = []
+        for worksheet in workbook.worksheets:
+            table_name = table_prefix + table_name_for(worksheet.title)
+            hasher = hashlib.sha256()
+            with conn:
+                begin(conn)
+                rows = write_sheet(conn, worksheet, table_name, chunk_rows, hasher)
+            staged.append(StagedSheet(worksheet.title, table_name, rows, hasher.hexdigest(), parts.get(worksheet.title)))
+        return staged
+    finally:
+        workbook.close()
+        conn.close()
+
+
+def load_staged(conn, url, staging_db, staged):
+    """stage_workbook の結果のうち、行のハッシュが前回と違うシートだけをメインのDBに入れ替える。入れ替えたテーブル名を返す
+
+    前回との比較は sync_workbook と同じ estat_sync.unchanged_rows で行う (行が同じシートは part_hash だけを更新する)。
+    """
+    changed = [sheet for sheet in staged
+               if unchanged_rows(conn, url, sheet.sheet_name, sheet.table_name, sheet.part_hash,
+                                 lambda sheet=sheet: sheet.row_hash) is None]
+    if not changed:
+        return []
+    # ATTACH はトランザクションの外でしか実行できない
+    conn.execute("ATTACH DATABASE ? AS staged", (staging_db,))
+    try:
+        for sheet in changed:
+            staging = sheet.table_name + STAGING_SUFFIX
+            with conn:
+                begin(conn)
+                conn.execute(f"DROP TABLE IF EXISTS main.{quote(staging)}")
+                # 列の型 (TEXT) と行の順序はそのままコピーされる
+                conn.execute(f"CREATE TABLE main.{quote(staging)} AS SELECT * FROM staged.{quote(sheet.table_name)}")
+                swap_table(conn, url, sheet.sheet_name, sheet.table_name, staging, sheet.rows, sheet.row_hash,
+                           sheet.part_hash)
+    finally:
+        conn.execute("DETACH DATABASE staged")
+    return [sheet.table_name for sheet in changed]
+
+
+def _recently_checked(conn, url, fresh_for):
+    row = conn.execute("SELECT checked_at FROM estat_manifest WHERE url = ?", (url,)).fetchone()
+    if not fresh_for or row is None or row[0] is None:
+        return False
+    return datetime.fromisoformat(row[0]) >= datetime.now() - timedelta(seconds=fresh_for)
+
+
+def harvest(stat_inf_ids, db_name, headers=None, url_template=DOWNLOAD_URL, scheduler=None,
+            download_workers=DOWNLOAD_WORKERS, parse_workers=None, fresh_for=0, force=False, timeout=30,
+            on_dataset=None):
+    """stat_inf_ids の統計表を db_name に取り込み、DatasetResult のリストを (終わった順に) 返す
+
+    1つのデータセットの失敗 (通信エラー・壊れたファイル) は status=FAILED として記録し、他は続ける。
+    on_dataset(DatasetResult) を渡すと、データセットが終わるたびに呼ばれる (進捗表示用)。
+    """
+    scheduler = scheduler or HostScheduler()
+    conn = sqlite3.connect(db_name)
+    init_manifest(conn)
+    work_dir = tempfile.mkdtemp(prefix="estat_harvest_")
+    session = requests.Session()
+    results = []
+
+    def finish(result):
+        results.append(result)
+        if on_dataset is not None:
+            on_dataset(result)
+
+    def download(stat_inf_id, url, previous):
+        # スレッドで実行する (メインのDBには触れない)
+        with scheduler.slot(url) as slot:
+            start = time.perf_counter()
+            fetched = fetch(url, previous, headers, timeout, session, force, work_dir)
+        return fetched, slot.waited, time.perf_counter() - start
+
+    try:
+        with ThreadPoolExecutor(max_workers=download_workers) as downloads, \
+                ProcessPoolExecutor(max_workers=parse_workers, mp_context=get_context("spawn")) as parsers:
+            pending = {}  # Future → (段階, statInfId, url, それまでの結果)
+            for stat_inf_id in dict.fromkeys(stat_inf_ids):
+                url = url_template.format(stat_inf_id)
+                if not force and _recently_checked(conn, url, fresh_for):
+                    finish(DatasetResult(stat_inf_id, SKIPPED, 0, 0, [], 0.0, 0.0, 0.0, 0.0))
+                    continue
+                future = downloads.submit(download, stat_inf_id, url, previous_fetch(conn, url))
+                pending[future] = ("download", stat_inf_id, url, None)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, stat_inf_id, url, state = pending.pop(future)
+                    try:
+                        if stage == "download":
+                            fetched, waited, download_seconds = future.result()
+                            if fetched.status != UPDATED:
+                                record_fetch(conn, url, fetched)
+                                finish(DatasetResult(stat_inf_id, fetched.status, fetched.size, 0, [],
+                                                     waited, download_seconds, 0.0, 0.0))
+                                continue
+                            staging_db = os.path.join(work_dir, f"{stat_inf_id}.db")
+                            parse_future = parsers.submit(stage_workbook, fetched.path, staging_db,
+                                                          table_prefix_for(stat_inf_id))
+                            pending[parse_future] = ("parse", stat_inf_id, url,
+                                                     (fetched, waited, download_seconds, staging_db,
+                                                      time.perf_counter()))
+                            continue
+                        fetched, waited, download_seconds, staging_db, parse_start = state
+                        try:
+                            staged = future.result()
+                            parse_seconds = time.perf_counter() - parse_start
+                            start = time.perf_counter()
+                            changed = load_staged(conn, url, staging_db, staged)
+                            # シートをすべて入れ替えてからファイルの記録を更新する (途中で止まったら次回も読み直す)
+                            record_fetch(conn, url, fetched)
+                        finally:
+                            for path in (fetched.path, staging_db):
+                                if os.path.exists(path):
+                                    os.remove(path)
+                        finish(DatasetResult(stat_inf_id, UPDATED, fetched.size, len(staged), changed,
+                                             waited, download_seconds, parse_seconds, time.perf_counter() - start))
+                    except Exception as e:
+                        # 受信途中・解析途中のファイルは最後に作業ディレクトリごと消す
+                        finish(DatasetResult(stat_inf_id, FAILED, 0, 0, [], 0.0, 0.0, 0.0, 0.0, repr(e)))
+    finally:
+        session.close()
+        conn.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="複数のe-Stat統計表をまとめてSQLiteに取り込む (2回目以降は変わった表だけ)")
+    parser.add_argument("stat_inf_ids", nargs="+", help="statInfId (統計表ファイルのID)")
+    parser.add_argument("--db", default="estat_data.db", help="保存するSQLiteファイル")
+    parser.add_argument("--interval", type=float, default=HOST_INTERVAL, help="同じホストへのリクエストの間隔 (秒)")
+    parser.add_argument("--concurrency", type=int, default=HOST_CONCURRENCY, help="同じホストへの同時接続数")
+    parser.add_argument("--workers", type=int, default=None, help="解析に使うプロセス数 (既定はCPUのコア数)")
+    parser.add_argument("--fresh-for", type=float, default=0, help="この秒数以内に確認済みの表はリクエストを送らない")
+    parser.add_argument("--force", action="store_true", help="条件付きGETを使わずに全件を読み直す")
+    parser.add_argument("--contact", default="your-email@example.com", help="User-Agent に記載する連絡先")
+    args = parser.parse_args(argv)
+
+    def report(result):
+        if result.status == FAILED:
+            print(f"[失敗] {result.stat_inf_id}: {result.error}")
+            return
+        print(f"[{result.status}] {result.stat_inf_id}: {result.size / 1024:.1f} KB, {result.sheets} シート, "
+              f"入れ替え {len(result.changed)} (待機 {result.wait:.2f}s / 受信 {result.download:.2f}s / "
+              f"解析 {result.parse:.2f}s / 保存 {result.load:.2f}s)")
+
+    start = time.perf_counter()
+    results = harvest(args.stat_inf_ids, args.db, headers={"User-Agent": f"ResearchBot (Contact: {args.contact})"},
+                      scheduler=HostScheduler(args.interval, args.concurrency), parse_workers=args.workers,
+                      fresh_for=args.fresh_for, force=args.force, on_dataset=report)
+    failed = sum(1 for result in results if result.status == FAILED)
+    print(f"{len(results)} 件を処理しました (失敗 {failed} 件, {time.perf_counter() - start:.1f} s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+"""e-StatのExcelファイルを、全体をメモリに載せずにSQLiteへ取り込む
+
+これまでの手順 (response.content → BytesIO → pd.read_excel(sheet_name=None) → to_sql) は、
+ダウンロードしたファイル・展開したXML・全シートのDataFrameを同時にメモリに持つため、
+ピークのメモリ使用量がファイルサイズの何倍にもなる。ここでは
+1. ダウンロードを一時ファイルへ少しずつ書き出し (stream=True)
+2. openpyxl の読み取り専用モードで1行ずつ読み (iter_rows)
+3. 一定行数ごとに executemany で書き込む (1シート = 1トランザクション)
+ので、メモリに載るのは常に1チャンク分の行だけになる。
+
+テーブル名・列名は pd.read_excel + to_sql と同じ規則で付ける
+(1行目が列名、空欄は "Unnamed: 列番号"、重複は ".1" ".2" …)。列はすべて TEXT で、型の整理は後段で行う。
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from typing import NamedTuple
+
+import requests
+from openpyxl import load_workbook
+
+# ダウンロードを一時ファイルへ書き出す単位 (バイト)
+DOWNLOAD_CHUNK = 1 << 20
+# executemany 1回あたりの行数
+INSERT_CHUNK = 5000
+
+
+class SheetResult(NamedTuple):
+    """1シート分の取り込み結果"""
+    sheet_name: str
+    table_name: str
+    rows: int
+    seconds: float
+
+
+def table_name_for(sheet_name):
+    """シート名をテーブル名にする (スペース・ハイフン・ピリオドをアンダースコアに置換)"""
+    return sheet_name.replace(' ', '_').replace('-', '_').replace('.', '_')
+
+
+def quote(name):
+    """SQLの識別子として引用符で囲む"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def save_response(response, directory=None, hasher=None):
+    """stream=True で受け取った応答の本文を一時ファイル (.xlsx) へ少しずつ書き出し、(ファイルのパス, バイト数) を返す
+
+    hasher (hashlib のオブジェクト) を渡すと、書き出しながら本文のハッシュも計算する。
+    失敗した場合は途中まで書いたファイルを消して例外を送出する。
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                f.write(chunk)
+                size += len(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size
+
+
+def download_to_file(url, headers=None, timeout=30, directory=None, session=None):
+    """url の内容を一時ファイル (.xlsx) へ少しずつ書き出し、(ファイルのパス, バイト数) を返す
+
+    ファイルは呼び出し側で削除すること。
+    """
+    get = session.get if session is not None else requests.get
+    with get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        return save_response(response, directory)
+
+
+def header_names(row):
+    """1行目の値から列名を作る (pandas.read_excel の header=0 と同じ名前)"""
+    names = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or value == "" else str(value)
+        if name in seen:
+            # pandas と同じく、重複した列名には ".1" ".2" … を付ける
+            base = name
+            while name in seen:
+                seen[base] += 1
+                name = f"{base}.{seen[base]}"
+        seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _is_blank(row):
+    return all(value is None or value == "" for value in row)
+
+
+def _data_rows(rows):
+    """末尾の空行を除いた行を順に返す (途中の空行は、後ろにデータ行が続いた時点でまとめて返す)"""
+    blanks = []  # 後ろにデータ行が続くまで保留している空行
+    for row in rows:
+        if _is_blank(row):
+            blanks.append(row)
+            continue
+        if blanks:
+            yield from blanks
+            blanks = []
+        yield row
+
+
+def write_sheet(conn, worksheet, table_name, chunk_rows=INSERT_CHUNK, hasher=None):
+    """ワークシートを1行ずつ読んで、新しく作る table_name に書き込む。書き込んだ行数を返す
+
+    トランザクションの管理と既存のテーブルの削除は呼び出し側で行う。
+    1行目より横に長い行があれば、その分の列 ("Unnamed: n") を追加する。
+    pd.read_excel と同じく、途中の空行はそのまま残し、末尾の空行だけを書き込まない。
+    hasher を渡すと、列名と書き込んだ行からシートの内容のハッシュを計算する。
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return 0
+    columns = header_names(header)
+    if hasher is not None:
+        hasher.update(repr(columns).encode("utf-8"))
+    written = 0
+
+    def add_columns(width):
+        for i in range(len(columns), width):
+            columns.append(f"Unnamed: {i}")
+            conn.execute(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(columns[-1])} TEXT")
+
+    def insert_sql():
+        return (f"INSERT INTO {quote(table_name)} ({', '.join(quote(c) for c in columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})")
+
+    def flush(chunk):
+        width = max(len(row) for row in chunk)
+        if width > len(columns):
+            add_columns(width)
+        if hasher is not None:
+            for row in chunk:
+                hasher.update(repr(row).encode("utf-8"))
+        conn.executemany(insert_sql(), [row + (None,) * (len(columns) - len(row)) for row in chunk])
+
+    conn.execute(f"CREATE TABLE {quote(table_name)} ({', '.join(f'{quote(c)} TEXT' for c in columns)})")
+    chunk = []
+    for row in _data_rows(rows):
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            flush(chunk)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+        written += len(chunk)
+    return written
+
+
+def hash_sheet(worksheet, hasher):
+    """write_sheet と同じ行を読み、何も書き込まずに hasher だけを更新する。write_sheet が書き込む行数を返す"""
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return 0
+    hasher.update(repr(header_names(header)).encode("utf-8"))
+    count = 0
+    for row in _data_rows(rows):
+        hasher.update(repr(row).encode("utf-8"))
+        count += 1
+    return count
+
+
+def begin(conn):
+    """明示的にトランザクションを始める (sqlite3 モジュールは DROP/CREATE の前に BEGIN を発行しないため)"""
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+
+
+def ingest_sheet(conn, worksheet, table_name, chunk_rows=INSERT_CHUNK):
+    """ワークシートを table_name に書き込む (既存のテーブルは置き換える)。書き込んだ行数を返す
+
+    1シートを1トランザクションで書き込むので、途中で失敗しても元のテーブルはそのまま残る。
+    """
+    with conn:
+        begin(conn)
+        conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)}")
+        return write_sheet(conn, worksheet, table_name, chunk_rows)
+
+
+def ingest_workbook(path, conn, chunk_rows=INSERT_CHUNK, on_sheet=None):
+    """Excelファイルの全シートを1シートずつ取り込み、SheetResult のリストを返す
+
+    on_sheet(SheetResult) を渡すと、シートを取り込むたびに呼ばれる (進捗表示用)。
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    results = []
+    try:
+        for worksheet in workbook.worksheets:
+            start = time.perf_counter()
+            table_name = table_name_for(worksheet.title)
+            rows = ingest_sheet(conn, worksheet, table_name, chunk_rows)
+            result = SheetResult(worksheet.title, table_name, rows, time.perf_counter() - start)
+            results.append(result)
+            if on_sheet is not None:
+                on_sheet(result)
+    finally:
+        # 読み取り専用モードはファイルを開いたままにするので、明示的に閉じる
+        workbook.close()
+    return results
+
+
+def ingest_url(url, db_name, headers=None, timeout=30, chunk_rows=INSERT_CHUNK, on_sheet=None):
+    """url のExcelファイルをダウンロードして db_name に取り込む。(受信バイト数, SheetResult のリスト) を返す"""
+    path, size = download_to_file(url, headers=headers, timeout=timeout)
+    try:
+        conn = sqlite3.connect(db_name)
+        try:
+            results = ingest_workbook(path, conn, chunk_rows, on_sheet)
+        finally:
+            conn.close()
+    finally:
+        os.remove(path)
+    return size, results
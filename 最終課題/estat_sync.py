@@ -0,0 +1,311 @@
+"""e-StatのExcelファイルを、変わった部分だけSQLiteへ取り込み直す
+
+ingest_url は実行のたびにファイル全体をダウンロードし、全シートのテーブルを作り直す。
+e-Statの表は公開後ほとんど変わらないので、ここでは取り込みの記録 (マニフェスト) を同じDBに残し、
+1. 前回の ETag / Last-Modified で条件付きGETを送り、304 Not Modified なら何もしない
+2. ダウンロードした内容のハッシュが前回と同じなら、シートを読まずに終える
+3. シートごとに、シートのXML (と共有文字列・書式) のハッシュが前回と同じなら、セルを解析せずに終える
+4. XMLが違えば、読むだけで行のハッシュを計算し、前回と同じなら (記録以外は) 何も書き込まない
+5. 変わったシートだけをもう一度読んで一時テーブルに書き込み、1トランザクションで元のテーブルと入れ替える
+を行う。入れ替えの途中で失敗しても、元のテーブルとマニフェストはそのまま残る。
+
+マニフェストのテーブル:
+    estat_manifest        URLごとの ETag / Last-Modified / 内容のハッシュ / サイズ / 取得・確認の日時
+    estat_sheet_manifest  URL・シートごとのテーブル名 / 行数 / 行のハッシュ / XMLのハッシュ / 更新日時
+"""
+import hashlib
+import os
+import posixpath
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import NamedTuple
+
+import requests
+from openpyxl import load_workbook
+
+from estat_ingest import INSERT_CHUNK, begin, hash_sheet, quote, save_response, table_name_for, write_sheet
+
+# 入れ替え前のシートを書き込む一時テーブルの接尾辞
+STAGING_SUFFIX = "__staging"
+
+# シートの値の読み方に関わる、ブック全体で共有の部品 (共有文字列・書式・日付の基準など)
+SHARED_PARTS = ("xl/workbook.xml", "xl/sharedStrings.xml", "xl/styles.xml")
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# sync_workbook の結果 (SyncResult.status)
+NOT_MODIFIED = "not_modified"  # サーバーが 304 を返した
+UNCHANGED = "unchanged"        # ダウンロードした内容が前回と同じ
+UPDATED = "updated"            # シートを読んで、変わったものを入れ替えた
+
+
+class SheetSync(NamedTuple):
+    """1シート分の同期の結果"""
+    sheet_name: str
+    table_name: str
+    rows: int
+    changed: bool    # テーブルを入れ替えたか (False なら既存のテーブルのまま)
+    seconds: float
+
+
+class SyncResult(NamedTuple):
+    """1ファイル分の同期の結果"""
+    status: str
+    size: int        # 受信したバイト数 (304 なら 0)
+    sheets: list     # SheetSync のリスト (シートを読まなかった場合は空)
+
+    @property
+    def changed_sheets(self):
+        return [sheet for sheet in self.sheets if sheet.changed]
+
+
+def init_manifest(conn):
+    """マニフェストのテーブルを作る (既にあれば何もしない)"""
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS estat_manifest (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                size INTEGER,
+                fetched_at TEXT,
+                checked_at TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS estat_sheet_manifest (
+                url TEXT NOT NULL,
+                sheet_name TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                rows INTEGER,
+                row_hash TEXT,
+                part_hash TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (url, sheet_name)
+            )
+        ''')
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(estat_sheet_manifest)")}
+        if "part_hash" not in columns:
+            conn.execute("ALTER TABLE estat_sheet_manifest ADD COLUMN part_hash TEXT")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _table_exists(conn, table_name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (table_name,)).fetchone() is not None
+
+
+def previous_fetch(conn, url):
+    """前回の (ETag, Last-Modified, 内容のハッシュ)。記録が無ければ (None, None, None)"""
+    row = conn.execute("SELECT etag, last_modified, content_hash FROM estat_manifest WHERE url = ?",
+                       (url,)).fetchone()
+    return row or (None, None, None)
+
+
+class Fetched(NamedTuple):
+    """条件付きGETの結果 (status が UPDATED の場合だけ path に受信したファイルがある)"""
+    status: str
+    path: str
+    size: int
+    etag: str
+    last_modified: str
+    content_hash: str
+
+
+def fetch(url, previous=(None, None, None), headers=None, timeout=30, session=None, force=False, directory=None):
+    """前回の記録 previous (previous_fetch の値) を使って条件付きGETを送り、Fetched を返す
+
+    304 なら NOT_MODIFIED、受信した内容のハッシュが前回と同じなら UNCHANGED (どちらもファイルは残さない)。
+    UPDATED の場合、受信したファイルは呼び出し側で削除すること。
+    """
+    etag, last_modified, content_hash = previous
+    request_headers = dict(headers or {})
+    if not force:
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+    get = session.get if session is not None else requests.get
+    hasher = hashlib.sha256()
+    with get(url, headers=request_headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return Fetched(NOT_MODIFIED, None, 0, etag, last_modified, content_hash)
+        response.raise_for_status()
+        # サーバーが返さなかった検証子は前回の値を使わない (古い値で304を期待しないため)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        path, size = save_response(response, directory, hasher)
+    new_hash = hasher.hexdigest()
+    if not force and new_hash == content_hash:
+        os.remove(path)
+        return Fetched(UNCHANGED, None, size, etag, last_modified, new_hash)
+    return Fetched(UPDATED, path, size, etag, last_modified, new_hash)
+
+
+def record_fetch(conn, url, fetched):
+    """条件付きGETの結果をマニフェストに記録する (シートをすべて取り込み終えてから呼ぶ)"""
+    now = _now()
+    with conn:
+        if fetched.status == NOT_MODIFIED:
+            conn.execute("UPDATE estat_manifest SET checked_at = ? WHERE url = ?", (now, url))
+            return
+        conn.execute('''
+            INSERT INTO estat_manifest (url, etag, last_modified, content_hash, size, fetched_at, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_hash = excluded.content_hash,
+                size = excluded.size,
+                fetched_at = excluded.fetched_at,
+                checked_at = excluded.checked_at
+        ''', (url, fetched.etag, fetched.last_modified, fetched.content_hash, fetched.size, now, now))
+
+
+def sheet_part_hashes(path):
+    """xlsx のシート名ごとに、シートのXMLと SHARED_PARTS のハッシュを返す (セルは解析しない)
+
+    ファイルの構成が読み取れなければ空の dict を返す (行のハッシュで比べる)。
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+            shared = hashlib.sha256()
+            for name in SHARED_PARTS:
+                if name in names:
+                    shared.update(name.encode("utf-8"))
+                    shared.update(archive.read(name))
+            rels = {rel.get("Id"): rel.get("Target")
+                    for rel in ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))}
+            result = {}
+            for sheet in ET.fromstring(archive.read("xl/workbook.xml")).iter(f"{MAIN_NS}sheet"):
+                target = rels.get(sheet.get(f"{REL_NS}id"))
+                if not target:
+                    continue
+                part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+                if part in names:
+                    hasher = shared.copy()
+                    hasher.update(archive.read(part))
+                    result[sheet.get("name")] = hasher.hexdigest()
+            return result
+    except (KeyError, zipfile.BadZipFile, ET.ParseError):
+        return {}
+
+
+def _sheet_record(conn, url, sheet_name):
+    """前回取り込んだシートの (行数, 行のハッシュ, XMLのハッシュ)。記録が無ければ None"""
+    return conn.execute("SELECT rows, row_hash, part_hash FROM estat_sheet_manifest WHERE url = ? AND sheet_name = ?",
+                        (url, sheet_name)).fetchone()
+
+
+def unchanged_rows(conn, url, sheet_name, table_name, part_hash=None, row_hash=None):
+    """シートが前回取り込んだものと同じなら前回の行数を返す (違う・記録や元のテーブルが無い場合は None)
+
+    part_hash (sheet_part_hashes の値) が前回と同じなら同じとする。違えば row_hash() (行のハッシュを返す関数。
+    シートを読むので必要な時だけ呼ぶ) を前回と比べ、同じならマニフェストの part_hash だけを更新する。
+    sync_workbook と estat_harvest はどちらもこの関数で比べる。
+    """
+    previous = _sheet_record(conn, url, sheet_name)
+    if previous is None or not _table_exists(conn, table_name):
+        return None
+    rows, previous_row_hash, previous_part_hash = previous
+    if part_hash is not None and part_hash == previous_part_hash:
+        return rows
+    if row_hash is None or row_hash() != previous_row_hash:
+        return None
+    if part_hash is not None:
+        with conn:
+            conn.execute("UPDATE estat_sheet_manifest SET part_hash = ? WHERE url = ? AND sheet_name = ?",
+                         (part_hash, url, sheet_name))
+    return rows
+
+
+def swap_table(conn, url, sheet_name, table_name, staging, rows, row_hash, part_hash=None):
+    """一時テーブル staging を table_name に置き換え、マニフェストを更新する (呼び出し側のトランザクションの中で使う)"""
+    conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)}")
+    conn.execute(f"ALTER TABLE {quote(staging)} RENAME TO {quote(table_name)}")
+    conn.execute('''
+        INSERT INTO estat_sheet_manifest (url, sheet_name, table_name, rows, row_hash, part_hash, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(url, sheet_name) DO UPDATE SET
+            table_name = excluded.table_name,
+            rows = excluded.rows,
+            row_hash = excluded.row_hash,
+            part_hash = excluded.part_hash,
+            updated_at = excluded.updated_at
+    ''', (url, sheet_name, table_name, rows, row_hash, part_hash, _now()))
+
+
+def sync_sheet(conn, url, worksheet, chunk_rows=INSERT_CHUNK, table_prefix="", part_hash=None):
+    """前回と内容が違うワークシートだけを一時テーブルに書き込み、元のテーブルと入れ替える。SheetSync を返す
+
+    part_hash (sheet_part_hashes の値) が前回と同じならセルを解析せずに終える。
+    違えば先に読むだけで行のハッシュを比べ、同じならマニフェストの part_hash だけを更新する。
+    変わったシートは書き込みのためにもう一度読む。
+    """
+    start = time.perf_counter()
+    table_name = table_prefix + table_name_for(worksheet.title)
+
+    def read_hash():
+        hasher = hashlib.sha256()
+        hash_sheet(worksheet, hasher)
+        return hasher.hexdigest()
+
+    rows = unchanged_rows(conn, url, worksheet.title, table_name, part_hash, read_hash)
+    if rows is not None:
+        return SheetSync(worksheet.title, table_name, rows, False, time.perf_counter() - start)
+    staging = table_name + STAGING_SUFFIX
+    hasher = hashlib.sha256()
+    with conn:
+        begin(conn)
+        conn.execute(f"DROP TABLE IF EXISTS {quote(staging)}")
+        rows = write_sheet(conn, worksheet, staging, chunk_rows, hasher)
+        swap_table(conn, url, worksheet.title, table_name, staging, rows, hasher.hexdigest(), part_hash)
+    return SheetSync(worksheet.title, table_name, rows, True, time.perf_counter() - start)
+
+
+def sync_workbook(conn, url, headers=None, timeout=30, session=None, chunk_rows=INSERT_CHUNK, force=False, on_sheet=None,
+                  table_prefix=""):
+    """url のExcelファイルを conn に同期する。SyncResult を返す
+
+    force=True なら条件付きGETと内容のハッシュの比較を省き、全シートを読み直す (行のハッシュが同じシートはそのまま)。
+    on_sheet(SheetSync) を渡すと、シートを読むたびに呼ばれる (進捗表示用)。
+    table_prefix はテーブル名の先頭に付ける文字列 (複数のファイルを1つのDBに取り込む場合に使う)。
+    """
+    init_manifest(conn)
+    fetched = fetch(url, previous_fetch(conn, url), headers, timeout, session, force)
+    sheets = []
+    if fetched.status == UPDATED:
+        try:
+            parts = sheet_part_hashes(fetched.path)
+            unchanged = {name: unchanged_rows(conn, url, name, table_prefix + table_name_for(name), part_hash)
+                         for name, part_hash in parts.items()}
+            if parts and None not in unchanged.values():
+                # すべてのシートのXMLが前回と同じなら、ブックを開かずに終える
+                for name, rows in unchanged.items():
+                    result = SheetSync(name, table_prefix + table_name_for(name), rows, False, 0.0)
+                    sheets.append(result)
+                    if on_sheet is not None:
+                        on_sheet(result)
+            else:
+                workbook = load_workbook(fetched.path, read_only=True, data_only=True)
+                try:
+                    for worksheet in workbook.worksheets:
+                        result = sync_sheet(conn, url, worksheet, chunk_rows, table_prefix, parts.get(worksheet.title))
+                        sheets.append(result)
+                        if on_sheet is not None:
+                            on_sheet(result)
+                finally:
+                    workbook.close()
+        finally:
+            os.remove(fetched.path)
+    # シートをすべて取り込み終えてからファイルの記録を更新する (途中で失敗したら次回も読み直す)
+    record_fetch(conn, url, fetched)
+    return SyncResult(fetched.status, fetched.size, sheets)